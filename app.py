@@ -1,94 +1,617 @@
-from flask import Flask, render_template, jsonify, request, send_from_directory, send_file
+from flask import Flask, Response, render_template, jsonify, request, send_from_directory, send_file, redirect, g
 import os
 import json
 import requests
 from datetime import datetime
 import hashlib
 import hmac
+import gzip
+import re
+import html
+import sqlite3
 import urllib.parse
+import mimetypes
 from pathlib import Path
 import threading
 import time
+import queue
+import itertools
+from collections import deque, OrderedDict
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+from werkzeug.wsgi import FileWrapper
+
+try:
+    import fcntl  # 跨进程文件锁（Linux/macOS）
+except ImportError:
+    fcntl = None
+
+try:
+    import brotli  # 可选依赖：预生成 brotli 压缩响应
+except ImportError:
+    brotli = None
+
+from audio_metadata import record_audio_metadata, start_audio_metadata_sync
+from config import CONFIG, FILE_STORAGE, PERSISTENT_STORAGE, USE_PERSISTENT_STORAGE
+from episode_index import cache, get_episode_index, get_episode_sort_key, parse_episode_query, query_episodes
+from search_index import SEARCH_INDEX, index_transcript_file, remove_transcript_from_index, search_transcripts
+from storage import (
+    FILE_VERSION_LENGTH, clear_evicted_file, collect_orphan_objects, compute_file_checksum, ensure_storage_directories,
+    get_cache_usage, get_content_store_status, get_evicted_paths, get_local_file_path, get_manifest_db,
+    get_manifest_file, get_manifest_key, get_manifest_totals, get_recent_manifest_files, get_state_db,
+    get_storage_info, is_internal_file, link_content_object, record_file_access, record_file_verified,
+    record_manifest_file, release_content_object, remove_manifest_file, state_file_lock
+)
+from transcripts import (
+    build_transcript_variants, extract_transcript_structure, get_transcript_structure_path,
+    get_transcript_variant_paths, get_transcript_variants, is_transcript_variant
+)
 
 app = Flask(__name__, static_folder='public', template_folder='public')
 
-# 配置 - 从环境变量读取，提供默认值
-CONFIG = {
-    # 主数据源 - 直接从GitHub Pages获取
-    'DATA_SOURCE': os.environ.get('DATA_SOURCE', 'https://xinyiheng.github.io/newpody/podcast_index.json'),
-    # 备用数据源 - 从GitHub Raw获取
-    'BACKUP_DATA_SOURCE': os.environ.get('BACKUP_DATA_SOURCE', 'https://raw.githubusercontent.com/xinyiheng/newpody/gh-pages/podcast_index.json'),
-    'BASE_URL': os.environ.get('BASE_URL', 'https://xinyiheng.github.io/newpody'),
-    'CACHE_DURATION': 3600  # 1小时缓存
+# 索引快照文件格式版本，格式不兼容时递增
+INDEX_SNAPSHOT_FORMAT = 1
+
+# 当前线程最近一次下载失败的原因（下载在调用线程中同步执行，下载任务和边下载边返回互不影响）
+DOWNLOAD_FAILURE = threading.local()
+
+# 下载任务池 - 常驻工作线程 + 按本地路径去重的优先级队列
+DOWNLOAD_POOL = {
+    'queue': queue.PriorityQueue(),
+    'jobs': {},  # local_path -> 排队中/下载中的任务
+    'finished': deque(maxlen=CONFIG['DOWNLOAD_HISTORY_SIZE']),
+    'lock': threading.Lock(),
+    'sequence': itertools.count(),
+    'workers': [],
+    'pid': None
 }
 
-# 缓存变量
-cache = {
-    'data': None,
-    'timestamp': 0
+# 预先序列化并压缩的响应体，按索引版本缓存
+PRECOMPUTED = {
+    'lock': threading.Lock(),
+    'entries': OrderedDict()
 }
 
-# 文件存储配置 - 使用持久化存储路径
-FILE_STORAGE = {
-    'base_dir': '/tmp/podcast_files',  # Zeabur持久化目录
-    'audio_dir': '/tmp/podcast_files/audio',
-    'transcript_dir': '/tmp/podcast_files/transcripts',
-    'download_lock': threading.Lock(),
-    'downloading_files': set()
+# 文稿文章分页和单篇文章的压缩响应，数量多、体积小、复用少，按字节数限制并使用较低压缩级别
+TRANSCRIPT_RESPONSES = {
+    'lock': threading.Lock(),
+    'entries': OrderedDict(),
+    'bytes': 0
 }
 
-# 环境变量配置
-PERSISTENT_STORAGE = os.environ.get('PERSISTENT_STORAGE', '/tmp/podcast_files')
-USE_PERSISTENT_STORAGE = os.environ.get('USE_PERSISTENT_STORAGE', 'true').lower() == 'true'
+# 首页首屏渲染 - 页面大小和字段需与 public/script.js 中的 EPISODES_PER_PAGE、EPISODE_FIELDS 一致
+FIRST_PAINT = {
+    'template': os.path.join(app.root_path, 'public', 'index.html'),
+    'page_size': 6,
+    'fields': ['id', 'title', 'date', 'highlight', 'audio_path', 'transcript_path',
+               'local_audio_path', 'local_transcript_path', 'duration', 'bitrate', 'audio_size']
+}
 
+# 首页模板中由服务器替换的区块：<!-- SSR:名称 -->默认内容<!-- /SSR:名称 -->
+SSR_BLOCK_PATTERN = re.compile(r'<!-- SSR:([\w-]+) -->.*?<!-- /SSR:\1 -->', re.DOTALL)
+
+# Webhook 增量同步 - 推送涉及的播客ID由后台线程合并处理
+INDEX_SYNC = {
+    'lock': threading.Lock(),
+    'event': threading.Event(),
+    'pending_ids': set(),  # 需要重新下载文件的播客ID
+    'thread': None,
+    'pid': None,
+    'last_run': None,
+    'last_result': None
+}
 
-# 确保文件存储目录存在
-def ensure_storage_directories():
-    """确保文件存储目录存在"""
-    if USE_PERSISTENT_STORAGE:
-        # 使用持久化存储
-        os.makedirs(FILE_STORAGE['audio_dir'], exist_ok=True)
-        os.makedirs(FILE_STORAGE['transcript_dir'], exist_ok=True)
-        print(f"📁 使用持久化存储: {PERSISTENT_STORAGE}")
-    else:
-        # 使用临时存储（用于测试）
-        FILE_STORAGE['base_dir'] = 'static_files'
-        FILE_STORAGE['audio_dir'] = 'static_files/audio'
-        FILE_STORAGE['transcript_dir'] = 'static_files/transcripts'
-        os.makedirs(FILE_STORAGE['audio_dir'], exist_ok=True)
-        os.makedirs(FILE_STORAGE['transcript_dir'], exist_ok=True)
-        print("📁 使用临时存储（测试模式）")
+# 后台同步调度 - 通过文件锁选出唯一的运行者，进度写入状态文件供所有 worker 查询
+SYNC_SCHEDULER = {
+    'lock': threading.Lock(),
+    'thread': None,
+    'pid': None,
+    'status_file': 'sync_status.json',
+    'status': {}
+}
+
+# 服务器推送事件 - 写入共享的 SQLite 事件表，任意 worker 的 SSE 连接都能读取
+EVENT_LOG = {
+    'db_name': 'events.sqlite3',
+    'published': itertools.count(1),
+    # 长轮询：每个进程一个线程查询最新事件ID，有新事件时唤醒所有等待的请求
+    'lock': threading.Lock(),
+    'condition': None,
+    'latest_id': 0,
+    'waiters': 0,
+    'pid': None
+}
+
+EVENT_LOG_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+'''
+
+# 后台下载限速 - 令牌桶
+BANDWIDTH = {
+    'lock': threading.Lock(),
+    'allowance': 0.0,
+    'updated': 0.0
+}
 
-    # 确保静态文件目录存在
-    os.makedirs('static', exist_ok=True)
+# 下载后处理 - 读取音频元数据、生成结构化文稿和压缩副本、更新全文索引，由单独的线程执行，下载线程只负责传输
+POSTPROCESS = {
+    'queue': queue.Queue(),
+    'lock': threading.Lock(),
+    'pending': set(),  # 已排队、尚未处理的本地路径
+    'thread': None,
+    'pid': None
+}
+
+# 缓存淘汰 - 后台线程按容量预算淘汰文件
+CACHE_EVICTOR = {
+    'event': threading.Event(),
+    'lock': threading.Lock(),
+    'thread': None,
+    'pid': None,
+    'last_run': None,
+    'last_evicted': 0,
+    'last_freed': 0
+}
+
+# 边下载边返回 - 本进程中正在为请求填充的文件
+STREAM_FILLS = {
+    'lock': threading.Lock(),
+    'threads': {},  # local_path -> 下载线程
+    'pid': None
+}
+
+# 上游客户端 - 复用连接的 Session、对冲请求线程池和每个数据源的健康统计
+UPSTREAM = {
+    'session': None,
+    'executor': None,
+    'pid': None,
+    'lock': threading.Lock(),
+    'stats': {}
+}
+
+# 运行指标 - 每个进程在内存中累加，后台线程定期写入 state/metrics/<pid>.json，/metrics 汇总
+METRICS = {
+    'lock': threading.Lock(),
+    'pid': None,
+    'counters': {},  # (名称, 标签) -> 值
+    'histograms': {},  # (名称, 标签) -> [各桶计数..., +Inf 桶计数, 总和]
+    'thread': None,
+    'dir_name': 'metrics'
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DOWNLOAD_DURATION_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# 指标定义：名称 -> (类型, 说明, 直方图分桶)
+METRIC_DEFINITIONS = {
+    'podcast_http_request_duration_seconds': ('histogram', '请求处理时间（至响应头）', LATENCY_BUCKETS),
+    'podcast_index_cache_requests_total': ('counter', '播客索引缓存查询次数（hit/stale/miss）', None),
+    'podcast_index_refreshes_total': ('counter', '播客索引刷新结果', None),
+    'podcast_upstream_request_duration_seconds': ('histogram', '索引数据源请求延迟', LATENCY_BUCKETS),
+    'podcast_upstream_errors_total': ('counter', '索引数据源请求失败次数', None),
+    'podcast_upstream_hedges_total': ('counter', '数据源响应缓慢时发出的对冲请求次数', None),
+    'podcast_downloads_total': ('counter', '文件下载结果', None),
+    'podcast_download_bytes_total': ('counter', '从上游下载的字节数', None),
+    'podcast_download_duration_seconds': ('histogram', '单个文件下载时间', DOWNLOAD_DURATION_BUCKETS),
+    'podcast_download_queue_depth': ('gauge', '下载队列中的任务数', None),
+    'podcast_stream_fills_active': ('gauge', '正在边下载边返回的文件数', None),
+    'podcast_file_responses_total': ('counter', '文件请求的处理方式（local/offload/fill/redirect/not_modified）', None),
+    'podcast_file_served_bytes_total': ('counter', '由本服务发送的文件字节数', None),
+    'podcast_cache_evictions_total': ('counter', '被淘汰或清理的缓存文件数', None),
+    'podcast_cache_evicted_bytes_total': ('counter', '被淘汰或清理的缓存字节数', None),
+    'podcast_cache_files': ('gauge', '本地缓存文件数', None),
+    'podcast_cache_bytes': ('gauge', '本地缓存字节数', None),
+    'podcast_cache_budget_bytes': ('gauge', '缓存容量预算', None),
+    'podcast_integrity_checks_total': ('counter', '缓存文件完整性校验结果（ok/corrupt/missing/unknown）', None),
+    'podcast_dedup_links_total': ('counter', '与已有内容相同、改为硬链接保存的文件数', None),
+    'podcast_webhook_requests_total': ('counter', 'Webhook 请求处理结果', None),
+    'podcast_index_generation': ('gauge', '当前索引版本', None),
+    'podcast_index_episodes': ('gauge', '索引中的播客数', None),
+    'podcast_index_age_seconds': ('gauge', '索引距上次从上游确认的时间', None),
+    'podcast_metrics_workers': ('gauge', '参与汇总的 worker 进程数', None)
+}
 
 # 在模块导入时确保目录就绪（以便 gunicorn 模式也能创建目录）
 ensure_storage_directories()
 
-def get_local_file_path(remote_path, file_type):
-    """将远程路径转换为本地路径"""
-    if not remote_path:
-        return None
-
-    # 解析远程路径
-    parsed = urllib.parse.urlparse(remote_path)
-    if parsed.path:
-        # 从路径中提取文件名
-        path_parts = parsed.path.split('/')
-        filename = path_parts[-1] if path_parts[-1] else path_parts[-2]
+def ensure_upstream_client():
+    """按需创建上游 Session 和线程池（每个进程一份，fork 后重新创建）"""
+    with UPSTREAM['lock']:
+        if UPSTREAM['pid'] == os.getpid():
+            return
+
+        session = requests.Session()
+        # 连接池需覆盖所有下载线程和对冲请求，保持 keep-alive 连接复用
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=CONFIG['DOWNLOAD_WORKERS'] + 4)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        UPSTREAM['session'] = session
+        UPSTREAM['executor'] = ThreadPoolExecutor(max_workers=4, thread_name_prefix='upstream')
+        UPSTREAM['pid'] = os.getpid()
+
+def get_upstream_session():
+    """获取复用连接的上游 Session"""
+    ensure_upstream_client()
+    return UPSTREAM['session']
+
+def get_upstream_source_stats(source):
+    """获取（必要时创建）数据源的统计记录，调用方需持有 UPSTREAM['lock']"""
+    stats = UPSTREAM['stats'].get(source)
+    if stats is None:
+        stats = {
+            'requests': 0,
+            'errors': 0,
+            'hedges': 0,
+            'latencies': deque(maxlen=CONFIG['UPSTREAM_STATS_WINDOW']),
+            'outcomes': deque(maxlen=CONFIG['UPSTREAM_STATS_WINDOW']),
+            'last_error': None,
+            'last_success_at': None
+        }
+        UPSTREAM['stats'][source] = stats
+    return stats
+
+def record_upstream_result(source, elapsed, error=None):
+    """记录一次上游请求的延迟和结果"""
+    observe_metric('podcast_upstream_request_duration_seconds', elapsed, source=get_upstream_label(source))
+    if error:
+        inc_metric('podcast_upstream_errors_total', source=get_upstream_label(source))
+    with UPSTREAM['lock']:
+        stats = get_upstream_source_stats(source)
+        stats['requests'] += 1
+        stats['outcomes'].append(0 if error else 1)
+        if error:
+            stats['errors'] += 1
+            stats['last_error'] = str(error)
+        else:
+            stats['latencies'].append(elapsed)
+            stats['last_success_at'] = time.time()
+
+def summarize_upstream_stats(source):
+    """计算数据源的延迟分位数、近期错误率和健康评分（越小越好）"""
+    with UPSTREAM['lock']:
+        stats = get_upstream_source_stats(source)
+        latencies = sorted(stats['latencies'])
+        outcomes = list(stats['outcomes'])
+        summary = {
+            'requests': stats['requests'],
+            'errors': stats['errors'],
+            'hedges': stats['hedges'],
+            'last_error': stats['last_error'],
+            'last_success_at': stats['last_success_at']
+        }
 
-        # 获取文件所在的目录名作为子目录
-        dir_name = path_parts[-2] if len(path_parts) > 2 else ''
+    def percentile(p):
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+    error_rate = (1 - sum(outcomes) / len(outcomes)) if outcomes else None
+    p50 = percentile(0.5)
+    summary.update({
+        'samples': len(latencies),
+        'p50_latency': p50,
+        'p95_latency': percentile(0.95),
+        'error_rate': error_rate,
+        # 评分 = 中位延迟 × 错误惩罚；全部失败的数据源排在最后
+        'score': (p50 * (1 + 10 * error_rate)) if p50 is not None else (float('inf') if outcomes else None)
+    })
+    return summary
+
+def rank_upstream_sources(sources):
+    """按健康评分排序数据源；有数据源还没有样本时保持配置顺序"""
+    scores = {url: summarize_upstream_stats(url)['score'] for _, url in sources}
+    if any(score is None for score in scores.values()):
+        return list(sources)
+    return sorted(sources, key=lambda source: scores[source[1]])
+
+def get_hedge_delay(source):
+    """对冲等待时间：数据源近期 p95 延迟，样本不足时使用默认值"""
+    summary = summarize_upstream_stats(source)
+    if summary['samples'] < 5 or summary['p95_latency'] is None:
+        return CONFIG['HEDGE_DEFAULT_DELAY']
+    return min(max(summary['p95_latency'], CONFIG['HEDGE_MIN_DELAY']), CONFIG['UPSTREAM_TIMEOUT'])
+
+def upstream_request(source, headers):
+    """向数据源发送一次请求，返回 (response, data)；无效响应抛出异常"""
+    start = time.monotonic()
+    try:
+        response = get_upstream_session().get(source, headers=headers, timeout=CONFIG['UPSTREAM_TIMEOUT'])
+        if response.status_code == 304:
+            data = None
+        elif response.status_code == 200:
+            data = response.json()
+        else:
+            raise ValueError(f"HTTP {response.status_code}")
+    except Exception as e:
+        record_upstream_result(source, time.monotonic() - start, e)
+        raise
+
+    record_upstream_result(source, time.monotonic() - start)
+    return response, data
+
+def hedged_upstream_fetch(sources, build_headers):
+    """对冲请求：先请求最健康的数据源，超过其近期 p95 仍未返回（或失败）时
+    再请求下一个数据源，取最先返回的有效响应。返回 (label, source, response, data) 或 None"""
+    ensure_upstream_client()
+    executor = UPSTREAM['executor']
+    remaining = rank_upstream_sources(sources)
+    in_flight = {}
+
+    def launch_next():
+        label, source = remaining.pop(0)
+        future = executor.submit(upstream_request, source, build_headers(source))
+        in_flight[future] = (label, source)
+        return source
+
+    hedge_delay = get_hedge_delay(launch_next())
+
+    while in_flight:
+        done, _ = wait(list(in_flight), timeout=hedge_delay if remaining else None, return_when=FIRST_COMPLETED)
+
+        if not done:
+            # 当前请求慢于近期 p95，向下一个数据源发出对冲请求
+            slow_label, slow_source = next(iter(in_flight.values()))
+            with UPSTREAM['lock']:
+                get_upstream_source_stats(slow_source)['hedges'] += 1
+            inc_metric('podcast_upstream_hedges_total', source=get_upstream_label(slow_source))
+            print(f"{slow_label}响应缓慢（>{hedge_delay:.2f}s），发出对冲请求")
+            launch_next()
+            continue
+
+        for future in done:
+            label, source = in_flight.pop(future)
+            try:
+                response, data = future.result()
+                return label, source, response, data
+            except Exception as e:
+                print(f"{label}失败: {e}")
 
-        if file_type == 'audio':
-            return os.path.join(FILE_STORAGE['audio_dir'], dir_name, filename)
-        elif file_type == 'transcript':
-            return os.path.join(FILE_STORAGE['transcript_dir'], dir_name, filename)
+        # 请求失败且没有其他进行中的请求时，立即尝试下一个数据源
+        if remaining and not in_flight:
+            launch_next()
 
     return None
 
-def download_file_if_needed(remote_url, local_path, file_type):
-    """如果需要，下载文件到本地"""
+def get_upstream_stats():
+    """获取所有数据源的统计信息"""
+    return {
+        source: summarize_upstream_stats(source)
+        for source in (CONFIG['DATA_SOURCE'], CONFIG['BACKUP_DATA_SOURCE'])
+    }
+
+def start_metrics_flusher():
+    """按需启动指标写入线程（每个进程一个），fork 出的进程从零开始计数"""
+    with METRICS['lock']:
+        if METRICS['pid'] == os.getpid():
+            return
+        METRICS['pid'] = os.getpid()
+        METRICS['counters'] = {}
+        METRICS['histograms'] = {}
+        thread = threading.Thread(target=metrics_flusher_loop, name='metrics-flusher')
+        thread.daemon = True
+        thread.start()
+        METRICS['thread'] = thread
+
+def inc_metric(name, value=1, **labels):
+    """计数器加 value（只在内存中累加，开销是一次加锁的字典更新）"""
+    key = (name, tuple(sorted(labels.items())))
+    if METRICS['pid'] != os.getpid():
+        start_metrics_flusher()
+    with METRICS['lock']:
+        METRICS['counters'][key] = METRICS['counters'].get(key, 0) + value
+
+def observe_metric(name, value, **labels):
+    """记录一次直方图观测值"""
+    buckets = METRIC_DEFINITIONS[name][2]
+    key = (name, tuple(sorted(labels.items())))
+    index = bisect_left(buckets, value)
+    if METRICS['pid'] != os.getpid():
+        start_metrics_flusher()
+    with METRICS['lock']:
+        histogram = METRICS['histograms'].get(key)
+        if histogram is None:
+            histogram = METRICS['histograms'][key] = [0] * (len(buckets) + 2)
+        histogram[index] += 1
+        histogram[-1] += value
+
+def metrics_flusher_loop():
+    """定期把本进程的指标写入共享目录，供处理 /metrics 请求的 worker 汇总"""
+    while True:
+        time.sleep(CONFIG['METRICS_FLUSH_INTERVAL'])
+        try:
+            write_metrics_snapshot(get_process_metrics_snapshot())
+        except Exception as e:
+            print(f"写入指标失败: {e}")
+
+def get_metrics_dir():
+    """各进程指标快照所在目录"""
+    return os.path.join(FILE_STORAGE['state_dir'], METRICS['dir_name'])
+
+def get_process_metrics_snapshot():
+    """本进程的计数器、直方图和进程内状态（下载队列等），可序列化为 JSON"""
+    with METRICS['lock']:
+        counters = [[name, labels, value] for (name, labels), value in METRICS['counters'].items()]
+        histograms = [[name, labels, list(values)] for (name, labels), values in METRICS['histograms'].items()]
+
+    gauges = []
+    if DOWNLOAD_POOL['pid'] == os.getpid():
+        with DOWNLOAD_POOL['lock']:
+            states = [job['state'] for job in DOWNLOAD_POOL['jobs'].values()]
+        for state in ('queued', 'running'):
+            gauges.append(['podcast_download_queue_depth', [['state', state]], states.count(state)])
+    if STREAM_FILLS['pid'] == os.getpid():
+        gauges.append(['podcast_stream_fills_active', [], len(STREAM_FILLS['threads'])])
+
+    return {
+        'pid': os.getpid(),
+        'written_at': time.time(),
+        'counters': counters,
+        'histograms': histograms,
+        'gauges': gauges
+    }
+
+def write_metrics_snapshot(snapshot, filename=None):
+    """原子写入指标快照"""
+    metrics_dir = get_metrics_dir()
+    os.makedirs(metrics_dir, exist_ok=True)
+    snapshot_path = os.path.join(metrics_dir, filename or f"{snapshot['pid']}.json")
+    temp_path = f"{snapshot_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    os.replace(temp_path, snapshot_path)
+
+def read_metrics_snapshot(snapshot_path):
+    """读取指标快照，文件不存在或损坏时返回 None"""
+    try:
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def is_process_alive(pid):
+    """进程是否仍在运行（同一容器内的 worker）"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def merge_metrics_snapshot(totals, snapshot, include_gauges=True):
+    """把一个快照累加到汇总结果中（标签从 JSON 列表还原为元组）"""
+    for name, labels, value in snapshot.get('counters', []):
+        key = (name, tuple(tuple(label) for label in labels))
+        totals['counters'][key] = totals['counters'].get(key, 0) + value
+    for name, labels, values in snapshot.get('histograms', []):
+        key = (name, tuple(tuple(label) for label in labels))
+        current = totals['histograms'].get(key)
+        if current is None or len(current) != len(values):
+            totals['histograms'][key] = list(values)
+        else:
+            totals['histograms'][key] = [a + b for a, b in zip(current, values)]
+    if include_gauges:
+        for name, labels, value in snapshot.get('gauges', []):
+            key = (name, tuple(tuple(label) for label in labels))
+            totals['gauges'][key] = totals['gauges'].get(key, 0) + value
+
+def collect_metrics():
+    """汇总所有 worker 的指标
+
+    已退出进程的计数器合并到 retired.json 后删除其快照，汇总的计数器不会因 worker 重启而回退。
+    """
+    own = get_process_metrics_snapshot()
+    write_metrics_snapshot(own)
+    totals = {'counters': {}, 'histograms': {}, 'gauges': {}}
+    merge_metrics_snapshot(totals, own)
+    workers = 1
+
+    metrics_dir = get_metrics_dir()
+    retired_path = os.path.join(metrics_dir, 'retired.json')
+    with state_file_lock('metrics'):
+        retired = read_metrics_snapshot(retired_path) or {'counters': [], 'histograms': []}
+        retired_totals = {'counters': {}, 'histograms': {}, 'gauges': {}}
+        merge_metrics_snapshot(retired_totals, retired, include_gauges=False)
+        retired_changed = False
+
+        for filename in os.listdir(metrics_dir):
+            name, ext = os.path.splitext(filename)
+            if ext != '.json' or not name.isdigit() or int(name) == own['pid']:
+                continue
+            snapshot_path = os.path.join(metrics_dir, filename)
+            snapshot = read_metrics_snapshot(snapshot_path)
+            if is_process_alive(int(name)):
+                if snapshot:
+                    merge_metrics_snapshot(totals, snapshot)
+                    workers += 1
+                continue
+            if snapshot:
+                merge_metrics_snapshot(retired_totals, snapshot, include_gauges=False)
+                retired_changed = True
+            os.remove(snapshot_path)
+
+        if retired_changed:
+            write_metrics_snapshot({
+                'counters': [[name, labels, value] for (name, labels), value in retired_totals['counters'].items()],
+                'histograms': [[name, labels, values] for (name, labels), values in retired_totals['histograms'].items()]
+            }, 'retired.json')
+
+    merge_metrics_snapshot(totals, {
+        'counters': [[name, labels, value] for (name, labels), value in retired_totals['counters'].items()],
+        'histograms': [[name, labels, values] for (name, labels), values in retired_totals['histograms'].items()]
+    }, include_gauges=False)
+
+    # 全局状态由处理请求的 worker 直接读取（存储清单和索引快照在 worker 间共享）
+    gauges = totals['gauges']
+    manifest_totals = get_manifest_totals()
+    for file_type, budget in get_cache_budgets().items():
+        labels = (('file_type', file_type),)
+        gauges[('podcast_cache_files', labels)] = manifest_totals[file_type]['count']
+        gauges[('podcast_cache_bytes', labels)] = manifest_totals[file_type]['bytes']
+        gauges[('podcast_cache_budget_bytes', labels)] = budget
+    sync_index_snapshot()
+    gauges[('podcast_index_generation', ())] = cache['generation']
+    gauges[('podcast_index_episodes', ())] = len((cache['data'] or {}).get('podcasts', []))
+    if cache['data'] is not None:
+        gauges[('podcast_index_age_seconds', ())] = round(time.time() - cache['timestamp'], 3)
+    gauges[('podcast_metrics_workers', ())] = workers
+    return totals
+
+def format_metric_labels(labels):
+    """Prometheus 标签格式，例如 {file_type="audio"}"""
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+def render_metrics(totals):
+    """按 Prometheus 文本格式输出汇总的指标"""
+    samples = {}
+    for kind in ('counters', 'histograms', 'gauges'):
+        for (name, labels), value in totals[kind].items():
+            samples.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name, (metric_type, description, buckets) in METRIC_DEFINITIONS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in sorted(samples.get(name, [])):
+            if metric_type != 'histogram':
+                lines.append(f"{name}{format_metric_labels(labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{format_metric_labels(labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{format_metric_labels(labels)} {value[-1]}")
+            lines.append(f"{name}_count{format_metric_labels(labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+def get_upstream_label(source):
+    """数据源在指标中的标签"""
+    return 'primary' if source == CONFIG['DATA_SOURCE'] else 'backup'
+
+def download_file_if_needed(remote_url, local_path, file_type, throttle=False):
+    """如果需要，下载文件到本地
+
+    以流式分块写入临时文件（.part），校验长度后原子重命名为最终文件；
+    中断的下载会用 HTTP Range 从已有的片段继续。同一文件同时只有一个
+    写入者（跨进程文件锁），正在写入的片段可被其他请求边下载边读取。
+    throttle 为 True 时受后台下载带宽上限限制。
+    """
     if not remote_url or not local_path:
         return False
 
@@ -96,121 +619,863 @@ def download_file_if_needed(remote_url, local_path, file_type):
     if os.path.exists(local_path):
         return True
 
-    # 防止重复下载
-    file_key = f"{remote_url}:{local_path}"
-    with FILE_STORAGE['download_lock']:
-        if file_key in FILE_STORAGE['downloading_files']:
-            return False
-        FILE_STORAGE['downloading_files'].add(file_key)
+    partial_path = f"{local_path}.part"
 
     try:
         # 确保目录存在
         os.makedirs(os.path.dirname(local_path), exist_ok=True)
 
-        print(f"正在下载 {file_type} 文件: {remote_url}")
-
-        # 下载文件
-        response = requests.get(remote_url, timeout=30)
-        if response.status_code == 200:
-            with open(local_path, 'wb') as f:
-                f.write(response.content)
-            print(f"下载完成: {local_path}")
-            return True
-        else:
-            print(f"下载失败: {response.status_code}")
-            return False
+        with download_writer_lock(local_path) as acquired:
+            if not acquired:
+                print(f"文件正在由其他线程或进程下载: {local_path}")
+                record_download_failure(local_path, file_type, '文件正在由其他线程或进程下载', result=None)
+                return False
+            if os.path.exists(local_path):
+                return True
+
+            # 读取上次中断时保存的片段信息，用于断点续传；先标记为未在写入，
+            # 避免读取方把旧片段当作正在写入的文件
+            resume_from = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+            partial_meta = read_partial_meta(local_path) if resume_from else {}
+            if partial_meta.get('url') != remote_url:
+                partial_meta = {}
+            if partial_meta:
+                write_partial_meta(local_path, dict(partial_meta, filling=False))
+
+            headers = {}
+            if resume_from and partial_meta:
+                headers['Range'] = f"bytes={resume_from}-"
+                # 续传时按原始字节传输，避免压缩编码导致偏移量不一致
+                headers['Accept-Encoding'] = 'identity'
+                # 远程文件若已变化，服务器会返回完整的 200 响应
+                validator = partial_meta.get('etag') or partial_meta.get('last_modified')
+                if validator:
+                    headers['If-Range'] = validator
+                print(f"正在续传 {file_type} 文件: {remote_url} (已下载 {resume_from} 字节)")
+            else:
+                resume_from = 0
+                print(f"正在下载 {file_type} 文件: {remote_url}")
+
+            download_mode = 'prefetch' if throttle else 'fill'
+            download_started = time.monotonic()
+
+            # 流式下载文件
+            with get_upstream_session().get(remote_url, headers=headers, stream=True, timeout=30) as response:
+                if response.status_code == 416:
+                    # 片段已失效，丢弃后下次重新下载
+                    discard_partial_download(local_path)
+                    print(f"续传范围无效，已丢弃片段: {partial_path}")
+                    record_download_failure(local_path, file_type, '续传范围无效 (HTTP 416)')
+                    return False
+
+                if response.status_code == 206 and resume_from:
+                    expected_size = parse_content_range_total(response.headers.get('Content-Range'), resume_from)
+                    if expected_size is None:
+                        discard_partial_download(local_path)
+                        print(f"续传响应无效: {response.headers.get('Content-Range')}")
+                        record_download_failure(local_path, file_type,
+                                                f"续传响应无效: Content-Range {response.headers.get('Content-Range')}")
+                        return False
+                    mode = 'ab'
+                elif response.status_code == 200:
+                    # 服务器不支持续传或文件已变化，从头下载；先删除旧片段，
+                    # 使新片段成为新文件，正在读取旧片段的请求不会读到混合内容
+                    resume_from = 0
+                    expected_size = None
+                    if response.headers.get('Content-Length') and not response.headers.get('Content-Encoding'):
+                        expected_size = int(response.headers['Content-Length'])
+                    mode = 'wb'
+                    discard_partial_download(local_path)
+                    partial_meta = {
+                        'url': remote_url,
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified')
+                    }
+                else:
+                    print(f"下载失败: {response.status_code}")
+                    record_download_failure(local_path, file_type, f"HTTP {response.status_code}")
+                    return False
+
+                # 边下载边计算 SHA-256，续传时先计算已有片段
+                digest = hashlib.sha256()
+                if mode == 'ab':
+                    with open(partial_path, 'rb') as f:
+                        for block in iter(lambda: f.read(CONFIG['DOWNLOAD_CHUNK_SIZE']), b''):
+                            digest.update(block)
+
+                with open(partial_path, mode) as f:
+                    # 记录片段的 inode 和总长度，读取方据此确认片段正在写入
+                    write_partial_meta(local_path, dict(
+                        partial_meta, size=expected_size, inode=os.fstat(f.fileno()).st_ino, filling=True
+                    ))
+                    downloaded_bytes = resume_from
+                    publish_download_event(local_path, file_type, 'started', downloaded_bytes, expected_size)
+                    last_progress_event = time.time()
+                    try:
+                        for chunk in response.iter_content(chunk_size=CONFIG['DOWNLOAD_CHUNK_SIZE']):
+                            if chunk:
+                                f.write(chunk)
+                                # 及时写入，让读取方尽快看到新数据
+                                f.flush()
+                                digest.update(chunk)
+                                downloaded_bytes += len(chunk)
+                                inc_metric('podcast_download_bytes_total', len(chunk), file_type=file_type, mode=download_mode)
+                                if time.time() - last_progress_event >= CONFIG['EVENT_PROGRESS_INTERVAL']:
+                                    publish_download_event(local_path, file_type, 'progress', downloaded_bytes, expected_size)
+                                    last_progress_event = time.time()
+                                if throttle:
+                                    throttle_download(len(chunk))
+                    except BaseException:
+                        write_partial_meta(local_path, dict(partial_meta, filling=False))
+                        publish_download_event(local_path, file_type, 'failed', downloaded_bytes, expected_size)
+                        raise
+
+            # 校验文件长度，不完整的片段保留以便下次续传
+            downloaded_size = os.path.getsize(partial_path)
+            if expected_size is not None and downloaded_size != expected_size:
+                print(f"下载不完整: {local_path} ({downloaded_size}/{expected_size} 字节)")
+                publish_download_event(local_path, file_type, 'failed', downloaded_size, expected_size)
+                record_download_failure(local_path, file_type, f"下载不完整: {downloaded_size}/{expected_size} 字节",
+                                        result='incomplete')
+                if downloaded_size > expected_size:
+                    discard_partial_download(local_path)
+                else:
+                    write_partial_meta(local_path, dict(partial_meta, filling=False))
+                return False
+
+            # 原子重命名，保证最终路径上只会出现完整文件；之后再删除续传信息，
+            # 读取方看到写入结束时最终文件一定已经就位
+            os.replace(partial_path, local_path)
+            meta_path = f"{partial_path}.meta"
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
+        print(f"下载完成: {local_path}")
+        inc_metric('podcast_downloads_total', file_type=file_type, result='done')
+        observe_metric('podcast_download_duration_seconds', time.monotonic() - download_started, file_type=file_type)
+        handle_downloaded_file(local_path, file_type, digest.hexdigest())
+        publish_download_event(local_path, file_type, 'done', downloaded_size, downloaded_size)
+        return True
 
     except Exception as e:
         print(f"下载出错 {remote_url}: {e}")
+        record_download_failure(local_path, file_type, str(e))
         return False
-    finally:
-        with FILE_STORAGE['download_lock']:
-            FILE_STORAGE['downloading_files'].discard(file_key)
 
-def get_storage_info():
-    """获取存储空间信息"""
+def record_download_failure(local_path, file_type, reason, result='failed'):
+    """记录当前线程下载失败的原因（供下载任务显示），result 不为 None 时计入下载结果指标"""
+    DOWNLOAD_FAILURE.reason = reason
+    if result is not None:
+        inc_metric('podcast_downloads_total', file_type=file_type, result=result)
+
+@contextmanager
+def download_writer_lock(local_path):
+    """同一文件的写入锁（跨进程，非阻塞），返回是否获得锁"""
+    if fcntl is None:
+        yield True
+        return
+
+    lock_dir = os.path.join(FILE_STORAGE['state_dir'], 'downloads')
+    os.makedirs(lock_dir, exist_ok=True)
+    lock_name = hashlib.sha1(get_manifest_key(local_path).encode('utf-8')).hexdigest()
+    with open(os.path.join(lock_dir, f"{lock_name}.lock"), 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def read_partial_meta(local_path):
+    """读取下载片段的续传信息"""
+    try:
+        with open(f"{local_path}.part.meta", 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_partial_meta(local_path, meta):
+    """原子写入下载片段的续传信息"""
+    meta_path = f"{local_path}.part.meta"
+    temp_path = f"{meta_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(temp_path, meta_path)
+
+def get_event_db():
+    """获取事件表数据库连接"""
+    return get_state_db(EVENT_LOG['db_name'], EVENT_LOG_SCHEMA)
+
+def publish_event(event, data):
+    """写入一条推送事件；失败不影响调用方"""
     try:
-        import shutil
+        db = get_event_db()
+        with db:
+            cursor = db.execute(
+                'INSERT INTO events (event, data, created_at) VALUES (?, ?, ?)',
+                (event, json.dumps(data, ensure_ascii=False, separators=(',', ':')), time.time())
+            )
+            # 定期删除旧事件，只保留最近 EVENT_LOG_SIZE 条
+            if next(EVENT_LOG['published']) % 100 == 0:
+                db.execute('DELETE FROM events WHERE id <= ?', (cursor.lastrowid - CONFIG['EVENT_LOG_SIZE'],))
+    except sqlite3.Error as e:
+        print(f"写入推送事件失败: {e}")
+        return
+
+    # 本进程中等待的长轮询请求立即返回，其他进程由事件监视线程唤醒
+    condition = EVENT_LOG['condition']
+    if EVENT_LOG['pid'] == os.getpid() and condition is not None:
+        with condition:
+            EVENT_LOG['latest_id'] = max(EVENT_LOG['latest_id'], cursor.lastrowid)
+            condition.notify_all()
+
+def get_latest_event_id():
+    """当前最新的事件ID"""
+    return get_event_db().execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
+
+def get_events_after(event_id):
+    """读取指定ID之后的事件"""
+    return get_event_db().execute(
+        'SELECT id, event, data FROM events WHERE id > ? ORDER BY id LIMIT 500', (event_id,)
+    ).fetchall()
+
+def is_event_log_gap(event_id):
+    """事件表中是否已缺少指定ID之后的事件（已被清理，或事件表被重建）"""
+    oldest, latest = get_event_db().execute('SELECT MIN(id), COALESCE(MAX(id), 0) FROM events').fetchone()
+    return event_id > latest or (oldest is not None and event_id < oldest - 1)
+
+def start_event_watcher():
+    """按需启动事件监视线程（每个进程一个，fork 后重新创建）"""
+    with EVENT_LOG['lock']:
+        if EVENT_LOG['pid'] == os.getpid():
+            return
+        EVENT_LOG['pid'] = os.getpid()
+        EVENT_LOG['condition'] = threading.Condition()
+        EVENT_LOG['latest_id'] = 0
+        EVENT_LOG['waiters'] = 0
+        thread = threading.Thread(target=event_watcher_loop, name='event-watcher')
+        thread.daemon = True
+        thread.start()
+
+def event_watcher_loop():
+    """有请求在等待时每 EVENT_POLL_INTERVAL 秒查询一次最新事件ID，变化时唤醒等待的请求"""
+    condition = EVENT_LOG['condition']
+    while True:
+        time.sleep(CONFIG['EVENT_POLL_INTERVAL'])
+        if not EVENT_LOG['waiters']:
+            continue
+        try:
+            latest_id = get_latest_event_id()
+        except sqlite3.Error as e:
+            print(f"读取推送事件失败: {e}")
+            continue
+        if latest_id != EVENT_LOG['latest_id']:
+            with condition:
+                EVENT_LOG['latest_id'] = latest_id
+                condition.notify_all()
+
+def wait_for_events(event_id, timeout):
+    """长轮询：返回指定ID之后的事件，没有时最多等待 timeout 秒；等待的请求已满时立即返回"""
+    rows = get_events_after(event_id)
+    if rows:
+        return rows
+
+    start_event_watcher()
+    condition = EVENT_LOG['condition']
+    with condition:
+        if EVENT_LOG['waiters'] >= CONFIG['EVENT_MAX_WAITERS']:
+            return None
+        EVENT_LOG['waiters'] += 1
+        EVENT_LOG['latest_id'] = max(EVENT_LOG['latest_id'], event_id)
+        try:
+            deadline = time.time() + timeout
+            while EVENT_LOG['latest_id'] <= event_id:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return []
+                condition.wait(remaining)
+        finally:
+            EVENT_LOG['waiters'] -= 1
+    return get_events_after(event_id)
+
+def get_public_file_url(local_path, file_type):
+    """本地缓存文件对应的访问地址"""
+    if file_type == 'audio':
+        return f"/files/audio/{os.path.relpath(local_path, FILE_STORAGE['audio_dir'])}"
+    return f"/files/transcripts/{os.path.relpath(local_path, FILE_STORAGE['transcript_dir'])}"
+
+def publish_download_event(local_path, file_type, state, downloaded_bytes, total_bytes):
+    """推送单个文件的下载进度"""
+    publish_event('download', {
+        'episode_id': os.path.basename(os.path.dirname(local_path)),
+        'file_type': file_type,
+        'url': get_public_file_url(local_path, file_type),
+        'state': state,
+        'bytes': downloaded_bytes,
+        'total': total_bytes
+    })
 
-        if not os.path.exists(FILE_STORAGE['base_dir']):
-            return {
-                'total_space': 0,
-                'used_space': 0,
-                'free_space': 0,
-                'usage_percent': 0
-            }
+def get_cache_stats():
+    """本地缓存的文件统计（推送和首屏共用）"""
+    totals = get_manifest_totals()
+    return {
+        'audio_files': totals['audio']['count'],
+        'transcript_files': totals['transcript']['count'],
+        'total_size': totals['audio']['bytes'] + totals['transcript']['bytes']
+    }
+
+def publish_cache_stats():
+    """推送缓存统计"""
+    try:
+        publish_event('cache', get_cache_stats())
+    except sqlite3.Error as e:
+        print(f"推送缓存统计失败: {e}")
+
+def get_index_event_data():
+    """索引版本事件的内容"""
+    episodes = get_episode_index()['episodes']
+    return {
+        'generation': cache['generation'],
+        'index_total': len(episodes),
+        'latest_id': episodes[0].get('id') if episodes else None
+    }
+
+def throttle_download(size):
+    """后台下载限速（令牌桶）：超出带宽上限时等待"""
+    limit = CONFIG['SYNC_BANDWIDTH_LIMIT_KBPS'] * 1024
+    if limit <= 0:
+        return
+
+    with BANDWIDTH['lock']:
+        now = time.monotonic()
+        # 最多积累 1 秒的额度，避免空闲后突发
+        BANDWIDTH['allowance'] = min(limit, BANDWIDTH['allowance'] + (now - BANDWIDTH['updated']) * limit)
+        BANDWIDTH['updated'] = now
+        BANDWIDTH['allowance'] -= size
+        delay = -BANDWIDTH['allowance'] / limit if BANDWIDTH['allowance'] < 0 else 0
+    if delay:
+        time.sleep(delay)
+
+def parse_content_range_total(content_range, expected_start):
+    """解析 Content-Range 响应头，返回文件总长度；起始位置不符时返回 None"""
+    # 格式: bytes 1000-2999/3000
+    try:
+        unit, _, range_spec = (content_range or '').partition(' ')
+        byte_range, _, total = range_spec.partition('/')
+        start = int(byte_range.split('-')[0])
+        if unit != 'bytes' or start != expected_start or total == '*':
+            return None
+        return int(total)
+    except ValueError:
+        return None
 
-        total, used, free = shutil.disk_usage(FILE_STORAGE['base_dir'])
-        usage_percent = (used / total) * 100 if total > 0 else 0
+def discard_partial_download(local_path):
+    """删除未完成的下载片段及其续传信息"""
+    for path in (f"{local_path}.part", f"{local_path}.part.meta"):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def start_download_workers():
+    """按需启动常驻下载线程（每个进程只启动一次，fork 后自动重建）"""
+    with DOWNLOAD_POOL['lock']:
+        if DOWNLOAD_POOL['pid'] == os.getpid():
+            return
+
+        # gunicorn fork 之后，父进程的线程和队列不可用，需要重新创建
+        if DOWNLOAD_POOL['pid'] is not None:
+            DOWNLOAD_POOL['queue'] = queue.PriorityQueue()
+            DOWNLOAD_POOL['jobs'] = {}
+
+        DOWNLOAD_POOL['pid'] = os.getpid()
+        DOWNLOAD_POOL['workers'] = []
+        for index in range(max(1, CONFIG['DOWNLOAD_WORKERS'])):
+            worker = threading.Thread(target=download_worker, name=f"download-worker-{index}")
+            worker.daemon = True
+            worker.start()
+            DOWNLOAD_POOL['workers'].append(worker)
+
+    print(f"⬇️  下载线程池已启动: {CONFIG['DOWNLOAD_WORKERS']} 个工作线程")
+
+def enqueue_download(remote_url, local_path, file_type, priority=0, episode_id=None):
+    """将下载任务加入队列，按本地路径去重；priority 越小越先下载"""
+    if not remote_url or not local_path:
+        return None
 
-        return {
-            'total_space': total,
-            'used_space': used,
-            'free_space': free,
-            'usage_percent': usage_percent
-        }
-    except Exception as e:
-        print(f"获取存储信息失败: {e}")
+    if os.path.exists(local_path):
         return None
 
+    start_download_workers()
+
+    with DOWNLOAD_POOL['lock']:
+        job = DOWNLOAD_POOL['jobs'].get(local_path)
+        if job:
+            # 已在队列中：只在优先级更高时重新排队，旧条目会被工作线程跳过
+            if job['state'] == 'queued' and priority < job['priority']:
+                job['priority'] = priority
+                DOWNLOAD_POOL['queue'].put((priority, next(DOWNLOAD_POOL['sequence']), local_path))
+            return job
+
+        job = {
+            'local_path': local_path,
+            'remote_url': remote_url,
+            'file_type': file_type,
+            'episode_id': episode_id,
+            'priority': priority,
+            'state': 'queued',
+            'queued_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'error': None
+        }
+        DOWNLOAD_POOL['jobs'][local_path] = job
+        DOWNLOAD_POOL['queue'].put((priority, next(DOWNLOAD_POOL['sequence']), local_path))
+        return job
+
+def download_worker():
+    """下载工作线程：循环从优先级队列中取任务执行"""
+    pool_queue = DOWNLOAD_POOL['queue']
+    while True:
+        priority, _, local_path = pool_queue.get()
+        try:
+            with DOWNLOAD_POOL['lock']:
+                job = DOWNLOAD_POOL['jobs'].get(local_path)
+                # 跳过已被重新排队（优先级变化）或已处理的过期条目
+                if not job or job['state'] != 'queued' or job['priority'] != priority:
+                    continue
+                job['state'] = 'running'
+                job['started_at'] = time.time()
+
+            success = False
+            DOWNLOAD_FAILURE.reason = None
+            try:
+                success = download_file_if_needed(job['remote_url'], job['local_path'], job['file_type'], throttle=True)
+            except Exception as e:
+                DOWNLOAD_FAILURE.reason = str(e)
+
+            with DOWNLOAD_POOL['lock']:
+                if not success:
+                    job['error'] = DOWNLOAD_FAILURE.reason or '下载失败'
+                job['state'] = 'done' if success else 'failed'
+                job['finished_at'] = time.time()
+                DOWNLOAD_POOL['jobs'].pop(local_path, None)
+                DOWNLOAD_POOL['finished'].appendleft(job)
+        finally:
+            pool_queue.task_done()
+
+def get_download_jobs():
+    """查询下载任务：排队中、下载中和最近完成的任务"""
+    with DOWNLOAD_POOL['lock']:
+        active = [dict(job) for job in DOWNLOAD_POOL['jobs'].values()]
+        finished = [dict(job) for job in DOWNLOAD_POOL['finished']]
+
+    queued = sorted((job for job in active if job['state'] == 'queued'), key=lambda job: job['priority'])
+    running = [job for job in active if job['state'] == 'running']
+
+    return {
+        'workers': len(DOWNLOAD_POOL['workers']) if DOWNLOAD_POOL['pid'] == os.getpid() else 0,
+        'queued': queued,
+        'running': running,
+        'finished': finished
+    }
+
 def cleanup_old_files(max_age_days=30):
-    """清理旧文件以释放空间"""
-    try:
-        import time
-        current_time = time.time()
-        max_age_seconds = max_age_days * 24 * 60 * 60
-        cleaned_files = []
-
-        for root, dirs, files in os.walk(FILE_STORAGE['base_dir']):
-            for file in files:
-                file_path = os.path.join(root, file)
-                file_age = current_time - os.path.getctime(file_path)
-
-                if file_age > max_age_seconds:
-                    os.remove(file_path)
-                    cleaned_files.append(file_path)
-                    print(f"已清理旧文件: {file_path}")
-
-        # 清理空目录
-        for root, dirs, files in os.walk(FILE_STORAGE['base_dir'], topdown=False):
-            for dir in dirs:
-                dir_path = os.path.join(root, dir)
-                if not os.listdir(dir_path):
-                    os.rmdir(dir_path)
-                    print(f"已清理空目录: {dir_path}")
-
-        return len(cleaned_files)
+    """清理旧文件以释放空间（按存储清单中的下载时间）"""
+    try:
+        cutoff = time.time() - max_age_days * 24 * 60 * 60
+        rows = get_manifest_db().execute(
+            'SELECT path, file_type, size FROM files WHERE downloaded_at < ?', (cutoff,)
+        ).fetchall()
+
+        cleaned_count = 0
+        for row in rows:
+            if remove_cached_file(os.path.join(FILE_STORAGE['base_dir'], row['path'])):
+                cleaned_count += 1
+                inc_metric('podcast_cache_evictions_total', file_type=row['file_type'], reason='age')
+                inc_metric('podcast_cache_evicted_bytes_total', row['size'], file_type=row['file_type'], reason='age')
+                print(f"已清理旧文件: {row['path']}")
+
+        if cleaned_count:
+            publish_cache_stats()
+        return cleaned_count
     except Exception as e:
         print(f"清理文件失败: {e}")
         return 0
 
+def remove_cached_file(file_path):
+    """删除缓存文件并同步存储清单、全文索引等；同时删除空的播客目录和不再被引用的内容对象"""
+    try:
+        entry = get_manifest_file(file_path)
+    except sqlite3.Error:
+        entry = None
+
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"删除文件失败 {file_path}: {e}")
+        return False
+
+    handle_removed_file(file_path)
+    if entry and entry['checksum']:
+        release_content_object(entry['checksum'])
+
+    # 清理空目录
+    dir_path = os.path.dirname(file_path)
+    try:
+        if not os.listdir(dir_path):
+            os.rmdir(dir_path)
+            print(f"已清理空目录: {dir_path}")
+    except OSError:
+        pass
+    return True
+
+def get_remote_file_size(remote_url):
+    """用 HEAD 请求查询上游文件大小，失败或未提供长度时返回 None"""
+    try:
+        response = get_upstream_session().head(remote_url, headers={'Accept-Encoding': 'identity'},
+                                               allow_redirects=True, timeout=CONFIG['UPSTREAM_TIMEOUT'])
+    except requests.RequestException as e:
+        print(f"查询上游文件大小失败 {remote_url}: {e}")
+        return None
+    if response.status_code != 200 or not response.headers.get('Content-Length'):
+        return None
+    return int(response.headers['Content-Length'])
+
+def verify_cached_file(row):
+    """校验一个缓存文件，返回 ok/corrupt/missing/unknown
+
+    有校验和的文件重新计算 SHA-256 比较；升级前下载、没有校验和的文件先与上游的
+    文件大小比较，一致后记录校验和。损坏或被截断的文件删除后重新加入下载队列。
+    """
+    local_path = os.path.join(FILE_STORAGE['base_dir'], row['path'])
+    if not os.path.isfile(local_path):
+        handle_removed_file(local_path)
+        return 'missing'
+
+    remote_url, episode_id = find_remote_file(local_path, row['file_type'])
+    size = os.path.getsize(local_path)
+    if row['checksum']:
+        checksum = compute_file_checksum(local_path) if size == row['size'] else None
+        valid = checksum == row['checksum']
+    else:
+        if remote_url:
+            remote_size = get_remote_file_size(remote_url)
+            if remote_size is None:
+                return 'unknown'
+            valid = size == remote_size
+        else:
+            # 已不在索引中的文件无法与上游比较，直接记录当前内容
+            valid = True
+        checksum = compute_file_checksum(local_path) if valid else None
+        if valid:
+            db = get_manifest_db()
+            with db:
+                db.execute('UPDATE files SET checksum = ?, size = ? WHERE path = ?', (checksum, size, row['path']))
+
+    if not valid:
+        print(f"⚠️  缓存文件已损坏，重新下载: {row['path']}")
+        remove_cached_file(local_path)
+        if remote_url:
+            enqueue_download(remote_url, local_path, row['file_type'], 0, episode_id)
+        return 'corrupt'
+
+    if link_content_object(local_path, checksum):
+        inc_metric('podcast_dedup_links_total', file_type=row['file_type'])
+    record_file_verified(local_path)
+    return 'ok'
+
+def verify_cached_files():
+    """增量校验缓存文件：未校验过的优先，其次是最久未校验的，每轮最多读取 VERIFY_BATCH_MB"""
+    cutoff = time.time() - CONFIG['VERIFY_INTERVAL']
+    rows = get_manifest_db().execute(
+        'SELECT f.path, f.file_type, f.size, f.checksum FROM files f '
+        'LEFT JOIN verified v ON v.path = f.path '
+        'WHERE v.verified_at IS NULL OR v.verified_at < ? '
+        'ORDER BY v.verified_at IS NOT NULL, v.verified_at, f.downloaded_at DESC',
+        (cutoff,)
+    ).fetchall()
+    if not rows:
+        return None
+
+    budget = CONFIG['VERIFY_BATCH_MB'] * 1024 * 1024
+    results = {'ok': 0, 'corrupt': 0, 'missing': 0, 'unknown': 0}
+    started = time.monotonic()
+    checked_bytes = 0
+    for row in rows:
+        if checked_bytes >= budget:
+            break
+        result = verify_cached_file(row)
+        results[result] += 1
+        inc_metric('podcast_integrity_checks_total', file_type=row['file_type'], result=result)
+        if result == 'unknown':
+            # 上游不可用，下一轮再试
+            break
+        checked_bytes += row['size']
+
+    results['orphan_objects'] = collect_orphan_objects()
+    results['pending'] = len(rows) - results['ok'] - results['corrupt'] - results['missing']
+    results['finished_at'] = time.time()
+    print(f"🔍 已校验 {results['ok']} 个缓存文件 ({(time.monotonic() - started) * 1000:.0f} ms)，"
+          f"损坏 {results['corrupt']}，待校验 {results['pending']}")
+    return results
+
+def get_cache_budgets():
+    """各类型文件的缓存容量预算（字节）"""
+    return {
+        'audio': CONFIG['AUDIO_CACHE_BUDGET_MB'] * 1024 * 1024,
+        'transcript': CONFIG['TRANSCRIPT_CACHE_BUDGET_MB'] * 1024 * 1024
+    }
+
+def get_pinned_episode_ids():
+    """始终保留在本地的播客：最新的 CACHE_PINNED_EPISODES 期"""
+    episodes = get_episode_index()['episodes']
+    return {podcast.get('id') for podcast in episodes[:max(0, CONFIG['CACHE_PINNED_EPISODES'])]}
+
+def enforce_cache_budget():
+    """按容量预算淘汰文件，返回 (淘汰文件数, 释放字节数)
+
+    淘汰顺序由 CACHE_EVICTION_POLICY 决定，最新的几期播客不参与淘汰。
+    """
+    if cache['data'] is None:
+        # 索引尚未加载时无法确定哪些播客需要固定
+        return 0, 0
+
+    if CONFIG['CACHE_EVICTION_POLICY'] == 'lfu':
+        order_by = 'access_count ASC, last_access ASC'
+    else:
+        order_by = 'last_access ASC'
+
+    evicted_count = 0
+    freed_bytes = 0
+    with state_file_lock('eviction'):
+        db = get_manifest_db()
+        usage = get_cache_usage()
+        pinned = get_pinned_episode_ids()
+
+        for file_type, budget in get_cache_budgets().items():
+            excess = usage[file_type] - budget
+            if excess <= 0:
+                continue
+
+            candidates = db.execute(
+                f'SELECT path, episode_id, size, checksum FROM files WHERE file_type = ? ORDER BY {order_by}',
+                (file_type,)
+            ).fetchall()
+            for row in candidates:
+                if excess <= 0:
+                    break
+                if row['episode_id'] in pinned:
+                    continue
+                # 与其他文件共享内容时，删除后不释放空间
+                shared = row['checksum'] and db.execute(
+                    'SELECT COUNT(*) FROM files WHERE checksum = ?', (row['checksum'],)
+                ).fetchone()[0] > 1
+                if remove_cached_file(os.path.join(FILE_STORAGE['base_dir'], row['path'])):
+                    with db:
+                        db.execute('INSERT OR REPLACE INTO evicted (path, evicted_at) VALUES (?, ?)',
+                                   (row['path'], time.time()))
+                    if not shared:
+                        excess -= row['size']
+                        freed_bytes += row['size']
+                    evicted_count += 1
+                    inc_metric('podcast_cache_evictions_total', file_type=file_type, reason='budget')
+                    inc_metric('podcast_cache_evicted_bytes_total', row['size'], file_type=file_type, reason='budget')
+
+            if excess > 0:
+                print(f"⚠️  {file_type} 缓存超出预算 {excess} 字节，剩余文件均为固定的最新播客")
+
+    if evicted_count:
+        print(f"🧹 已淘汰 {evicted_count} 个缓存文件，释放 {freed_bytes / 1024 / 1024:.1f} MB")
+        publish_cache_stats()
+    return evicted_count, freed_bytes
+
+def start_cache_evictor():
+    """按需启动后台淘汰线程（每个进程一个，fork 后重新创建）"""
+    with CACHE_EVICTOR['lock']:
+        if CACHE_EVICTOR['pid'] == os.getpid():
+            return
+        CACHE_EVICTOR['pid'] = os.getpid()
+        CACHE_EVICTOR['event'] = threading.Event()
+        thread = threading.Thread(target=cache_evictor_loop, name='cache-evictor')
+        thread.daemon = True
+        thread.start()
+        CACHE_EVICTOR['thread'] = thread
+
+def request_cache_eviction():
+    """通知后台线程立即检查缓存预算"""
+    start_cache_evictor()
+    CACHE_EVICTOR['event'].set()
+
+def cache_evictor_loop():
+    """后台淘汰线程：定期或被通知时执行淘汰"""
+    event = CACHE_EVICTOR['event']
+    while True:
+        event.wait(CONFIG['CACHE_EVICTION_INTERVAL'])
+        event.clear()
+        try:
+            evicted_count, freed_bytes = enforce_cache_budget()
+            CACHE_EVICTOR['last_run'] = time.time()
+            CACHE_EVICTOR['last_evicted'] = evicted_count
+            CACHE_EVICTOR['last_freed'] = freed_bytes
+        except Exception as e:
+            print(f"缓存淘汰失败: {e}")
+
+def get_cache_policy_status():
+    """缓存预算、用量和淘汰状态"""
+    usage = get_cache_usage()
+    budgets = get_cache_budgets()
+    return {
+        'policy': CONFIG['CACHE_EVICTION_POLICY'],
+        'pinned_episodes': CONFIG['CACHE_PINNED_EPISODES'],
+        'budgets': budgets,
+        'usage': {file_type: usage[file_type] for file_type in budgets},
+        'evicted_files': get_manifest_db().execute('SELECT COUNT(*) FROM evicted').fetchone()[0],
+        'last_run': CACHE_EVICTOR['last_run'] if CACHE_EVICTOR['pid'] == os.getpid() else None,
+        'last_evicted': CACHE_EVICTOR['last_evicted'],
+        'last_freed': CACHE_EVICTOR['last_freed']
+    }
+
+def find_remote_file(local_path, file_type):
+    """根据本地路径找到索引中对应的远程文件，返回 (remote_url, episode_id)"""
+    get_podcast_index()
+    for podcast in get_episode_index()['episodes']:
+        remote_path = podcast.get(f'{file_type}_path')
+        if remote_path and get_local_file_path(remote_path, file_type) == local_path:
+            return f"{CONFIG['BASE_URL']}{remote_path.replace('./', '/')}", podcast.get('id')
+    return None, None
+
+def handle_downloaded_file(local_path, file_type, checksum=None):
+    """文件下载完成后的处理：记录到存储清单，其余耗时的处理交给后处理线程"""
+    try:
+        if link_content_object(local_path, checksum):
+            inc_metric('podcast_dedup_links_total', file_type=file_type)
+        record_manifest_file(local_path, file_type, checksum)
+        if checksum:
+            # 下载时已校验长度并计算校验和
+            record_file_verified(local_path)
+        if get_cache_usage()[file_type] > get_cache_budgets()[file_type]:
+            request_cache_eviction()
+        publish_cache_stats()
+    except Exception as e:
+        print(f"更新存储清单失败 {local_path}: {e}")
+
+    if file_type == 'audio' or (file_type == 'transcript' and local_path.endswith('.html')):
+        enqueue_postprocess(local_path, file_type)
+
+def start_postprocess_worker():
+    """按需启动后处理线程（每个进程一个，fork 后重新创建）"""
+    with POSTPROCESS['lock']:
+        if POSTPROCESS['pid'] == os.getpid():
+            return
+        POSTPROCESS['pid'] = os.getpid()
+        POSTPROCESS['queue'] = queue.Queue()
+        POSTPROCESS['pending'] = set()
+        thread = threading.Thread(target=postprocess_worker, name='postprocess-worker')
+        thread.daemon = True
+        thread.start()
+        POSTPROCESS['thread'] = thread
+
+def enqueue_postprocess(local_path, file_type):
+    """将下载完成的文件加入后处理队列，按本地路径去重
+
+    进程退出时未处理的文件不会丢失结果：结构化文稿在首次请求时生成，没有压缩副本时发送原文件，
+    全文索引在每个进程启动时补充同步，音频元数据由启动补扫读取。
+    """
+    start_postprocess_worker()
+    with POSTPROCESS['lock']:
+        if local_path in POSTPROCESS['pending']:
+            return
+        POSTPROCESS['pending'].add(local_path)
+    POSTPROCESS['queue'].put((local_path, file_type))
+
+def postprocess_worker():
+    """后处理线程：读取音频元数据，或生成结构化文稿、压缩副本并更新全文索引"""
+    task_queue = POSTPROCESS['queue']
+    while True:
+        local_path, file_type = task_queue.get()
+        with POSTPROCESS['lock']:
+            POSTPROCESS['pending'].discard(local_path)
+        try:
+            if not os.path.exists(local_path):
+                continue
+            if file_type == 'audio':
+                record_audio_metadata(local_path)
+            else:
+                extract_transcript_structure(local_path)
+                build_transcript_variants(local_path)
+                index_transcript_file(local_path)
+        except Exception as e:
+            print(f"处理下载文件失败 {local_path}: {e}")
+        finally:
+            task_queue.task_done()
+
+def handle_removed_file(file_path):
+    """文件被删除后的处理：从存储清单和全文索引中移除"""
+    try:
+        remove_manifest_file(file_path)
+    except Exception as e:
+        print(f"更新存储清单失败 {file_path}: {e}")
+
+    transcript_dir = os.path.abspath(FILE_STORAGE['transcript_dir'])
+    if file_path.endswith('.html') and os.path.abspath(file_path).startswith(transcript_dir + os.sep):
+        try:
+            remove_transcript_from_index(os.path.basename(os.path.dirname(file_path)))
+            derived_paths = [get_transcript_structure_path(file_path)]
+            derived_paths.extend(get_transcript_variant_paths(file_path).values())
+            for derived_path in derived_paths:
+                if os.path.exists(derived_path):
+                    os.remove(derived_path)
+        except Exception as e:
+            print(f"移除文稿数据失败 {file_path}: {e}")
+
+def find_local_transcript(episode_id):
+    """根据播客ID找到本地文稿路径，返回 (local_path, remote_url)"""
+    episode = get_episode_index()['by_id'].get(episode_id)
+    if episode and episode.get('transcript_path'):
+        remote_url = f"{CONFIG['BASE_URL']}{episode['transcript_path'].replace('./', '/')}"
+        return get_local_file_path(episode['transcript_path'], 'transcript'), remote_url
+
+    # 不在索引中时按默认目录结构查找（只允许安全的目录名）
+    if not re.fullmatch(r'[\w-]+', episode_id):
+        return None, None
+    return os.path.join(FILE_STORAGE['transcript_dir'], episode_id, 'summary.html'), None
+
 def process_podcast_files(podcasts_data):
     """处理播客文件，确保所有文件都在本地"""
     processed_podcasts = []
 
-    # 检查存储空间
-    storage_info = get_storage_info()
-    if storage_info and storage_info['usage_percent'] > 90:
-        print(f"⚠️  存储空间使用率过高: {storage_info['usage_percent']:.1f}%")
-        # 清理30天前的文件
-        cleaned_count = cleanup_old_files(30)
-        print(f"🧹 已清理 {cleaned_count} 个旧文件")
+    # 最新的播客优先下载
+    download_rank = {
+        id(podcast): rank
+        for rank, podcast in enumerate(sorted(podcasts_data, key=get_episode_sort_key, reverse=True))
+    }
+
+    # 被淘汰的旧文件不再主动下载，等到再次被访问时才重新缓存；固定的最新播客总是下载
+    evicted_paths = get_evicted_paths()
+
+    def enqueue_if_cached(remote_url, local_path, file_type, priority, episode_id):
+        if local_path in evicted_paths:
+            if priority >= CONFIG['CACHE_PINNED_EPISODES']:
+                return
+            clear_evicted_file(local_path)
+        enqueue_download(remote_url, local_path, file_type, priority, episode_id)
 
     for podcast in podcasts_data:
         processed_podcast = podcast.copy()
+        priority = download_rank[id(podcast)]
 
         # 处理音频文件
         if podcast.get('audio_path'):
             audio_url = f"{CONFIG['BASE_URL']}{podcast['audio_path'].replace('./', '/')}"
             local_audio_path = get_local_file_path(podcast['audio_path'], 'audio')
 
-            # 异步下载音频文件
-            def download_audio():
-                download_file_if_needed(audio_url, local_audio_path, 'audio')
-
-            thread = threading.Thread(target=download_audio)
-            thread.daemon = True
-            thread.start()
+            # 加入下载队列（由常驻下载线程执行）
+            enqueue_if_cached(audio_url, local_audio_path, 'audio', priority, podcast.get('id'))
 
             if local_audio_path:
                 processed_podcast['local_audio_path'] = f"/files/audio/{os.path.basename(os.path.dirname(local_audio_path))}/{os.path.basename(local_audio_path)}"
@@ -220,77 +1485,895 @@ def process_podcast_files(podcasts_data):
             transcript_url = f"{CONFIG['BASE_URL']}{podcast['transcript_path'].replace('./', '/')}"
             local_transcript_path = get_local_file_path(podcast['transcript_path'], 'transcript')
 
-            # 异步下载文稿文件
-            def download_transcript():
-                download_file_if_needed(transcript_url, local_transcript_path, 'transcript')
-
-            thread = threading.Thread(target=download_transcript)
-            thread.daemon = True
-            thread.start()
+            # 加入下载队列（由常驻下载线程执行）
+            enqueue_if_cached(transcript_url, local_transcript_path, 'transcript', priority, podcast.get('id'))
 
             if local_transcript_path:
                 processed_podcast['local_transcript_path'] = f"/files/transcripts/{os.path.basename(os.path.dirname(local_transcript_path))}/{os.path.basename(local_transcript_path)}"
 
         processed_podcasts.append(processed_podcast)
 
+    # 检查缓存预算（在后台线程中淘汰）
+    request_cache_eviction()
+
     return processed_podcasts
 
+def fetch_podcast_index(conditional=True):
+    """从上游获取播客索引，返回 (data, not_modified)
+
+    对主数据源和备用数据源发起对冲请求；对当前数据所来自的数据源发送
+    If-None-Match/If-Modified-Since，未变化时上游只需返回 304。
+    """
+    validators = cache['validators']
+
+    def build_headers(source):
+        headers = {}
+        if conditional and cache['data'] is not None and validators.get('source') == source:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    result = hedged_upstream_fetch(
+        [('主数据源', CONFIG['DATA_SOURCE']), ('备用数据源', CONFIG['BACKUP_DATA_SOURCE'])],
+        build_headers
+    )
+    if result is None:
+        return None, False
+
+    label, source, response, data = result
+    if response.status_code == 304:
+        print(f"{label}未变化 (304)")
+        return None, True
+
+    cache['validators'] = {
+        'source': source,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified')
+    }
+    return data, False
+
+def get_index_snapshot_path():
+    """索引快照文件路径"""
+    return os.path.join(FILE_STORAGE['state_dir'], 'podcast_index.snapshot.json')
+
+def write_index_snapshot():
+    """将当前索引原子写入快照文件，供其他 worker 和重启后加载"""
+    snapshot_path = get_index_snapshot_path()
+    temp_path = f"{snapshot_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    snapshot = {
+        'format': INDEX_SNAPSHOT_FORMAT,
+        'generation': cache['generation'],
+        'fetched_at': cache['timestamp'],
+        'validators': cache['validators'],
+        'data': cache['data']
+    }
+
+    try:
+        os.makedirs(FILE_STORAGE['state_dir'], exist_ok=True)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(temp_path, snapshot_path)
+        stat = os.stat(snapshot_path)
+        cache['snapshot_signature'] = (stat.st_mtime_ns, stat.st_size)
+    except Exception as e:
+        print(f"写入索引快照失败: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def sync_index_snapshot(force=False):
+    """检查快照文件是否有更新的版本（其他 worker 写入），有则加载到内存缓存"""
+    current_time = time.time()
+    if not force and current_time - cache['snapshot_checked_at'] < CONFIG['SNAPSHOT_CHECK_INTERVAL']:
+        return False
+    cache['snapshot_checked_at'] = current_time
+
+    # 先比较 mtime 和大小，未变化时不读取文件
+    try:
+        stat = os.stat(get_index_snapshot_path())
+    except FileNotFoundError:
+        return False
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if signature == cache['snapshot_signature']:
+        return False
+
+    try:
+        with open(get_index_snapshot_path(), 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"读取索引快照失败: {e}")
+        return False
+    cache['snapshot_signature'] = signature
+
+    if snapshot.get('format') != INDEX_SNAPSHOT_FORMAT or not snapshot.get('data'):
+        return False
+
+    # 只接受比内存中更新的版本
+    if (snapshot['generation'], snapshot['fetched_at']) <= (cache['generation'], cache['timestamp']):
+        return False
+
+    cache['data'] = snapshot['data']
+    cache['timestamp'] = snapshot['fetched_at']
+    cache['validators'] = snapshot.get('validators') or {}
+    cache['generation'] = snapshot['generation']
+    print(f"📥 已加载索引快照 (版本 {cache['generation']})")
+    get_episode_index()
+    return True
+
+def is_index_fresh():
+    """内存中的索引是否在缓存有效期内"""
+    return (cache['data'] is not None and
+            datetime.now().timestamp() - cache['timestamp'] < CONFIG['CACHE_DURATION'])
+
+def refresh_podcast_index(conditional=True):
+    """刷新播客索引缓存，并发调用会合并为一次上游请求（single-flight）"""
+    with cache['refresh_lock']:
+        event = cache['refresh_event']
+        is_leader = event is None
+        if is_leader:
+            event = threading.Event()
+            cache['refresh_event'] = event
+
+    # 已有刷新在进行中，等待其完成并共享结果
+    if not is_leader:
+        event.wait()
+        return cache['data'] is not None
+
+    try:
+        with state_file_lock('index_refresh'):
+            # 等待文件锁期间，其他 worker 可能已经完成了刷新
+            sync_index_snapshot(force=True)
+            if conditional and is_index_fresh():
+                return True
+
+            changed_ids = take_pending_episode_changes()
+            data, not_modified = fetch_podcast_index(conditional)
+            current_time = datetime.now().timestamp()
+            old_podcasts = (cache['data'] or {}).get('podcasts', [])
+
+            if not_modified:
+                # 索引未变化但推送修改了某些播客的文件：只重新下载这些文件
+                if changed_ids:
+                    INDEX_SYNC['last_result'] = sync_episode_files(old_podcasts, old_podcasts, changed_ids)
+                    process_podcast_files(old_podcasts)
+                cache['timestamp'] = current_time
+                write_index_snapshot()
+                inc_metric('podcast_index_refreshes_total', result='not_modified')
+                return True
+
+            if data is None:
+                restore_pending_episode_changes(changed_ids)
+                inc_metric('podcast_index_refreshes_total', result='failed')
+                return False
+
+            # 与当前索引比较：删除已移除播客的文件，变化的播客重新下载；新播客和缺失文件由下载队列处理
+            INDEX_SYNC['last_result'] = sync_episode_files(old_podcasts, data.get('podcasts', []), changed_ids)
+            processed_data = process_podcast_files(data.get('podcasts', []))
+
+            # 整体替换缓存并写入新版本快照，并通知所有打开的页面
+            cache['data'] = {'podcasts': processed_data}
+            cache['timestamp'] = current_time
+            cache['generation'] += 1
+            write_index_snapshot()
+            publish_event('index', get_index_event_data())
+            inc_metric('podcast_index_refreshes_total', result='updated')
+            return True
+    finally:
+        with cache['refresh_lock']:
+            cache['refresh_event'] = None
+        event.set()
+
+def sync_episode_files(old_podcasts, new_podcasts, changed_ids=()):
+    """比较新旧索引，删除已移除播客的本地文件，以及文件路径变化或被推送修改的播客的旧文件
+
+    被删除的文件随后由 process_podcast_files 重新加入下载队列，未变化的播客不做任何处理。
+    """
+    old_by_id = {podcast.get('id'): podcast for podcast in old_podcasts}
+    new_by_id = {podcast.get('id'): podcast for podcast in new_podcasts}
+
+    added = [episode_id for episode_id in new_by_id if episode_id not in old_by_id]
+    removed = [episode_id for episode_id in old_by_id if episode_id not in new_by_id]
+    changed = [
+        episode_id for episode_id, podcast in new_by_id.items()
+        if episode_id in old_by_id and (
+            episode_id in changed_ids or
+            podcast.get('audio_path') != old_by_id[episode_id].get('audio_path') or
+            podcast.get('transcript_path') != old_by_id[episode_id].get('transcript_path')
+        )
+    ]
+
+    for episode_id in removed + changed:
+        remove_episode_files(old_by_id[episode_id])
+    if removed or changed:
+        publish_cache_stats()
+
+    if added or removed or changed:
+        print(f"🔀 索引变化: 新增 {len(added)}，更新 {len(changed)}，移除 {len(removed)}")
+    return {
+        'added': added,
+        'changed': changed,
+        'removed': removed,
+        'finished_at': time.time()
+    }
+
+def remove_episode_files(podcast):
+    """删除一期播客的本地音频和文稿"""
+    for file_type in ('audio', 'transcript'):
+        local_path = get_local_file_path(podcast.get(f'{file_type}_path'), file_type)
+        if local_path and os.path.exists(local_path):
+            remove_cached_file(local_path)
+
+def take_pending_episode_changes():
+    """取出等待同步的播客ID"""
+    with INDEX_SYNC['lock']:
+        changed_ids = INDEX_SYNC['pending_ids']
+        INDEX_SYNC['pending_ids'] = set()
+    return changed_ids
+
+def restore_pending_episode_changes(changed_ids):
+    """同步失败时放回等待同步的播客ID，下次刷新时再处理"""
+    if changed_ids:
+        with INDEX_SYNC['lock']:
+            INDEX_SYNC['pending_ids'].update(changed_ids)
+
+def get_changed_episode_ids(paths):
+    """把推送中变化的文件路径映射为播客ID（文件所在目录名，或路径中已知的播客ID）"""
+    known_ids = get_episode_index()['by_id']
+    episode_ids = set()
+    for path in paths:
+        parts = [part for part in path.split('/') if part]
+        matched = [part for part in parts if part in known_ids]
+        if matched:
+            episode_ids.add(matched[-1])
+        elif len(parts) >= 2 and parts[-1].endswith(('.mp3', '.html', '.txt')):
+            episode_ids.add(parts[-2])
+    return episode_ids
+
+def schedule_index_sync(episode_ids=()):
+    """安排后台同步索引；多次推送在同步开始前会合并为一次"""
+    with INDEX_SYNC['lock']:
+        INDEX_SYNC['pending_ids'].update(episode_ids)
+        if INDEX_SYNC['pid'] != os.getpid():
+            INDEX_SYNC['pid'] = os.getpid()
+            INDEX_SYNC['event'] = threading.Event()
+            thread = threading.Thread(target=index_sync_loop, name='index-sync')
+            thread.daemon = True
+            thread.start()
+            INDEX_SYNC['thread'] = thread
+        INDEX_SYNC['event'].set()
+
+def index_sync_loop():
+    """后台同步线程：收到通知后强制刷新索引（不使用条件请求）"""
+    event = INDEX_SYNC['event']
+    while True:
+        event.wait()
+        event.clear()
+        try:
+            if refresh_podcast_index(conditional=False):
+                print("数据已成功同步")
+            else:
+                print("数据同步失败")
+            INDEX_SYNC['last_run'] = time.time()
+            # 本次刷新若是等待了其他刷新的结果，推送的播客ID可能还未处理
+            with INDEX_SYNC['lock']:
+                if INDEX_SYNC['pending_ids']:
+                    event.set()
+        except Exception as e:
+            print(f"同步索引失败: {e}")
+
+def start_sync_scheduler():
+    """启动后台同步线程；各 worker 都会启动，但只有获得文件锁的一个真正运行"""
+    if not CONFIG['SYNC_ENABLED'] or fcntl is None:
+        return
+    with SYNC_SCHEDULER['lock']:
+        if SYNC_SCHEDULER['pid'] == os.getpid():
+            return
+        SYNC_SCHEDULER['pid'] = os.getpid()
+        thread = threading.Thread(target=sync_scheduler_loop, name='sync-scheduler')
+        thread.daemon = True
+        thread.start()
+        SYNC_SCHEDULER['thread'] = thread
+
+def sync_scheduler_loop():
+    """等待成为运行者（持有锁的进程退出后由其他 worker 接替），然后循环执行同步"""
+    os.makedirs(FILE_STORAGE['state_dir'], exist_ok=True)
+    # 锁文件在线程中打开，fork 出的子进程不会继承锁
+    lock_file = open(os.path.join(FILE_STORAGE['state_dir'], 'sync_scheduler.lock'), 'a')
+    while True:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except OSError:
+            time.sleep(CONFIG['SYNC_POLL_INTERVAL'])
+
+    print(f"🛰️  后台同步已启动 (进程 {os.getpid()})")
+    update_sync_status(leader_pid=os.getpid(), state='idle', failures=0)
+    synced_generation = None
+    last_pass = 0
+    failures = 0
+    while True:
+        try:
+            backoff_until = SYNC_SCHEDULER['status'].get('backoff_until') or 0
+            if time.time() >= backoff_until:
+                # 保持索引新鲜（过期时条件请求上游），索引变化或到达检查间隔时预下载缺失文件
+                get_podcast_index()
+                if cache['data'] is not None and (cache['generation'] != synced_generation or
+                                                  time.time() - last_pass >= CONFIG['SYNC_INTERVAL']):
+                    generation = cache['generation']
+                    if prefetch_missing_files():
+                        failures = 0
+                        synced_generation = generation
+                        last_pass = time.time()
+                        update_sync_status(state='idle', failures=0, backoff_until=None)
+                    else:
+                        failures += 1
+                        backoff = min(CONFIG['SYNC_BACKOFF_MAX'], CONFIG['SYNC_BACKOFF_BASE'] * 2 ** (failures - 1))
+                        print(f"⏸️  上游下载失败，{backoff} 秒后重试")
+                        update_sync_status(state='backoff', failures=failures, backoff_until=time.time() + backoff)
+                if cache['data'] is not None and SYNC_SCHEDULER['status'].get('state') == 'idle':
+                    # 空闲时增量校验已缓存文件，损坏的文件会重新加入下载队列
+                    verification = verify_cached_files()
+                    if verification:
+                        update_sync_status(last_verification=verification)
+        except Exception as e:
+            print(f"后台同步出错: {e}")
+            update_sync_status(last_error=str(e))
+        time.sleep(CONFIG['SYNC_POLL_INTERVAL'])
+
+def get_missing_files():
+    """按最新优先列出需要预下载的文件: [(优先级, 播客ID, 类型, 远程地址, 本地路径)]"""
+    evicted_paths = get_evicted_paths()
+    missing = []
+    for rank, podcast in enumerate(get_episode_index()['episodes']):
+        for file_type in ('audio', 'transcript'):
+            remote_path = podcast.get(f'{file_type}_path')
+            local_path = get_local_file_path(remote_path, file_type)
+            if not local_path or os.path.exists(local_path):
+                continue
+            # 被淘汰的旧文件不预下载，固定的最新播客总是下载
+            if local_path in evicted_paths and rank >= CONFIG['CACHE_PINNED_EPISODES']:
+                continue
+            missing.append((rank, podcast.get('id'), file_type,
+                            f"{CONFIG['BASE_URL']}{remote_path.replace('./', '/')}", local_path))
+    return missing
+
+def prefetch_missing_files():
+    """按批预下载缺失文件（每批 SYNC_CONCURRENCY 个），超出缓存预算时停止；返回是否未遇到上游错误"""
+    missing = get_missing_files()
+    progress = {
+        'started_at': time.time(),
+        'finished_at': None,
+        'generation': cache['generation'],
+        'total': len(missing),
+        'completed': 0,
+        'failed': 0,
+        'skipped': 0,
+        'bytes': 0
+    }
+    update_sync_status(state='prefetching', current_pass=progress)
+    if missing:
+        print(f"🛰️  开始预下载 {len(missing)} 个缺失文件")
+
+    budgets = get_cache_budgets()
+    batch_size = max(1, CONFIG['SYNC_CONCURRENCY'])
+    healthy = True
+    for start in range(0, len(missing), batch_size):
+        usage = get_cache_usage()
+        batch = []
+        for rank, episode_id, file_type, remote_url, local_path in missing[start:start + batch_size]:
+            if rank >= CONFIG['CACHE_PINNED_EPISODES'] and usage[file_type] >= budgets[file_type]:
+                progress['skipped'] += 1
+                continue
+            enqueue_download(remote_url, local_path, file_type, rank, episode_id)
+            batch.append(local_path)
+
+        # 等待本批下载结束（由下载线程池执行，受带宽上限限制）
+        while True:
+            with DOWNLOAD_POOL['lock']:
+                pending = [path for path in batch if path in DOWNLOAD_POOL['jobs']]
+            if not pending:
+                break
+            time.sleep(0.5)
+
+        for local_path in batch:
+            if os.path.exists(local_path):
+                progress['completed'] += 1
+                progress['bytes'] += os.path.getsize(local_path)
+            else:
+                progress['failed'] += 1
+        update_sync_status(current_pass=progress)
+
+        # 整批失败说明上游不可用，退避后再试
+        if batch and all(not os.path.exists(path) for path in batch):
+            healthy = False
+            break
+
+    progress['finished_at'] = time.time()
+    update_sync_status(current_pass=None, last_pass=progress)
+    if missing:
+        print(f"🛰️  预下载结束: 完成 {progress['completed']}，失败 {progress['failed']}，跳过 {progress['skipped']}")
+    return healthy
+
+def update_sync_status(**fields):
+    """更新后台同步状态并原子写入状态文件"""
+    status = SYNC_SCHEDULER['status']
+    status.update(fields)
+    status['updated_at'] = time.time()
+    status_path = os.path.join(FILE_STORAGE['state_dir'], SYNC_SCHEDULER['status_file'])
+    temp_path = f"{status_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(status, f, ensure_ascii=False)
+        os.replace(temp_path, status_path)
+    except OSError as e:
+        print(f"写入同步状态失败: {e}")
+
+def get_sync_status():
+    """读取后台同步状态（由运行同步的 worker 写入）"""
+    try:
+        with open(os.path.join(FILE_STORAGE['state_dir'], SYNC_SCHEDULER['status_file']), 'r', encoding='utf-8') as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        status = {}
+    status['enabled'] = CONFIG['SYNC_ENABLED']
+    status['bandwidth_limit_kbps'] = CONFIG['SYNC_BANDWIDTH_LIMIT_KBPS']
+    status['concurrency'] = CONFIG['SYNC_CONCURRENCY']
+    return status
+
+def get_podcast_index():
+    """获取播客索引：缓存有效时直接返回；过期时按配置返回旧数据并在后台刷新"""
+    sync_index_snapshot()
+    if is_index_fresh():
+        inc_metric('podcast_index_cache_requests_total', result='hit')
+        return cache['data']
+
+    if cache['data'] is not None and CONFIG['STALE_WHILE_REVALIDATE']:
+        inc_metric('podcast_index_cache_requests_total', result='stale')
+        if cache['refresh_event'] is None:
+            thread = threading.Thread(target=refresh_podcast_index, name='index-refresh')
+            thread.daemon = True
+            thread.start()
+        return cache['data']
+
+    inc_metric('podcast_index_cache_requests_total', result='miss')
+    refresh_podcast_index()
+    return cache['data']
+
+def build_precomputed_entry(body, version, fast=False):
+    """为响应体生成原始、gzip 和 brotli 变体以及基于内容的 ETag
+
+    fast 为 True 时使用较低的压缩级别，用于不缓存或很少复用的响应。
+    """
+    variants = {'identity': body}
+    gzip_level, brotli_quality = (5, 4) if fast else (9, 11)
+
+    gzip_body = gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    if len(gzip_body) < len(body):
+        variants['gzip'] = gzip_body
+
+    if brotli is not None:
+        brotli_body = brotli.compress(body, quality=brotli_quality)
+        if len(brotli_body) < len(body):
+            variants['br'] = brotli_body
+
+    return {
+        'version': version,
+        'etag': hashlib.sha256(body).hexdigest()[:32],
+        'variants': variants
+    }
+
+def get_precomputed_entry(name, version, build_body):
+    """获取按版本缓存的响应体，版本变化时才重新序列化和压缩"""
+    with PRECOMPUTED['lock']:
+        entry = PRECOMPUTED['entries'].get(name)
+        if entry and entry['version'] == version:
+            PRECOMPUTED['entries'].move_to_end(name)
+            return entry
+
+    entry = build_precomputed_entry(build_body(), version)
+
+    with PRECOMPUTED['lock']:
+        PRECOMPUTED['entries'][name] = entry
+        PRECOMPUTED['entries'].move_to_end(name)
+        # 超出数量上限时淘汰最久未使用的响应
+        while len(PRECOMPUTED['entries']) > CONFIG['PRECOMPUTED_MAX_ENTRIES']:
+            PRECOMPUTED['entries'].popitem(last=False)
+    return entry
+
+def get_transcript_response_entry(name, version, build_body):
+    """获取文稿文章接口的压缩响应（独立于 PRECOMPUTED，不会挤掉播客列表和首页）"""
+    with TRANSCRIPT_RESPONSES['lock']:
+        entry = TRANSCRIPT_RESPONSES['entries'].get(name)
+        if entry and entry['version'] == version:
+            TRANSCRIPT_RESPONSES['entries'].move_to_end(name)
+            return entry
+
+    entry = build_precomputed_entry(build_body(), version, fast=True)
+    entry['bytes'] = sum(len(body) for body in entry['variants'].values())
+
+    with TRANSCRIPT_RESPONSES['lock']:
+        previous = TRANSCRIPT_RESPONSES['entries'].pop(name, None)
+        if previous:
+            TRANSCRIPT_RESPONSES['bytes'] -= previous['bytes']
+        TRANSCRIPT_RESPONSES['entries'][name] = entry
+        TRANSCRIPT_RESPONSES['bytes'] += entry['bytes']
+        # 超出容量时淘汰最久未使用的响应（至少保留刚生成的一个）
+        max_bytes = CONFIG['TRANSCRIPT_RESPONSE_CACHE_MB'] * 1024 * 1024
+        while TRANSCRIPT_RESPONSES['bytes'] > max_bytes and len(TRANSCRIPT_RESPONSES['entries']) > 1:
+            _, evicted = TRANSCRIPT_RESPONSES['entries'].popitem(last=False)
+            TRANSCRIPT_RESPONSES['bytes'] -= evicted['bytes']
+    return entry
+
+def choose_content_encoding(sizes):
+    """根据 Accept-Encoding 选择体积最小的可用变体（sizes: 编码 -> 字节数）"""
+    accepted = [
+        encoding for encoding in sizes
+        if encoding == 'identity' or request.accept_encodings[encoding] > 0
+    ]
+    return min(accepted, key=lambda encoding: sizes[encoding])
+
+def make_precomputed_response(entry, mimetype):
+    """返回预先生成的响应体，支持 If-None-Match (304) 和压缩协商"""
+    # 每种压缩变体使用不同的强 ETag
+    etags = {
+        encoding: entry['etag'] if encoding == 'identity' else f"{entry['etag']}-{encoding}"
+        for encoding in entry['variants']
+    }
+    encoding = choose_content_encoding({encoding: len(body) for encoding, body in entry['variants'].items()})
+
+    if any(request.if_none_match.contains_weak(etag) for etag in etags.values()):
+        response = Response(status=304)
+    else:
+        response = Response(entry['variants'][encoding], mimetype=mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+
+    response.set_etag(etags[encoding])
+    response.headers['Vary'] = 'Accept-Encoding'
+    # 浏览器可以缓存，但每次使用前需用 ETag 验证
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def make_compressed_response(body, mimetype):
+    """即时压缩并返回不缓存的响应体（例如带过滤条件的查询）"""
+    return make_precomputed_response(build_precomputed_entry(body, None, fast=True), mimetype)
+
+def is_first_page_query(query):
+    """是否为无过滤条件的第一页（首页和前端默认请求），只有这些查询结果按索引版本预先压缩缓存"""
+    return (query['offset'] == 0 and not query['since'] and not query['until'] and not query['keywords'] and
+            query['limit'] in (CONFIG['API_DEFAULT_PAGE_SIZE'], FIRST_PAINT['page_size']) and
+            query['fields'] in ([], FIRST_PAINT['fields']))
+
+def serialize_json(data):
+    """紧凑序列化 JSON（保留中文字符，不转义）"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def format_episode_date(date_string):
+    """与前端 formatDate 一致的日期格式，例如 2025年4月27日"""
+    try:
+        date = datetime.strptime(str(date_string)[:10], '%Y-%m-%d')
+    except ValueError:
+        return html.escape(str(date_string or ''))
+    return f"{date.year}年{date.month}月{date.day}日"
+
+def format_episode_duration(seconds):
+    """与前端 formatDuration 一致的时长格式，例如 12:05 或 1:02:05"""
+    seconds = int(seconds + 0.5)  # 与 Math.round 一致
+    hours, minutes, seconds = seconds // 3600, seconds // 60 % 60, seconds % 60
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+def render_episode_date_line(podcast):
+    """日期行：日期和（已读取到时的）音频时长"""
+    line = f"📅 {format_episode_date(podcast.get('date'))}"
+    if podcast.get('duration'):
+        line += f" · ⏱️ {format_episode_duration(podcast['duration'])}"
+    return line
+
+def get_episode_file_url(podcast, file_type):
+    """与前端 buildUrl 一致：优先本地缓存路径，否则为远程地址"""
+    local_path = podcast.get(f'local_{file_type}_path')
+    if local_path:
+        return local_path
+    remote_path = podcast.get(f'{file_type}_path')
+    if not remote_path:
+        return ''
+    return f"{CONFIG['BASE_URL'].rstrip('/')}/{remote_path.removeprefix('./').lstrip('/')}"
+
+def render_transcript_button(podcast, transcript_url, label):
+    """文稿按钮，参数先编码为 JS 字符串再转义为 HTML 属性"""
+    arguments = ', '.join(json.dumps(value, ensure_ascii=False) for value in (
+        transcript_url, podcast.get('title') or '', podcast.get('id') or ''
+    ))
+    return (f'<button class="btn btn-primary transcript-btn" '
+            f'onclick="openTranscriptModal({html.escape(arguments)})">{label}</button>')
+
+def render_latest_episode_html(podcast):
+    """最新一期卡片，与前端 renderLatestEpisode 的结构相同"""
+    audio_url = get_episode_file_url(podcast, 'audio')
+    transcript_url = get_episode_file_url(podcast, 'transcript')
+    audio = (f'<audio controls class="audio-player"><source src="{html.escape(audio_url)}" type="audio/mpeg">'
+             f'您的浏览器不支持音频播放。</audio>') if audio_url else '<p>音频文件暂不可用</p>'
+    actions = ''
+    if transcript_url:
+        actions += render_transcript_button(podcast, transcript_url, '📄 查看文稿')
+    if audio_url:
+        actions += f'<a href="{html.escape(audio_url)}" class="btn btn-secondary download-btn" download>⬇️ 下载音频</a>'
+    return (
+        '<div class="episode-info">'
+        f'<h3 class="episode-title">{html.escape(podcast.get("title") or "")}</h3>'
+        f'<p class="episode-date">{render_episode_date_line(podcast)}</p>'
+        f'<p class="episode-description">{html.escape(podcast.get("highlight") or "探索出版行业的最新动态，聆听行业专家的深度解析")}</p>'
+        '</div>'
+        f'<div class="episode-controls">{audio}<div class="episode-actions">{actions}</div></div>'
+    )
+
+def render_episode_card_html(podcast):
+    """列表中的播客卡片，与前端 createEpisodeCard 的结构相同"""
+    audio_url = get_episode_file_url(podcast, 'audio')
+    transcript_url = get_episode_file_url(podcast, 'transcript')
+    audio = (f'<audio controls class="audio-player"><source src="{html.escape(audio_url)}" type="audio/mpeg">'
+             f'您的浏览器不支持音频播放。</audio>') if audio_url else ''
+    actions = ''
+    if transcript_url:
+        actions += render_transcript_button(podcast, transcript_url, '📄 文稿')
+    if audio_url:
+        actions += f'<a href="{html.escape(audio_url)}" class="btn btn-secondary" download>⬇️ 下载</a>'
+    return (
+        f'<div class="episode-item" data-episode-id="{html.escape(str(podcast.get("id") or ""))}">'
+        f'<h3 class="episode-title">{html.escape(podcast.get("title") or "")}</h3>'
+        f'<p class="episode-date">{render_episode_date_line(podcast)}</p>'
+        f'<p class="episode-description">{html.escape(podcast.get("highlight") or "探索出版行业的最新动态")}</p>'
+        f'<div class="episode-actions">{audio}<div style="display: flex; gap: 0.5rem;">{actions}</div></div>'
+        '</div>'
+    )
+
+def render_index_page(generation):
+    """预渲染首页：最新一期、列表第一页、统计数字，并内联与 /api/podcasts 第一页相同的 JSON"""
+    with open(FIRST_PAINT['template'], 'r', encoding='utf-8') as f:
+        template = f.read()
+
+    page_size = FIRST_PAINT['page_size']
+    page, total = query_episodes(offset=0, limit=page_size, fields=FIRST_PAINT['fields'])
+    index_total = len(get_episode_index()['episodes'])
+    initial_data = {
+        'podcasts': page,
+        'total': total,
+        'offset': 0,
+        'limit': page_size,
+        'has_more': len(page) < total,
+        'index_total': index_total,
+        'generation': generation
+    }
+    latest, episodes = (page[0], page[1:]) if page else (None, [])
+    minutes = index_total * 15  # 与前端一致，按每期 15 分钟估算
+
+    # 内联 JSON 中转义 <，避免内容中的 </script> 提前结束脚本
+    initial_json = serialize_json(initial_data).decode('utf-8').replace('<', '\\u003c')
+    blocks = {
+        'latest': render_latest_episode_html(latest) if latest else '<p>暂无播客内容</p>',
+        'episodes': ''.join(render_episode_card_html(podcast) for podcast in episodes) or
+                    '<div class="loading"><p>没有找到匹配的播客</p></div>',
+        'load-more': '<button id="load-more-btn" class="btn btn-outline" style="display: {};">加载更多</button>'.format(
+            'block' if 1 + len(episodes) < total else 'none'),
+        'total-episodes': str(index_total),
+        'total-duration': f"{minutes // 60}h {minutes % 60}m",
+        'last-update': format_episode_date(latest.get('date')) if latest else '-',
+        'initial-data': f'<script id="initial-data" type="application/json">{initial_json}</script>'
+    }
+    return SSR_BLOCK_PATTERN.sub(lambda match: blocks.get(match.group(1), match.group(0)), template).encode('utf-8')
+
+# 启动时加载磁盘上的索引快照，避免冷启动请求上游
+sync_index_snapshot(force=True)
+
+@app.before_request
+def start_background_tasks():
+    """每个进程处理第一个请求（或异步入口启动）时启动后台任务
+
+    导入模块时不启动，避免基准脚本、测试和调试重载的父进程拉取上游、下载文件或长期持有调度锁。
+    """
+    # 补充读取尚无元数据的音频（只读取帧头，整个存档通常只需几十毫秒）
+    start_audio_metadata_sync()
+    # 后台同步（每个部署只有一个 worker 真正运行）
+    start_sync_scheduler()
+
+@app.before_request
+def start_request_timer():
+    """记录请求开始时间"""
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """按路由统计请求处理时间（流式响应统计到返回响应头为止）"""
+    started = g.get('request_started')
+    if started is not None:
+        observe_metric(
+            'podcast_http_request_duration_seconds', time.perf_counter() - started,
+            route=request.url_rule.rule if request.url_rule else 'unmatched',
+            method=request.method, status=str(response.status_code)
+        )
+    return response
+
 @app.route('/')
 def index():
-    """首页"""
-    return send_from_directory('public', 'index.html')
+    """首页：按索引版本预渲染首屏内容，与 /api/podcasts 一样缓存序列化和压缩结果"""
+    sync_index_snapshot()
+    if cache['data'] is None:
+        # 冷启动时不等待上游，由前端请求 API 加载数据
+        return send_from_directory('public', 'index.html')
+
+    try:
+        get_podcast_index()
+        version = get_episode_index()['version']
+        # 模板修改后（例如重新部署）同样需要重新渲染
+        stat = os.stat(FIRST_PAINT['template'])
+        entry = get_precomputed_entry(
+            'index.html', (version, stat.st_mtime_ns, stat.st_size), lambda: render_index_page(version[0])
+        )
+        return make_precomputed_response(entry, 'text/html')
+    except Exception as e:
+        print(f"预渲染首页失败: {e}")
+        return send_from_directory('public', 'index.html')
 
 @app.route('/<path:filename>')
 def static_files(filename):
     """静态文件服务"""
+    if filename == 'index.html':
+        return index()
     return send_from_directory('public', filename)
 
 @app.route('/api/podcasts')
 def get_podcasts():
     """获取播客数据API"""
     try:
-        # 检查缓存
-        current_time = datetime.now().timestamp()
-        if (cache['data'] is not None and 
-            current_time - cache['timestamp'] < CONFIG['CACHE_DURATION']):
-            return jsonify(cache['data'])
-        
-        # 尝试获取数据
-        data = None
-        
-        # 首先尝试主数据源
-        try:
-            response = requests.get(CONFIG['DATA_SOURCE'], timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-        except Exception as e:
-            print(f"主数据源失败: {e}")
-        
-        # 如果主数据源失败，尝试备用数据源
-        if data is None:
-            try:
-                response = requests.get(CONFIG['BACKUP_DATA_SOURCE'], timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-            except Exception as e:
-                print(f"备用数据源失败: {e}")
-        
-        if data is None:
+        if get_podcast_index() is None:
             return jsonify({'error': '无法获取播客数据'}), 500
-        
-        # 处理播客文件 - 下载到本地
-        processed_data = process_podcast_files(data.get('podcasts', []))
 
-        # 更新缓存
-        cache['data'] = {'podcasts': processed_data}
-        cache['timestamp'] = current_time
+        # 每个索引版本（含音频元数据版本）只序列化和压缩一次；先读版本号，保证缓存的数据不会比版本号旧
+        index = get_episode_index()
+        version = index['version']
+        generation = version[0]
+        podcasts = index['podcasts']
+
+        # 分页/过滤/字段投影：在预排序索引上查询
+        try:
+            query = parse_episode_query(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if query is not None:
+            def build_page():
+                page, total = query_episodes(**query)
+                return serialize_json({
+                    'podcasts': page,
+                    'total': total,
+                    'offset': query['offset'],
+                    'limit': query['limit'],
+                    'has_more': query['offset'] + len(page) < total,
+                    'index_total': len(get_episode_index()['episodes']),
+                    'generation': generation
+                })
+
+            # 过滤和翻页的组合由客户端决定，不缓存（避免任意参数挤掉常用的缓存项），只做低级别压缩
+            if not is_first_page_query(query):
+                return make_compressed_response(build_page(), 'application/json')
+
+            cache_key = f"podcasts?limit={query['limit']}&fields={','.join(query['fields'])}"
+            entry = get_precomputed_entry(cache_key, version, build_page)
+            return make_precomputed_response(entry, 'application/json')
+
+        entry = get_precomputed_entry('podcasts', version, lambda: serialize_json({'podcasts': podcasts}))
+        return make_precomputed_response(entry, 'application/json')
 
-        return jsonify({'podcasts': processed_data})
-        
     except Exception as e:
         print(f"获取播客数据失败: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/search')
+def search():
+    """文稿全文搜索API"""
+    try:
+        query = (request.args.get('q') or '').strip()
+        if not query:
+            return jsonify({'error': '缺少搜索关键词 q'}), 400
+
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = min(max(request.args.get('limit', 10, type=int), 1), CONFIG['SEARCH_MAX_RESULTS'])
+
+        start = time.perf_counter()
+        results, total = search_transcripts(query, offset, limit)
+        if not SEARCH_INDEX['available']:
+            return jsonify({'error': '全文索引不可用'}), 503
+
+        return jsonify({
+            'query': query,
+            'results': results,
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'took_ms': round((time.perf_counter() - start) * 1000, 2)
+        })
+
+    except Exception as e:
+        print(f"全文搜索失败: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def get_transcript_document(episode_id):
+    """获取某一期的结构化文稿，返回 (document, error_response)"""
+    get_podcast_index()
+    local_path, remote_url = find_local_transcript(episode_id)
+    if not local_path:
+        return None, (jsonify({'error': '无效的播客ID'}), 400)
+
+    if not os.path.exists(local_path):
+        # 尚未缓存：优先加入下载队列
+        enqueue_download(remote_url, local_path, 'transcript', -1, episode_id)
+        return None, (jsonify({'error': '文稿尚未缓存，请稍后再试'}), 404)
+
+    return extract_transcript_structure(local_path), None
+
+@app.route('/api/transcripts/<episode_id>/articles')
+def transcript_articles(episode_id):
+    """分页获取某一期文稿的文章列表"""
+    try:
+        document, error_response = get_transcript_document(episode_id)
+        if error_response:
+            return error_response
+
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = request.args.get('limit', CONFIG['TRANSCRIPT_PAGE_SIZE'], type=int)
+        limit = min(max(limit, 1), CONFIG['TRANSCRIPT_MAX_PAGE_SIZE'])
+        full = request.args.get('full') in ('1', 'true')
+
+        def build_page():
+            articles = []
+            for article in document['articles'][offset:offset + limit]:
+                item = {key: value for key, value in article.items() if key != 'summary'}
+                if full:
+                    item['summary'] = article['summary']
+                else:
+                    # 列表只返回摘要开头，完整内容按需获取
+                    item['excerpt'] = article['summary'][:120]
+                articles.append(item)
+
+            return serialize_json({
+                'episode_id': episode_id,
+                'articles': articles,
+                'total': document['article_count'],
+                'offset': offset,
+                'limit': limit,
+                'has_more': offset + len(articles) < document['article_count']
+            })
+
+        version = (document['source_mtime_ns'], document['source_size'])
+        entry = get_transcript_response_entry(f"{episode_id}:{offset}:{limit}:{full}", version, build_page)
+        return make_precomputed_response(entry, 'application/json')
+
+    except Exception as e:
+        print(f"获取文稿文章失败: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/transcripts/<episode_id>/articles/<int:article_index>')
+def transcript_article(episode_id, article_index):
+    """获取某一期文稿中的单篇文章"""
+    try:
+        document, error_response = get_transcript_document(episode_id)
+        if error_response:
+            return error_response
+
+        if article_index >= document['article_count']:
+            return jsonify({'error': '文章不存在'}), 404
+
+        version = (document['source_mtime_ns'], document['source_size'])
+        entry = get_transcript_response_entry(
+            f"{episode_id}:article:{article_index}", version,
+            lambda: serialize_json(dict(document['articles'][article_index], episode_id=episode_id, total=document['article_count']))
+        )
+        return make_precomputed_response(entry, 'application/json')
+
+    except Exception as e:
+        print(f"获取文稿文章失败: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/webhook', methods=['POST', 'GET', 'OPTIONS'])
 def webhook():
     """GitHub Webhook处理"""
@@ -308,11 +2391,13 @@ def webhook():
             'message': 'Webhook endpoint is working',
             'timestamp': datetime.now().isoformat(),
             'data_source': CONFIG['DATA_SOURCE'],
-            'base_url': CONFIG['BASE_URL']
+            'base_url': CONFIG['BASE_URL'],
+            'last_sync': INDEX_SYNC['last_result'],
+            'pending_episodes': sorted(INDEX_SYNC['pending_ids'])
         })
 
     try:
-        payload = request.get_json()
+        payload = request.get_json(silent=True)
         event = request.headers.get('X-GitHub-Event', 'unknown')
 
         print(f"收到GitHub Webhook: {event}")
@@ -331,17 +2416,14 @@ def webhook():
 
             if not hmac.compare_digest(signature, expected_signature):
                 print("Webhook签名验证失败")
+                inc_metric('podcast_webhook_requests_total', event=event, result='invalid_signature')
                 return jsonify({'error': 'Invalid signature'}), 401
 
-        # 清除缓存，强制重新获取数据
-        cache['data'] = None
-        cache['timestamp'] = 0
-
         response_data = {
             'success': True,
             'message': f'Webhook processed for event: {event}',
             'timestamp': datetime.now().isoformat(),
-            'cache_cleared': True
+            'sync_scheduled': False
         }
 
         # 检查是否有播客相关文件更新
@@ -358,28 +2440,26 @@ def webhook():
             podcast_patterns = ['podcast', 'pody', '.json', '.mp3', '.html', 'gh-pages']
             podcast_files = [f for f in modified_files if any(pattern in f for pattern in podcast_patterns)]
 
-            if podcast_files:
+            # 推送未附带文件列表（例如提交过多）时同样同步整个索引
+            if podcast_files or not commits:
+                episode_ids = get_changed_episode_ids(podcast_files)
                 response_data['podcast_files_updated'] = podcast_files
+                response_data['episodes_updated'] = sorted(episode_ids)
+                response_data['sync_scheduled'] = True
                 print(f"检测到播客文件更新: {podcast_files}")
 
-                # 尝试重新获取数据以验证更新
-                try:
-                    test_response = requests.get(CONFIG['DATA_SOURCE'], timeout=5)
-                    if test_response.status_code == 200:
-                        cache['data'] = test_response.json()
-                        cache['timestamp'] = datetime.now().timestamp()
-                        response_data['data_refreshed'] = True
-                        print("数据已成功刷新")
-                except Exception as refresh_error:
-                    print(f"数据刷新失败: {refresh_error}")
-                    response_data['data_refresh_error'] = str(refresh_error)
+                # 在后台比较新旧索引并只处理变化的播客，新快照会同步到所有 worker
+                schedule_index_sync(episode_ids)
 
+        inc_metric('podcast_webhook_requests_total', event=event,
+                   result='scheduled' if response_data['sync_scheduled'] else 'ignored')
         response = jsonify(response_data)
         response.headers.add('Access-Control-Allow-Origin', '*')
-        return response
+        return response, 202 if response_data['sync_scheduled'] else 200
 
     except Exception as e:
         print(f"Webhook处理错误: {e}")
+        inc_metric('podcast_webhook_requests_total', event=request.headers.get('X-GitHub-Event', 'unknown'), result='error')
         error_response = jsonify({
             'error': str(e),
             'timestamp': datetime.now().isoformat()
@@ -387,52 +2467,287 @@ def webhook():
         error_response.headers.add('Access-Control-Allow-Origin', '*')
         return error_response, 500
 
+def serve_cached_file(directory, filename, file_type):
+    """提供本地缓存文件并记录访问
+
+    尚未缓存（或已被淘汰）的文件从上游下载，同时把正在写入的片段流式返回给客户端；
+    同一文件的其他请求读取同一个片段，上游只请求一次。
+    """
+    local_path = safe_join(directory, filename)
+    if local_path is None:
+        return send_from_directory(directory, filename)
+    if os.path.isfile(local_path):
+        record_file_access(local_path)
+        return record_file_response(send_local_file(local_path, filename, get_cached_file_variants(local_path, file_type)), file_type)
+
+    remote_url, episode_id = find_remote_file(local_path, file_type)
+    if not remote_url:
+        return send_from_directory(directory, filename)
+
+    clear_evicted_file(local_path)
+    fill_thread = start_stream_fill(remote_url, local_path, file_type)
+
+    # 等待写入者开始写入片段
+    deadline = time.time() + CONFIG['STREAM_FILL_TIMEOUT']
+    while time.time() < deadline:
+        if os.path.isfile(local_path):
+            record_file_access(local_path)
+            return record_file_response(send_local_file(local_path, filename), file_type)
+
+        partial = open_filling_partial(local_path)
+        if partial is not None:
+            partial_file, meta = partial
+            inc_metric('podcast_file_responses_total', file_type=file_type, source='fill')
+            response = Response(
+                follow_partial_file(partial_file, local_path, file_type),
+                mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            )
+            if meta.get('size') is not None:
+                response.content_length = meta['size']
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['X-Cache'] = 'FILL'
+            return response
+
+        if not fill_thread.is_alive() and not os.path.exists(f"{local_path}.part"):
+            break
+        time.sleep(CONFIG['STREAM_POLL_INTERVAL'])
+
+    # 上游不可用时由客户端直接访问远程地址
+    inc_metric('podcast_file_responses_total', file_type=file_type, source='redirect')
+    return redirect(remote_url)
+
+def get_cached_file_variants(local_path, file_type):
+    """已缓存文件的预压缩变体（只有文稿 HTML 有），没有时返回 None"""
+    if file_type == 'transcript' and local_path.endswith('.html') and not is_transcript_variant(local_path):
+        return get_transcript_variants(local_path)
+    return None
+
+def record_file_response(response, file_type):
+    """按处理方式统计文件响应和由本服务发送的字节数"""
+    if response.status_code == 304:
+        source = 'not_modified'
+    elif 'X-Accel-Redirect' in response.headers or 'X-Sendfile' in response.headers:
+        source = 'offload'
+    else:
+        source = 'local'
+    inc_metric('podcast_file_responses_total', file_type=file_type, source=source)
+    if source == 'local' and response.content_length:
+        inc_metric('podcast_file_served_bytes_total', response.content_length, file_type=file_type, source='local')
+    return response
+
+def send_local_file(local_path, filename, variants=None):
+    """发送已缓存的文件：支持 ETag/If-None-Match、Range/If-Range，可交给前端代理发送
+
+    完整响应和到文件末尾的范围响应使用 WSGI file_wrapper（gunicorn 下为 sendfile 零拷贝）。
+    variants 为预先生成的 {编码: 路径}，按 Accept-Encoding 选择体积最小的一个发送。
+    """
+    response, file_handle = prepare_local_file(local_path, filename, variants)
+    if file_handle is None:
+        return response
+
+    # 文件对象已定位到范围起点，需要发送 content_length 字节
+    if file_handle.tell() + response.content_length == os.fstat(file_handle.fileno()).st_size:
+        response.response = request.environ.get('wsgi.file_wrapper', FileWrapper)(file_handle, CONFIG['DOWNLOAD_CHUNK_SIZE'])
+    else:
+        response.response = read_file_range(file_handle, response.content_length)
+    response.direct_passthrough = True
+    return response
+
+def prepare_local_file(local_path, filename, variants=None):
+    """按当前请求生成已缓存文件的响应头，返回 (响应, 文件对象)
+
+    需要发送文件内容时返回已定位到范围起点的文件对象，由调用方发送 content_length 字节
+    （WSGI 和异步入口各自发送）；304、416 和交给前端代理时文件对象为 None。
+    下载片段、结构化文稿等内部文件返回 404。
+    """
+    if is_internal_file(local_path):
+        raise NotFound()
+
+    encoding = None
+    if variants:
+        encoding = choose_content_encoding({encoding: os.path.getsize(path) for encoding, path in variants.items()})
+        if CONFIG['FILE_OFFLOAD']:
+            # 交给前端代理时发送未压缩版本，由代理按 gzip_static/brotli_static 选择预压缩副本
+            encoding = 'identity'
+
+    try:
+        source_stat = os.stat(local_path)
+        file_handle = open(variants[encoding] if encoding else local_path, 'rb')
+    except FileNotFoundError:
+        return send_from_directory(os.path.dirname(local_path), os.path.basename(local_path)), None
+
+    stat = os.fstat(file_handle.fileno())
+    size = stat.st_size
+    entry = get_manifest_file(local_path)
+    checksum = entry['checksum'] if entry and entry['checksum'] and entry['size'] == source_stat.st_size else None
+    # 优先使用下载时计算的 SHA-256 作为强 ETag，各变体在其后加后缀
+    if checksum:
+        etag = checksum[:32]
+    else:
+        etag = f"{source_stat.st_size:x}-{int(source_stat.st_mtime):x}"
+    if encoding:
+        etag = f"{etag}-min" if encoding == 'identity' else f"{etag}-min-{encoding}"
+
+    response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    if encoding:
+        response.headers['Vary'] = 'Accept-Encoding'
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.last_modified = int(stat.st_mtime)
+    if checksum and request.args.get('v') == checksum[:FILE_VERSION_LENGTH]:
+        # URL 带有当前内容的校验和，内容变化后 URL 也会变化
+        response.headers['Cache-Control'] = f"public, max-age={CONFIG['FILE_CACHE_MAX_AGE']}, immutable"
+    else:
+        # 同一路径的文件会被重新下载（上游修改）或重新生成变体，每次使用前需用 ETag 验证
+        response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Accept-Ranges'] = 'bytes'
+
+    if request.if_none_match.contains(etag):
+        file_handle.close()
+        response.status_code = 304
+        return response, None
+
+    if CONFIG['FILE_OFFLOAD'] in ('x-accel-redirect', 'x-sendfile'):
+        # 由前端代理读取文件并处理 Range
+        file_handle.close()
+        offload_path = variants[encoding] if encoding else local_path
+        if CONFIG['FILE_OFFLOAD'] == 'x-accel-redirect':
+            response.headers['X-Accel-Redirect'] = CONFIG['FILE_OFFLOAD_PREFIX'] + urllib.parse.quote(
+                get_manifest_key(offload_path).replace(os.sep, '/')
+            )
+        else:
+            response.headers['X-Sendfile'] = os.path.abspath(offload_path)
+        return response, None
+
+    start, end = 0, size
+    byte_range = request.range
+    # If-Range 与当前 ETag 不符时忽略 Range，返回完整文件
+    if byte_range is not None and request.if_range.etag not in (None, etag):
+        byte_range = None
+    if byte_range is not None and len(byte_range.ranges) == 1:
+        content_range = byte_range.range_for_length(size)
+        if content_range is None:
+            file_handle.close()
+            response.status_code = 416
+            response.headers['Content-Range'] = f"bytes */{size}"
+            return response, None
+        start, end = content_range
+        response.status_code = 206
+        response.headers['Content-Range'] = f"bytes {start}-{end - 1}/{size}"
+
+    file_handle.seek(start)
+    response.content_length = end - start
+    return response, file_handle
+
+def read_file_range(file_handle, length):
+    """按块读取文件中的一段（用于不到文件末尾的范围请求）"""
+    try:
+        while length > 0:
+            chunk = file_handle.read(min(CONFIG['DOWNLOAD_CHUNK_SIZE'], length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file_handle.close()
+
+def start_stream_fill(remote_url, local_path, file_type):
+    """为请求启动（或复用）该文件的下载线程"""
+    with STREAM_FILLS['lock']:
+        if STREAM_FILLS['pid'] != os.getpid():
+            STREAM_FILLS['pid'] = os.getpid()
+            STREAM_FILLS['threads'] = {}
+
+        thread = STREAM_FILLS['threads'].get(local_path)
+        if thread is None or not thread.is_alive():
+            def fill():
+                try:
+                    # 边下载边返回的失败原因只记录在日志中
+                    download_file_if_needed(remote_url, local_path, file_type)
+                finally:
+                    with STREAM_FILLS['lock']:
+                        if STREAM_FILLS['threads'].get(local_path) is threading.current_thread():
+                            del STREAM_FILLS['threads'][local_path]
+
+            thread = threading.Thread(target=fill, name='stream-fill')
+            thread.daemon = True
+            STREAM_FILLS['threads'][local_path] = thread
+            thread.start()
+        return thread
+
+def open_filling_partial(local_path):
+    """打开正在写入的下载片段，返回 (文件对象, 片段信息)；没有写入中的片段时返回 None"""
+    meta = read_partial_meta(local_path)
+    if not meta.get('filling'):
+        return None
+    try:
+        partial_file = open(f"{local_path}.part", 'rb')
+    except FileNotFoundError:
+        return None
+    if os.fstat(partial_file.fileno()).st_ino != meta.get('inode'):
+        partial_file.close()
+        return None
+    return partial_file, meta
+
+def follow_partial_file(partial_file, local_path, file_type):
+    """读取正在增长的片段直到写入完成；写入中断或长时间没有新数据时结束响应"""
+    inode = os.fstat(partial_file.fileno()).st_ino
+    last_progress = time.time()
+    try:
+        while True:
+            chunk = partial_file.read(CONFIG['DOWNLOAD_CHUNK_SIZE'])
+            if chunk:
+                last_progress = time.time()
+                inc_metric('podcast_file_served_bytes_total', len(chunk), file_type=file_type, source='fill')
+                yield chunk
+                continue
+
+            # 已读到末尾：片段被重命名为最终文件说明写入完成，再读一次剩余数据即可。
+            # 先读取写入状态再检查最终文件，写入者先重命名后删除续传信息；最终文件可能
+            # 已被替换为内容相同的硬链接（inode 不同），读完剩余数据后按大小确认
+            filling = read_partial_meta(local_path).get('filling')
+            try:
+                final_stat = os.stat(local_path)
+                remaining = partial_file.read()
+                if remaining:
+                    inc_metric('podcast_file_served_bytes_total', len(remaining), file_type=file_type, source='fill')
+                    yield remaining
+                if final_stat.st_ino == inode or partial_file.tell() == final_stat.st_size:
+                    return
+            except FileNotFoundError:
+                pass
+
+            if not filling or time.time() - last_progress > CONFIG['STREAM_FILL_TIMEOUT']:
+                print(f"边下载边返回中断: {local_path}")
+                return
+            time.sleep(CONFIG['STREAM_POLL_INTERVAL'])
+    finally:
+        partial_file.close()
+
 # 文件服务端点
 @app.route('/files/audio/<path:filename>')
 def serve_audio_file(filename):
     """提供本地音频文件"""
-    return send_from_directory(FILE_STORAGE['audio_dir'], filename)
+    return serve_cached_file(FILE_STORAGE['audio_dir'], filename, 'audio')
 
 @app.route('/files/transcripts/<path:filename>')
 def serve_transcript_file(filename):
     """提供本地文稿文件"""
-    return send_from_directory(FILE_STORAGE['transcript_dir'], filename)
+    return serve_cached_file(FILE_STORAGE['transcript_dir'], filename, 'transcript')
 
 @app.route('/api/files/status')
 def files_status():
     """获取文件下载状态"""
     try:
-        audio_files = []
-        transcript_files = []
-
-        # 统计音频文件
-        for root, dirs, files in os.walk(FILE_STORAGE['audio_dir']):
-            for file in files:
-                if file.endswith('.mp3'):
-                    file_path = os.path.join(root, file)
-                    audio_files.append({
-                        'filename': file,
-                        'path': os.path.relpath(file_path, FILE_STORAGE['audio_dir']),
-                        'size': os.path.getsize(file_path)
-                    })
-
-        # 统计文稿文件
-        for root, dirs, files in os.walk(FILE_STORAGE['transcript_dir']):
-            for file in files:
-                if file.endswith(('.html', '.txt')):
-                    file_path = os.path.join(root, file)
-                    transcript_files.append({
-                        'filename': file,
-                        'path': os.path.relpath(file_path, FILE_STORAGE['transcript_dir']),
-                        'size': os.path.getsize(file_path)
-                    })
+        totals = get_manifest_totals()
 
         response_data = {
-            'audio_files': len(audio_files),
-            'transcript_files': len(transcript_files),
-            'audio_details': audio_files[:5],  # 只返回前5个文件详情
-            'transcript_details': transcript_files[:5],
-            'total_size': sum(f['size'] for f in audio_files + transcript_files),
+            'audio_files': totals['audio']['count'],
+            'transcript_files': totals['transcript']['count'],
+            'audio_details': get_recent_manifest_files('audio'),  # 只返回最近5个文件详情
+            'transcript_details': get_recent_manifest_files('transcript'),
+            'total_size': totals['audio']['bytes'] + totals['transcript']['bytes'],
             'storage_mode': 'persistent' if USE_PERSISTENT_STORAGE else 'temporary',
             'storage_path': FILE_STORAGE['base_dir']
         }
@@ -452,26 +2767,24 @@ def files_status():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/files/downloads')
+def download_jobs():
+    """获取下载队列状态"""
+    try:
+        return jsonify(get_download_jobs())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/files/refresh')
 def refresh_files():
     """手动刷新文件下载"""
     try:
-        # 清除缓存
-        cache['data'] = None
-        cache['timestamp'] = 0
-
-        # 重新获取数据并下载文件
-        response = requests.get(CONFIG['DATA_SOURCE'], timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            processed_data = process_podcast_files(data.get('podcasts', []))
-            cache['data'] = {'podcasts': processed_data}
-            cache['timestamp'] = datetime.now().timestamp()
-
+        # 强制重新获取数据并下载文件（不使用条件请求）
+        if refresh_podcast_index(conditional=False):
             return jsonify({
                 'success': True,
                 'message': '文件刷新完成',
-                'processed_podcasts': len(processed_data)
+                'processed_podcasts': len(cache['data']['podcasts'])
             })
         else:
             return jsonify({'error': '无法获取播客数据'}), 500
@@ -509,21 +2822,11 @@ def storage_info():
         if not storage_data:
             return jsonify({'error': '无法获取存储信息'}), 500
 
-        # 获取文件统计
-        audio_count = 0
-        transcript_count = 0
-        total_size = 0
-
-        for root, dirs, files in os.walk(FILE_STORAGE['base_dir']):
-            for file in files:
-                file_path = os.path.join(root, file)
-                file_size = os.path.getsize(file_path)
-                total_size += file_size
-
-                if file.endswith('.mp3'):
-                    audio_count += 1
-                elif file.endswith(('.html', '.txt')):
-                    transcript_count += 1
+        # 获取文件统计（来自存储清单）
+        totals = get_manifest_totals()
+        audio_count = totals['audio']['count']
+        transcript_count = totals['transcript']['count']
+        total_size = totals['audio']['bytes'] + totals['transcript']['bytes']
 
         return jsonify({
             'storage': storage_data,
@@ -533,6 +2836,8 @@ def storage_info():
                 'total_count': audio_count + transcript_count,
                 'total_size': total_size
             },
+            'cache': get_cache_policy_status(),
+            'content_store': get_content_store_status(),
             'configuration': {
                 'persistent_storage': USE_PERSISTENT_STORAGE,
                 'storage_path': PERSISTENT_STORAGE,
@@ -543,6 +2848,69 @@ def storage_info():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/events')
+def events():
+    """服务器推送（SSE）：索引版本变化、文件下载进度和缓存统计
+
+    长轮询：首次连接（或期间的事件已被清理）时立即返回 hello；之后的请求等待到有新事件或
+    EVENT_LONG_POLL_TIMEOUT 秒后结束，浏览器按 retry 间隔用 Last-Event-ID 重新请求，不会丢失事件。
+    同时等待的请求数有上限，打开的页面再多也不会占满线程。异步入口（asgi.py）保持连接推送。
+    """
+    try:
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id)
+        except (TypeError, ValueError):
+            last_event_id = None
+
+        retry = CONFIG['EVENT_RETRY_INTERVAL']
+        body = []
+        if last_event_id is None or is_event_log_gap(last_event_id):
+            get_podcast_index()
+            hello = dict(get_index_event_data(), cache=get_cache_stats())
+            latest_id = get_latest_event_id()
+            body.append(f"id: {latest_id}\nevent: hello\ndata: {json.dumps(hello, ensure_ascii=False)}\n\n")
+        else:
+            rows = wait_for_events(last_event_id, CONFIG['EVENT_LONG_POLL_TIMEOUT'])
+            if rows is None:
+                # 等待的请求已满：稍后再来，间隔与一次长轮询相当
+                rows, retry = [], CONFIG['EVENT_LONG_POLL_TIMEOUT']
+            for row in rows:
+                body.append(f"id: {row['id']}\nevent: {row['event']}\ndata: {row['data']}\n\n")
+
+        body.insert(0, f"retry: {int(retry * 1000)}\n")
+        response = Response(''.join(body), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/sync/status')
+def sync_status():
+    """获取后台同步和预下载进度"""
+    try:
+        return jsonify(get_sync_status())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/upstream/stats')
+def upstream_stats():
+    """获取数据源延迟和错误统计"""
+    try:
+        return jsonify(get_upstream_stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus 格式的运行指标（汇总所有 worker）"""
+    try:
+        return Response(render_metrics(collect_metrics()), content_type='text/plain; version=0.0.4; charset=utf-8')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/status')
 def status():
     """服务状态检查"""
@@ -550,6 +2918,8 @@ def status():
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
         'cache_status': 'active' if cache['data'] is not None else 'empty',
+        'cache_refreshing': cache['refresh_event'] is not None,
+        'index_generation': cache['generation'],
         'config': {
             'data_source': CONFIG['DATA_SOURCE'],
             'base_url': CONFIG['BASE_URL']
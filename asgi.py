@@ -0,0 +1,424 @@
+"""异步（ASGI）入口：与 app.py 提供相同的路由，适合大量同时收听的用户
+
+    uvicorn asgi:application --host 0.0.0.0 --port 8080 --workers 2
+
+音频/文稿文件（/files/*）和服务器推送（/api/events）在事件循环中处理：文件分块读取，
+边下载边返回时异步等待片段增长，每个连接只占用一个分块的内存，不占用线程。
+索引冷启动时所有请求等待同一个后台刷新。其余路由（/api/podcasts、/api/webhook、
+/api/files/* 等）交给 app.py 中的 Flask 应用，在 ASGI_WSGI_THREADS 个线程中运行。
+"""
+import asyncio
+import json
+import os
+import time
+import urllib.parse
+from collections import deque
+
+from a2wsgi import WSGIMiddleware
+from werkzeug.exceptions import HTTPException
+from werkzeug.security import safe_join
+
+import app as podcast_app
+from app import inc_metric, observe_metric
+from config import CONFIG, FILE_STORAGE
+from episode_index import cache
+
+# 由事件循环直接处理的文件路由：URL 前缀 -> (存储目录键, 文件类型, 指标中的路由名)
+FILE_ROUTES = {
+    '/files/audio/': ('audio_dir', 'audio', '/files/audio/<path:filename>'),
+    '/files/transcripts/': ('transcript_dir', 'transcript', '/files/transcripts/<path:filename>')
+}
+
+# 其余路由交给 Flask 应用，在线程池中运行
+WSGI_APP = WSGIMiddleware(podcast_app.app, workers=CONFIG['ASGI_WSGI_THREADS'])
+
+# 索引冷启动刷新 - 同一进程中的请求等待同一个任务
+INDEX_REFRESH = {
+    'task': None
+}
+
+# 服务器推送 - 每个进程一个轮询任务读取事件表，所有 SSE 连接共享最近的事件
+EVENT_FEED = {
+    'task': None,
+    'latest_id': 0,
+    'rows': deque(maxlen=CONFIG['EVENT_LOG_SIZE']),  # (id, event, data)
+    'changed': None
+}
+
+
+async def application(scope, receive, send):
+    """ASGI 入口"""
+    if scope['type'] == 'lifespan':
+        await handle_lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    path = scope['path']
+    if scope['method'] in ('GET', 'HEAD'):
+        for prefix, (directory_key, file_type, route) in FILE_ROUTES.items():
+            if path.startswith(prefix) and len(path) > len(prefix):
+                await serve_cached_file(scope, receive, send, FILE_STORAGE[directory_key],
+                                        path[len(prefix):], file_type, route)
+                return
+        if path == '/api/events':
+            await stream_events(scope, receive, send)
+            return
+        if path == '/api/podcasts':
+            # 冷启动时异步等待索引，之后 Flask 处理函数直接使用缓存
+            await ensure_podcast_index()
+
+    await WSGI_APP(scope, receive, send)
+
+
+async def handle_lifespan(receive, send):
+    """应用启动和关闭通知（Flask 应用在导入时已初始化）"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # 文件和事件请求不经过 Flask，后台任务在 worker 启动时即开始
+            podcast_app.start_background_tasks()
+            print(f"⚡ 异步入口已启动 (进程 {os.getpid()})")
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+def build_wsgi_environ(scope):
+    """由 ASGI 请求信息构造 WSGI environ（无请求体），用于在 Flask 请求上下文中生成响应头"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': None,
+        'wsgi.errors': None,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = f"HTTP_{key}"
+        value = value.decode('latin-1')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def get_request_header(scope, name):
+    """读取请求头（name 为小写）"""
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def watch_disconnect(receive):
+    """后台等待客户端断开，返回在断开时完成的任务"""
+    async def wait():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+    return asyncio.ensure_future(wait())
+
+
+async def start_response(send, status, headers, route, method, started):
+    """发送响应头并记录请求处理时间（与 Flask 入口的指标一致）"""
+    observe_metric('podcast_http_request_duration_seconds', time.perf_counter() - started,
+                   route=route, method=method, status=str(status))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+    })
+
+
+async def send_simple_response(send, status, headers, route, method, started):
+    """发送没有响应体的响应（例如重定向）"""
+    await start_response(send, status, headers, route, method, started)
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def ensure_podcast_index():
+    """确保已有可用的索引：需要阻塞刷新时，本进程的所有请求等待同一个后台刷新"""
+    await asyncio.to_thread(podcast_app.sync_index_snapshot)
+    if podcast_app.is_index_fresh() or (cache['data'] is not None and CONFIG['STALE_WHILE_REVALIDATE']):
+        return
+
+    task = INDEX_REFRESH['task']
+    if task is None or task.done():
+        task = asyncio.ensure_future(asyncio.to_thread(podcast_app.refresh_podcast_index))
+        INDEX_REFRESH['task'] = task
+    # 请求被取消（客户端断开）时刷新继续进行
+    await asyncio.shield(task)
+
+
+def prepare_file_response(local_path, filename, file_type, environ):
+    """在 Flask 请求上下文中生成文件响应头（与同步入口共用 ETag/Range/代理发送逻辑）"""
+    with podcast_app.app.request_context(environ):
+        podcast_app.record_file_access(local_path)
+        response, file_handle = podcast_app.prepare_local_file(
+            local_path, filename, podcast_app.get_cached_file_variants(local_path, file_type)
+        )
+        podcast_app.record_file_response(response, file_type)
+        return response, file_handle
+
+
+async def send_local_file(scope, receive, send, local_path, filename, file_type, route, started):
+    """异步发送已缓存的文件；客户端断开后停止读取"""
+    try:
+        response, file_handle = await asyncio.to_thread(
+            prepare_file_response, local_path, filename, file_type, build_wsgi_environ(scope)
+        )
+    except HTTPException as e:
+        response, file_handle = e.get_response(), None
+
+    await start_response(send, response.status_code, response.headers.to_wsgi_list(),
+                         route, scope['method'], started)
+    if scope['method'] == 'HEAD':
+        if file_handle is not None:
+            file_handle.close()
+        response.close()
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    if file_handle is None:
+        # 304/416/交给代理时响应体为空；错误页面和 send_from_directory 的回退响应需按 Content-Length 发送响应体
+        await send_response_body(send, response)
+        return
+
+    disconnected = watch_disconnect(receive)
+    remaining = response.content_length
+    try:
+        while remaining > 0 and not disconnected.done():
+            chunk = await asyncio.to_thread(file_handle.read, min(CONFIG['DOWNLOAD_CHUNK_SIZE'], remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            # 传输缓冲区满时 send 会等待客户端读取，内存占用不随文件大小增长
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    except OSError:
+        # 客户端已断开
+        pass
+    finally:
+        disconnected.cancel()
+        file_handle.close()
+
+
+async def send_response_body(send, response):
+    """分块发送 Flask 响应对象的响应体"""
+    chunks = iter(response.iter_encoded())
+    try:
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    except OSError:
+        # 客户端已断开
+        pass
+    finally:
+        response.close()
+
+
+async def serve_cached_file(scope, receive, send, directory, filename, file_type, route):
+    """提供本地缓存文件；未缓存的文件由下载线程写入片段，本连接异步跟随片段返回"""
+    started = time.perf_counter()
+    local_path = safe_join(directory, filename)
+    if local_path is None:
+        await WSGI_APP(scope, receive, send)
+        return
+    if os.path.isfile(local_path):
+        await send_local_file(scope, receive, send, local_path, filename, file_type, route, started)
+        return
+
+    await ensure_podcast_index()
+    remote_url, episode_id = await asyncio.to_thread(podcast_app.find_remote_file, local_path, file_type)
+    if not remote_url:
+        await WSGI_APP(scope, receive, send)
+        return
+
+    await asyncio.to_thread(podcast_app.clear_evicted_file, local_path)
+    fill_thread = podcast_app.start_stream_fill(remote_url, local_path, file_type)
+
+    # 等待写入者开始写入片段
+    deadline = time.time() + CONFIG['STREAM_FILL_TIMEOUT']
+    while time.time() < deadline:
+        if os.path.isfile(local_path):
+            await send_local_file(scope, receive, send, local_path, filename, file_type, route, started)
+            return
+
+        partial = await asyncio.to_thread(podcast_app.open_filling_partial, local_path)
+        if partial is not None:
+            partial_file, meta = partial
+            inc_metric('podcast_file_responses_total', file_type=file_type, source='fill')
+            headers = [('Content-Type', podcast_app.mimetypes.guess_type(filename)[0] or 'application/octet-stream'),
+                       ('Cache-Control', 'no-cache'), ('X-Cache', 'FILL')]
+            if meta.get('size') is not None:
+                headers.append(('Content-Length', str(meta['size'])))
+            await start_response(send, 200, headers, route, scope['method'], started)
+            if scope['method'] == 'HEAD':
+                partial_file.close()
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+            await follow_partial_file(receive, send, partial_file, local_path, file_type)
+            return
+
+        if not fill_thread.is_alive() and not os.path.exists(f"{local_path}.part"):
+            break
+        await asyncio.sleep(CONFIG['STREAM_POLL_INTERVAL'])
+
+    # 上游不可用时由客户端直接访问远程地址
+    inc_metric('podcast_file_responses_total', file_type=file_type, source='redirect')
+    await send_simple_response(send, 302, [('Location', remote_url), ('Content-Length', '0')],
+                               route, scope['method'], started)
+
+
+async def follow_partial_file(receive, send, partial_file, local_path, file_type):
+    """读取正在增长的片段直到写入完成（与同步入口的 follow_partial_file 相同），等待新数据时不占用线程"""
+    disconnected = watch_disconnect(receive)
+    inode = os.fstat(partial_file.fileno()).st_ino
+    last_progress = time.time()
+    try:
+        while not disconnected.done():
+            chunk = await asyncio.to_thread(partial_file.read, CONFIG['DOWNLOAD_CHUNK_SIZE'])
+            if chunk:
+                last_progress = time.time()
+                inc_metric('podcast_file_served_bytes_total', len(chunk), file_type=file_type, source='fill')
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                continue
+
+            # 先读取写入状态再检查最终文件，写入者先重命名后删除续传信息；
+            # 最终文件可能已被替换为内容相同的硬链接，读完剩余数据后按大小确认
+            filling = podcast_app.read_partial_meta(local_path).get('filling')
+            try:
+                final_stat = os.stat(local_path)
+                remaining = await asyncio.to_thread(partial_file.read)
+                if remaining:
+                    inc_metric('podcast_file_served_bytes_total', len(remaining), file_type=file_type, source='fill')
+                    await send({'type': 'http.response.body', 'body': remaining, 'more_body': True})
+                if final_stat.st_ino == inode or partial_file.tell() == final_stat.st_size:
+                    await send({'type': 'http.response.body', 'body': b''})
+                    return
+            except FileNotFoundError:
+                pass
+
+            if not filling or time.time() - last_progress > CONFIG['STREAM_FILL_TIMEOUT']:
+                print(f"边下载边返回中断: {local_path}")
+                break
+            await asyncio.sleep(CONFIG['STREAM_POLL_INTERVAL'])
+        await send({'type': 'http.response.body', 'body': b''})
+    except OSError:
+        pass
+    finally:
+        disconnected.cancel()
+        partial_file.close()
+
+
+def start_event_feed():
+    """按需启动本进程的事件轮询任务"""
+    if EVENT_FEED['task'] is None or EVENT_FEED['task'].done():
+        EVENT_FEED['changed'] = asyncio.Event()
+        EVENT_FEED['task'] = asyncio.ensure_future(event_feed_loop())
+
+
+async def event_feed_loop():
+    """每 EVENT_POLL_INTERVAL 秒查询一次事件表，有新事件时唤醒所有 SSE 连接"""
+    EVENT_FEED['latest_id'] = await asyncio.to_thread(podcast_app.get_latest_event_id)
+    # 轮询开始前建立的连接可能需要补读事件表
+    notify_event_subscribers()
+    while True:
+        try:
+            rows = await asyncio.to_thread(podcast_app.get_events_after, EVENT_FEED['latest_id'])
+            if rows:
+                EVENT_FEED['rows'].extend((row['id'], row['event'], row['data']) for row in rows)
+                EVENT_FEED['latest_id'] = rows[-1]['id']
+                notify_event_subscribers()
+                continue
+        except Exception as e:
+            print(f"读取推送事件失败: {e}")
+        await asyncio.sleep(CONFIG['EVENT_POLL_INTERVAL'])
+
+
+def notify_event_subscribers():
+    """唤醒等待新事件的 SSE 连接"""
+    changed, EVENT_FEED['changed'] = EVENT_FEED['changed'], asyncio.Event()
+    changed.set()
+
+
+async def read_events_after(event_id):
+    """指定ID之后的事件：通常来自共享的最近事件，断线较久的连接从事件表补读"""
+    rows = EVENT_FEED['rows']
+    if event_id >= EVENT_FEED['latest_id']:
+        return []
+    if rows and rows[0][0] <= event_id + 1:
+        return [row for row in rows if row[0] > event_id]
+    return [(row['id'], row['event'], row['data'])
+            for row in await asyncio.to_thread(podcast_app.get_events_after, event_id)]
+
+
+async def stream_events(scope, receive, send):
+    """服务器推送（SSE），格式与 Flask 入口的 /api/events 相同"""
+    started = time.perf_counter()
+    query = urllib.parse.parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    last_event_id = get_request_header(scope, b'last-event-id') or (query.get('last_event_id') or [None])[0]
+    try:
+        last_event_id = int(last_event_id)
+    except (TypeError, ValueError):
+        last_event_id = None
+
+    start_event_feed()
+    await ensure_podcast_index()
+    hello = await asyncio.to_thread(
+        lambda: dict(podcast_app.get_index_event_data(), cache=podcast_app.get_cache_stats())
+    )
+    event_id = last_event_id if last_event_id is not None else await asyncio.to_thread(podcast_app.get_latest_event_id)
+
+    await start_response(send, 200, [('Content-Type', 'text/event-stream; charset=utf-8'),
+                                     ('Cache-Control', 'no-cache'), ('X-Accel-Buffering', 'no')],
+                         '/api/events', scope['method'], started)
+    if scope['method'] == 'HEAD':
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    disconnected = watch_disconnect(receive)
+    try:
+        hello_message = (f"retry: {int(CONFIG['EVENT_RETRY_INTERVAL'] * 1000)}\n"
+                         f"id: {event_id}\nevent: hello\ndata: {json.dumps(hello, ensure_ascii=False)}\n\n")
+        await send({'type': 'http.response.body', 'body': hello_message.encode('utf-8'), 'more_body': True})
+
+        deadline = time.time() + CONFIG['EVENT_STREAM_DURATION']
+        last_sent = time.time()
+        while time.time() < deadline and not disconnected.done():
+            changed = EVENT_FEED['changed']
+            rows = await read_events_after(event_id)
+            if rows:
+                event_id = rows[-1][0]
+                body = ''.join(f"id: {row_id}\nevent: {event}\ndata: {data}\n\n" for row_id, event, data in rows)
+                await send({'type': 'http.response.body', 'body': body.encode('utf-8'), 'more_body': True})
+                last_sent = time.time()
+                continue
+            if time.time() - last_sent >= 15:
+                # 心跳注释，防止代理断开空闲连接
+                await send({'type': 'http.response.body', 'body': b": keep-alive\n\n", 'more_body': True})
+                last_sent = time.time()
+
+            # 等待新事件、客户端断开或下一次心跳
+            timeout = max(0, min(deadline, last_sent + 15) - time.time())
+            waiter = asyncio.ensure_future(changed.wait())
+            await asyncio.wait([waiter, disconnected], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+        await send({'type': 'http.response.body', 'body': b''})
+    except OSError:
+        pass
+    finally:
+        disconnected.cancel()
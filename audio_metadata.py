@@ -0,0 +1,216 @@
+"""音频元数据：解析 MP3 帧头读取时长和码率，结果保存在存储清单中"""
+import os
+import sqlite3
+import threading
+import time
+
+from config import CONFIG, FILE_STORAGE
+from storage import get_manifest_db, get_manifest_key, state_file_lock
+
+# 音频元数据 - 读取的 MP3 时长和码率保存在存储清单中（文件被淘汰后仍保留），每个进程缓存一份
+AUDIO_METADATA = {
+    'lock': threading.Lock(),
+    'synced_pid': None,
+    'revision': None,
+    'checked_at': 0,
+    'by_path': {}  # 清单路径 -> 元数据
+}
+
+# MP3 帧头解析：只读取 ID3 标签之后的一小段数据，不解码音频
+MP3_SCAN_WINDOW = 64 * 1024
+MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+MP3_BITRATES = {  # (MPEG-1?, 层) -> kbps，按帧头中的码率索引
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+}
+
+def parse_mp3_frame_header(header):
+    """解析 4 字节 MPEG 音频帧头，无效时返回 None"""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 3  # 3: MPEG-1, 2: MPEG-2, 0: MPEG-2.5
+    layer = 4 - ((header[1] >> 1) & 3)  # 1: Layer I, 2: Layer II, 3: Layer III
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = MP3_BITRATES[(mpeg1, layer)][bitrate_index]
+    sample_rate = MP3_SAMPLE_RATES[version][sample_rate_index]
+    padding = (header[2] >> 1) & 1
+    if layer == 1:
+        samples, length = 384, (12 * bitrate * 1000 // sample_rate + padding) * 4
+    else:
+        samples = 1152 if mpeg1 or layer == 2 else 576
+        length = samples // 8 * bitrate * 1000 // sample_rate + padding
+
+    channels = 1 if header[3] >> 6 == 3 else 2
+    return {
+        'mpeg1': mpeg1,
+        'layer': layer,
+        'bitrate': bitrate,
+        'sample_rate': sample_rate,
+        'samples': samples,
+        'length': length,
+        'channels': channels,
+        # Layer III 的 side info 长度，Xing/Info 头紧随其后
+        'side_info': (32 if channels == 2 else 17) if mpeg1 else (17 if channels == 2 else 9)
+    }
+
+def scan_mp3_metadata(local_path):
+    """读取 MP3 的时长、码率等信息，只读取 ID3 标签之后的前 MP3_SCAN_WINDOW 字节和末尾的 ID3v1 标签
+
+    有 Xing/Info 或 VBRI 头时按其中的总帧数计算（VBR 也准确），否则按首帧码率和音频数据长度估算。
+    """
+    with open(local_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        head = f.read(10)
+        audio_start = 0
+        if len(head) == 10 and head[:3] == b'ID3':
+            # ID3v2 标签长度为 syncsafe 整数（每字节 7 位），带页脚时再加 10 字节
+            tag_size = (head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | (head[9] & 0x7F)
+            audio_start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+        audio_end = size
+        if size - audio_start >= 128:
+            f.seek(size - 128)
+            if f.read(3) == b'TAG':
+                audio_end -= 128
+        f.seek(audio_start)
+        window = f.read(MP3_SCAN_WINDOW)
+
+    # 找到第一个有效帧：紧随其后的帧头也必须有效且层和采样率相同（避免把数据中的 0xFF 当作帧同步）；
+    # 下一帧超出读取范围时，只有读满了整个窗口（帧跨越窗口末尾）才接受
+    offset = window.find(b'\xff')
+    frame = None
+    while offset != -1 and offset + 4 <= len(window):
+        frame = parse_mp3_frame_header(window[offset:offset + 4])
+        if frame:
+            next_offset = offset + frame['length']
+            if next_offset + 4 > len(window):
+                if len(window) == MP3_SCAN_WINDOW:
+                    break
+            else:
+                next_frame = parse_mp3_frame_header(window[next_offset:next_offset + 4])
+                if next_frame and (next_frame['layer'], next_frame['sample_rate']) == (frame['layer'], frame['sample_rate']):
+                    break
+        frame = None
+        offset = window.find(b'\xff', offset + 1)
+    if frame is None:
+        return None
+
+    frame_start = audio_start + offset
+    frames = audio_bytes = None
+    vbr = False
+    xing = offset + 4 + frame['side_info']
+    if window[xing:xing + 4] in (b'Xing', b'Info'):
+        flags = int.from_bytes(window[xing + 4:xing + 8], 'big')
+        position = xing + 8
+        if flags & 1:
+            frames = int.from_bytes(window[position:position + 4], 'big')
+            position += 4
+        if flags & 2:
+            audio_bytes = int.from_bytes(window[position:position + 4], 'big')
+        vbr = window[xing:xing + 4] == b'Xing'
+    elif window[offset + 36:offset + 40] == b'VBRI':
+        audio_bytes = int.from_bytes(window[offset + 46:offset + 50], 'big')
+        frames = int.from_bytes(window[offset + 50:offset + 54], 'big')
+        vbr = True
+
+    if frames:
+        duration = frames * frame['samples'] / frame['sample_rate']
+        audio_bytes = audio_bytes or audio_end - frame_start
+        bitrate = round(audio_bytes * 8 / duration / 1000) if duration else frame['bitrate']
+    else:
+        duration = (audio_end - frame_start) * 8 / (frame['bitrate'] * 1000)
+        bitrate = frame['bitrate']
+
+    return {
+        'duration': round(duration, 3),
+        'bitrate': bitrate,
+        'sample_rate': frame['sample_rate'],
+        'channels': frame['channels'],
+        'vbr': vbr
+    }
+
+def record_audio_metadata(local_path):
+    """读取音频元数据并写入存储清单，无法识别的文件同样记录（避免重复读取）"""
+    try:
+        size = os.path.getsize(local_path)
+        metadata = scan_mp3_metadata(local_path) or {}
+    except OSError as e:
+        print(f"读取音频信息失败 {local_path}: {e}")
+        return None
+
+    db = get_manifest_db()
+    with db:
+        db.execute(
+            'INSERT OR REPLACE INTO audio_metadata (path, size, duration, bitrate, sample_rate, channels, vbr, scanned_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (get_manifest_key(local_path), size, metadata.get('duration'), metadata.get('bitrate'),
+             metadata.get('sample_rate'), metadata.get('channels'), int(metadata.get('vbr', False)), time.time())
+        )
+    return metadata
+
+def start_audio_metadata_sync():
+    """每个进程启动一次后台线程，补充读取尚无元数据的音频"""
+    with AUDIO_METADATA['lock']:
+        if AUDIO_METADATA['synced_pid'] == os.getpid():
+            return
+        AUDIO_METADATA['synced_pid'] = os.getpid()
+    thread = threading.Thread(target=sync_audio_metadata, name='audio-metadata')
+    thread.daemon = True
+    thread.start()
+
+def sync_audio_metadata():
+    """补充读取清单中尚无元数据（或文件大小已变化）的音频"""
+    try:
+        with state_file_lock('audio_metadata'):
+            db = get_manifest_db()
+            rows = db.execute(
+                'SELECT f.path FROM files f LEFT JOIN audio_metadata m ON m.path = f.path '
+                "WHERE f.file_type = 'audio' AND (m.path IS NULL OR m.size != f.size)"
+            ).fetchall()
+            if not rows:
+                return
+
+            started = time.monotonic()
+            for row in rows:
+                record_audio_metadata(os.path.join(FILE_STORAGE['base_dir'], row['path']))
+            print(f"🎵 已读取 {len(rows)} 个音频文件的时长和码率 ({(time.monotonic() - started) * 1000:.0f} ms)")
+    except sqlite3.Error as e:
+        print(f"同步音频信息失败: {e}")
+
+def get_audio_metadata():
+    """获取所有音频的元数据，返回 (版本, {清单路径: 元数据})
+
+    与索引快照一样，最多每 SNAPSHOT_CHECK_INTERVAL 秒检查一次其他 worker 是否写入了新数据。
+    """
+    current_time = time.time()
+    if current_time - AUDIO_METADATA['checked_at'] < CONFIG['SNAPSHOT_CHECK_INTERVAL']:
+        return AUDIO_METADATA['revision'], AUDIO_METADATA['by_path']
+
+    with AUDIO_METADATA['lock']:
+        if current_time - AUDIO_METADATA['checked_at'] >= CONFIG['SNAPSHOT_CHECK_INTERVAL']:
+            try:
+                db = get_manifest_db()
+                revision = tuple(db.execute('SELECT COUNT(*), MAX(scanned_at) FROM audio_metadata').fetchone())
+                if revision != AUDIO_METADATA['revision']:
+                    AUDIO_METADATA['by_path'] = {
+                        row['path']: {
+                            'duration': row['duration'],
+                            'bitrate': row['bitrate'],
+                            'audio_size': row['size']
+                        }
+                        for row in db.execute('SELECT path, size, duration, bitrate FROM audio_metadata')
+                        if row['duration'] is not None
+                    }
+                    AUDIO_METADATA['revision'] = revision
+            except sqlite3.Error as e:
+                print(f"读取音频信息失败: {e}")
+            AUDIO_METADATA['checked_at'] = current_time
+    return AUDIO_METADATA['revision'], AUDIO_METADATA['by_path']
@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+"""播客展示应用的基准测试和压力测试
+
+启动一个本地的模拟 GitHub Pages 上游（合成的 podcast_index.json、MP3 和 static_files 中的文稿，
+可配置延迟和故障注入），再以临时存储目录启动应用，并发请求后输出可跨版本比较的 JSON 结果：
+
+- 冷缓存 / 热缓存的 /api/podcasts 延迟和吞吐
+- 从上游下载全部文件的吞吐
+- 已缓存音频的 Range 请求速率
+- 应用进程的内存峰值
+
+用法:
+    python benchmark.py                                # 默认参数，结果输出到标准输出
+    python benchmark.py --output bench.json            # 保存结果
+    python benchmark.py --compare old.json             # 与之前的结果对比
+    python benchmark.py --upstream-latency 0.2 --failure-rate 0.05
+    python benchmark.py --serve-upstream --port 8901   # 只启动模拟上游，用于手动测试
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+TRANSCRIPT_FIXTURES = os.path.join(REPO_DIR, 'static_files', 'transcripts')
+
+# 结果格式版本，字段不兼容时递增
+RESULT_FORMAT = 1
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, 无填充：每帧 417 字节
+MP3_FRAME_HEADER = b'\xff\xfb\x90\x64'
+MP3_FRAME_SIZE = 417
+
+
+def build_synthetic_mp3(size):
+    """生成由合法 MP3 帧头组成的音频数据（帧内容为静音）"""
+    frame = MP3_FRAME_HEADER + bytes(MP3_FRAME_SIZE - len(MP3_FRAME_HEADER))
+    return (frame * (size // MP3_FRAME_SIZE + 1))[:size]
+
+
+class FakeUpstream:
+    """模拟 GitHub Pages：提供索引、音频和文稿，支持 ETag/304、Range、延迟和故障注入"""
+
+    def __init__(self, episodes=50, audio_size=2 * 1024 * 1024, latency=0.0, jitter=0.0,
+                 failure_rate=0.0, primary_down=False, bandwidth_kbps=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.primary_down = primary_down
+        self.bandwidth_kbps = bandwidth_kbps
+        self.audio = build_synthetic_mp3(audio_size)
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+        # 文稿从 static_files 中的样例循环取用
+        self.transcripts = {}
+        fixtures = sorted(os.listdir(TRANSCRIPT_FIXTURES)) if os.path.isdir(TRANSCRIPT_FIXTURES) else []
+        podcasts = []
+        start = datetime(2025, 1, 1, 16, 30)
+        for index in range(episodes):
+            moment = start + timedelta(days=index)
+            episode_id = moment.strftime('%Y%m%d_%H%M%S')
+            if fixtures:
+                self.transcripts[episode_id] = os.path.join(TRANSCRIPT_FIXTURES, fixtures[index % len(fixtures)], 'summary.html')
+            podcasts.append({
+                'id': episode_id,
+                'title': f'基准测试播客 {index + 1}',
+                'date': moment.strftime('%Y-%m-%d'),
+                'highlight': f'第 {index + 1} 期的亮点内容',
+                'audio_path': f'./podcasts/{episode_id}/podcast.mp3',
+                'transcript_path': f'./podcasts/{episode_id}/summary.html' if fixtures else None
+            })
+        self.index_body = json.dumps({'podcasts': podcasts}, ensure_ascii=False).encode('utf-8')
+        self.index_etag = f'"index-{len(self.index_body)}"'
+        self.episode_ids = [podcast['id'] for podcast in podcasts]
+        self.episodes = set(self.episode_ids)
+
+    @property
+    def total_bytes(self):
+        """全部音频和文稿的字节数"""
+        transcript_bytes = sum(os.path.getsize(path) for path in self.transcripts.values())
+        return len(self.audio) * len(self.episode_ids) + transcript_bytes
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def start(self, port=0):
+        """在后台线程中启动，返回基础地址"""
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                upstream.handle(self)
+
+            def do_HEAD(self):
+                upstream.handle(self)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        thread = threading.Thread(target=self.server.serve_forever, name='fake-upstream')
+        thread.daemon = True
+        thread.start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def handle(self, handler):
+        path = handler.path.split('?')[0]
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        if path.endswith('podcast_index.json'):
+            self.count('index')
+            if (self.primary_down and not path.startswith('/backup/')) or random.random() < self.failure_rate:
+                self.count('failures')
+                return self.send_empty(handler, 500)
+            if handler.headers.get('If-None-Match') == self.index_etag:
+                self.count('index_not_modified')
+                return self.send_empty(handler, 304, {'ETag': self.index_etag})
+            return self.send_body(handler, self.index_body, 'application/json', {'ETag': self.index_etag})
+
+        parts = path.strip('/').split('/')
+        if len(parts) == 3 and parts[0] == 'podcasts' and parts[1] in self.episodes:
+            if random.random() < self.failure_rate:
+                self.count('failures')
+                return self.send_empty(handler, 500)
+            if parts[2] == 'podcast.mp3':
+                self.count('audio')
+                return self.send_body(handler, self.audio, 'audio/mpeg', {'ETag': '"audio"'})
+            if parts[2] == 'summary.html' and parts[1] in self.transcripts:
+                self.count('transcript')
+                with open(self.transcripts[parts[1]], 'rb') as f:
+                    return self.send_body(handler, f.read(), 'text/html; charset=utf-8', {'ETag': f'"{parts[1]}"'})
+
+        self.send_empty(handler, 404)
+
+    def send_empty(self, handler, status, headers=None):
+        handler.send_response(status)
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.send_header('Content-Length', '0')
+        handler.end_headers()
+
+    def send_body(self, handler, body, content_type, headers):
+        start, status = 0, 200
+        byte_range = handler.headers.get('Range', '')
+        if byte_range.startswith('bytes=') and byte_range[6:].split('-')[0].isdigit():
+            start = int(byte_range[6:].split('-')[0])
+            if start >= len(body):
+                return self.send_empty(handler, 416, {'Content-Range': f"bytes */{len(body)}"})
+            status = 206
+
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Accept-Ranges', 'bytes')
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        if status == 206:
+            handler.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+        handler.send_header('Content-Length', str(len(body) - start))
+        handler.end_headers()
+        if handler.command == 'HEAD':
+            return
+
+        try:
+            if not self.bandwidth_kbps:
+                handler.wfile.write(body[start:])
+                return
+            # 按带宽上限分块发送
+            chunk_size = 16 * 1024
+            for offset in range(start, len(body), chunk_size):
+                handler.wfile.write(body[offset:offset + chunk_size])
+                time.sleep(chunk_size / (self.bandwidth_kbps * 1024))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class MemorySampler:
+    """定期采样应用进程树（gunicorn 主进程和 worker）的 RSS，记录峰值"""
+
+    def __init__(self, pid, interval=0.2):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='memory-sampler')
+        self.thread.daemon = True
+
+    def process_tree(self):
+        pids = [self.pid]
+        try:
+            with open(f"/proc/{self.pid}/task/{self.pid}/children") as f:
+                pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+        return pids
+
+    @staticmethod
+    def read_status(pid, field):
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith(field + ':'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return 0
+
+    def run(self):
+        while not self.stopped.is_set():
+            total = sum(self.read_status(pid, 'VmRSS') for pid in self.process_tree())
+            self.peak_rss = max(self.peak_rss, total)
+            self.stopped.wait(self.interval)
+
+    def start(self):
+        if os.path.exists(f"/proc/{self.pid}/status"):
+            self.thread.start()
+
+    def stop(self):
+        """返回内存统计；/proc 不可用时为 None"""
+        if not self.thread.is_alive():
+            return None
+        hwm = {pid: self.read_status(pid, 'VmHWM') for pid in self.process_tree()}
+        self.stopped.set()
+        self.thread.join()
+        return {
+            'peak_total_rss_bytes': self.peak_rss,
+            'max_process_hwm_bytes': max(hwm.values()) if hwm else None,
+            'processes': len(hwm)
+        }
+
+
+def find_free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_app(args, upstream_url, storage_dir, port):
+    """以临时存储目录启动应用（gunicorn、uvicorn 异步入口或 Flask 内置服务器）"""
+    env = dict(
+        os.environ,
+        DATA_SOURCE=f"{upstream_url}/podcast_index.json",
+        BACKUP_DATA_SOURCE=f"{upstream_url}/backup/podcast_index.json",
+        BASE_URL=upstream_url,
+        # 测试模式：文件存储在当前目录的 static_files 下（即临时目录）
+        USE_PERSISTENT_STORAGE='false',
+        # 冷缓存必须由第一个请求触发，不让后台同步预热
+        SYNC_ENABLED='false',
+        PORT=str(port),
+        FLASK_ENV='production',
+        PYTHONUNBUFFERED='1'
+    )
+    if args.server == 'gunicorn':
+        command = [
+            sys.executable, '-m', 'gunicorn', '--pythonpath', REPO_DIR,
+            '--bind', f"127.0.0.1:{port}", '--workers', str(args.workers),
+            '--worker-class', 'gthread', '--threads', str(args.threads), '--timeout', '120', 'app:app'
+        ]
+    elif args.server == 'uvicorn':
+        command = [
+            sys.executable, '-m', 'uvicorn', '--app-dir', REPO_DIR, '--host', '127.0.0.1', '--port', str(port),
+            '--workers', str(args.workers), '--no-access-log', 'asgi:application'
+        ]
+    else:
+        command = [sys.executable, os.path.join(REPO_DIR, 'app.py')]
+
+    log_file = open(os.path.join(storage_dir, 'app.log'), 'w')
+    process = subprocess.Popen(command, cwd=storage_dir, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+
+    # 等待应用开始监听（/api/status 不会请求上游）
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"应用启动失败，日志见 {log_file.name}")
+        try:
+            requests.get(f"{base_url}/api/status", timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("应用启动超时")
+
+
+def summarize_latencies(latencies, elapsed, errors):
+    """延迟分位数（毫秒）和吞吐"""
+    latencies = sorted(latencies)
+
+    def percentile(p):
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else None
+    }
+
+
+def run_concurrently(total, concurrency, request_fn):
+    """并发执行 request_fn(session, i)，返回 (成功请求的延迟列表, 错误数, 传输字节数, 总耗时)"""
+    local = threading.local()
+    latencies = []
+    transferred = [0]
+    errors = [0]
+    lock = threading.Lock()
+
+    def run(i):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            ok, size = request_fn(local.session, i)
+        except requests.RequestException:
+            ok, size = False, 0
+        elapsed = time.perf_counter() - start
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+                transferred[0] += size
+            else:
+                errors[0] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run, range(total)))
+    return latencies, errors[0], transferred[0], time.perf_counter() - started
+
+
+def bench_podcasts(base_url, total, concurrency):
+    """并发请求 /api/podcasts（接受 gzip，与浏览器一致）"""
+    def request_fn(session, i):
+        response = session.get(f"{base_url}/api/podcasts", headers={'Accept-Encoding': 'gzip'}, timeout=60)
+        return response.status_code == 200, len(response.content)
+
+    latencies, errors, _, elapsed = run_concurrently(total, concurrency, request_fn)
+    return summarize_latencies(latencies, elapsed, errors)
+
+
+def wait_for_downloads(base_url, expected, timeout):
+    """等待下载队列把全部文件缓存到本地
+
+    expected 为 {文件类型: 文件数}；文稿下载后还要生成结构化 JSON、压缩变体和全文索引，
+    因此分别记录每种类型全部完成的时间。
+    """
+    started = time.perf_counter()
+    finished = {}
+    status = {}
+    while time.perf_counter() - started < timeout and len(finished) < len(expected):
+        status = requests.get(f"{base_url}/api/files/status", timeout=10).json()
+        for file_type, count in expected.items():
+            if file_type not in finished and status[f'{file_type}_files'] >= count:
+                finished[file_type] = round(time.perf_counter() - started, 3)
+        time.sleep(0.1)
+
+    elapsed = time.perf_counter() - started
+    cached_bytes = status.get('total_size', 0)
+    return {
+        'files': sum(status.get(f'{file_type}_files', 0) for file_type in expected),
+        'expected_files': sum(expected.values()),
+        'bytes': cached_bytes,
+        'seconds': round(elapsed, 3),
+        'seconds_by_type': finished,
+        'megabytes_per_second': round(cached_bytes / elapsed / 1024 / 1024, 2) if elapsed else None
+    }
+
+
+def bench_ranges(base_url, episode_ids, audio_size, total, concurrency, range_size):
+    """并发请求已缓存音频的随机范围（模拟播放器拖动进度）"""
+    def request_fn(session, i):
+        episode_id = episode_ids[i % len(episode_ids)]
+        start = random.randrange(0, max(1, audio_size - range_size))
+        response = session.get(
+            f"{base_url}/files/audio/{episode_id}/podcast.mp3",
+            headers={'Range': f"bytes={start}-{start + range_size - 1}"}, timeout=60
+        )
+        return response.status_code == 206 and len(response.content) == min(range_size, audio_size - start), len(response.content)
+
+    latencies, errors, transferred, elapsed = run_concurrently(total, concurrency, request_fn)
+    result = summarize_latencies(latencies, elapsed, errors)
+    result['megabytes_per_second'] = round(transferred / elapsed / 1024 / 1024, 2) if elapsed else None
+    return result
+
+
+def get_git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'describe', '--always', '--dirty'], cwd=REPO_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(args):
+    upstream = FakeUpstream(
+        episodes=args.episodes, audio_size=args.audio_size_kb * 1024, latency=args.upstream_latency,
+        jitter=args.upstream_jitter, failure_rate=args.failure_rate, primary_down=args.primary_down,
+        bandwidth_kbps=args.upstream_bandwidth_kbps
+    )
+    upstream_url = upstream.start()
+    storage_dir = tempfile.mkdtemp(prefix='podcast-bench-')
+    print(f"🧪 模拟上游: {upstream_url}（{args.episodes} 期播客，{upstream.total_bytes / 1024 / 1024:.1f} MB）", file=sys.stderr)
+
+    process = None
+    try:
+        process, base_url = start_app(args, upstream_url, storage_dir, find_free_port())
+        sampler = MemorySampler(process.pid)
+        sampler.start()
+        print(f"🚀 应用已启动: {base_url}（{args.server}）", file=sys.stderr)
+
+        results = {}
+        # 冷缓存：首批并发请求同时到达，索引需从上游获取
+        results['podcasts_cold'] = bench_podcasts(base_url, args.concurrency, args.concurrency)
+        print(f"❄️  冷缓存 /api/podcasts: p50 {results['podcasts_cold']['p50_ms']} ms", file=sys.stderr)
+
+        # 索引加载后下载队列开始缓存全部文件
+        expected = {'audio': len(upstream.episode_ids), 'transcript': len(upstream.transcripts)}
+        results['download'] = wait_for_downloads(base_url, expected, args.download_timeout)
+        print(f"⬇️  下载: {results['download']['files']}/{results['download']['expected_files']} 个文件，"
+              f"{results['download']['megabytes_per_second']} MB/s，各类型完成时间 {results['download']['seconds_by_type']}",
+              file=sys.stderr)
+
+        results['podcasts_warm'] = bench_podcasts(base_url, args.requests, args.concurrency)
+        print(f"🔥 热缓存 /api/podcasts: p50 {results['podcasts_warm']['p50_ms']} ms，"
+              f"{results['podcasts_warm']['requests_per_second']} req/s", file=sys.stderr)
+
+        results['range_requests'] = bench_ranges(
+            base_url, upstream.episode_ids, len(upstream.audio), args.requests, args.concurrency, args.range_size_kb * 1024
+        )
+        print(f"🎯 Range 请求: {results['range_requests']['requests_per_second']} req/s，"
+              f"{results['range_requests']['megabytes_per_second']} MB/s", file=sys.stderr)
+
+        results['memory'] = sampler.stop()
+        results['upstream_requests'] = dict(upstream.counts)
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        upstream.stop()
+        if args.keep_storage:
+            print(f"📁 存储目录已保留: {storage_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(storage_dir, ignore_errors=True)
+
+    return {
+        'format': RESULT_FORMAT,
+        'revision': get_git_revision(),
+        'timestamp': datetime.now().isoformat(),
+        'config': {
+            'server': args.server,
+            'workers': args.workers,
+            'threads': args.threads,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'episodes': args.episodes,
+            'audio_size_kb': args.audio_size_kb,
+            'range_size_kb': args.range_size_kb,
+            'upstream_latency': args.upstream_latency,
+            'upstream_jitter': args.upstream_jitter,
+            'upstream_bandwidth_kbps': args.upstream_bandwidth_kbps,
+            'failure_rate': args.failure_rate,
+            'primary_down': args.primary_down
+        },
+        'results': results
+    }
+
+
+# 对比时关注的指标：(路径, 越大越好)
+COMPARED_METRICS = [
+    (('podcasts_cold', 'p50_ms'), False),
+    (('podcasts_warm', 'p50_ms'), False),
+    (('podcasts_warm', 'p99_ms'), False),
+    (('podcasts_warm', 'requests_per_second'), True),
+    (('download', 'megabytes_per_second'), True),
+    (('download', 'seconds'), False),
+    (('range_requests', 'p50_ms'), False),
+    (('range_requests', 'requests_per_second'), True),
+    (('memory', 'peak_total_rss_bytes'), False)
+]
+
+
+def compare_results(previous, current):
+    """打印与之前结果的对比（变化百分比，✅ 变好 / ⚠️ 变差）"""
+    print(f"\n📊 对比 {previous.get('revision')} → {current.get('revision')}", file=sys.stderr)
+    for (section, field), higher_is_better in COMPARED_METRICS:
+        before = (previous['results'].get(section) or {}).get(field)
+        after = (current['results'].get(section) or {}).get(field)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before * 100 if before else 0
+        improved = (change > 0) == higher_is_better
+        marker = '  ' if abs(change) < 5 else ('✅' if improved else '⚠️ ')
+        print(f"{marker} {section}.{field}: {before} → {after} ({change:+.1f}%)", file=sys.stderr)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='播客展示应用基准测试（使用本地模拟上游）')
+    parser.add_argument('--server', choices=('gunicorn', 'uvicorn', 'flask'), default='gunicorn', help='应用服务器（uvicorn 使用 asgi.py 异步入口）')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn/uvicorn worker 数')
+    parser.add_argument('--threads', type=int, default=16, help='gunicorn 每个 worker 的线程数')
+    parser.add_argument('--concurrency', type=int, default=16, help='并发客户端数')
+    parser.add_argument('--requests', type=int, default=500, help='热缓存和 Range 测试的请求数')
+    parser.add_argument('--episodes', type=int, default=50, help='合成索引中的播客数')
+    parser.add_argument('--audio-size-kb', type=int, default=2048, help='每期合成 MP3 的大小')
+    parser.add_argument('--range-size-kb', type=int, default=256, help='每个 Range 请求的大小')
+    parser.add_argument('--upstream-latency', type=float, default=0.0, help='上游每个请求的固定延迟（秒）')
+    parser.add_argument('--upstream-jitter', type=float, default=0.0, help='上游额外的随机延迟上限（秒）')
+    parser.add_argument('--upstream-bandwidth-kbps', type=int, default=0, help='上游每个连接的带宽（KB/s），0 不限制')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='上游请求返回 500 的概率')
+    parser.add_argument('--primary-down', action='store_true', help='主数据源始终失败（测试备用数据源和对冲请求）')
+    parser.add_argument('--download-timeout', type=float, default=300, help='等待全部文件下载的最长时间（秒）')
+    parser.add_argument('--output', help='结果 JSON 文件（默认输出到标准输出）')
+    parser.add_argument('--compare', help='与之前保存的结果 JSON 对比')
+    parser.add_argument('--keep-storage', action='store_true', help='保留临时存储目录和应用日志')
+    parser.add_argument('--serve-upstream', action='store_true', help='只启动模拟上游')
+    parser.add_argument('--port', type=int, default=8901, help='--serve-upstream 的监听端口')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.serve_upstream:
+        upstream = FakeUpstream(
+            episodes=args.episodes, audio_size=args.audio_size_kb * 1024, latency=args.upstream_latency,
+            jitter=args.upstream_jitter, failure_rate=args.failure_rate, primary_down=args.primary_down,
+            bandwidth_kbps=args.upstream_bandwidth_kbps
+        )
+        upstream_url = upstream.start(args.port)
+        print(f"🧪 模拟上游: {upstream_url}/podcast_index.json（Ctrl+C 退出）", file=sys.stderr)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            upstream.stop()
+        return
+
+    result = run_benchmark(args)
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+        print(f"💾 结果已保存: {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare_results(json.load(f), result)
+
+
+if __name__ == '__main__':
+    main()
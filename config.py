@@ -0,0 +1,105 @@
+"""配置：从环境变量读取的运行参数和文件存储路径"""
+import os
+
+# 配置 - 从环境变量读取，提供默认值
+CONFIG = {
+    # 主数据源 - 直接从GitHub Pages获取
+    'DATA_SOURCE': os.environ.get('DATA_SOURCE', 'https://xinyiheng.github.io/newpody/podcast_index.json'),
+    # 备用数据源 - 从GitHub Raw获取
+    'BACKUP_DATA_SOURCE': os.environ.get('BACKUP_DATA_SOURCE', 'https://raw.githubusercontent.com/xinyiheng/newpody/gh-pages/podcast_index.json'),
+    'BASE_URL': os.environ.get('BASE_URL', 'https://xinyiheng.github.io/newpody'),
+    'CACHE_DURATION': int(os.environ.get('CACHE_DURATION', 3600)),  # 1小时缓存
+    # 缓存过期后继续返回旧数据，同时在后台刷新（stale-while-revalidate）
+    'STALE_WHILE_REVALIDATE': os.environ.get('STALE_WHILE_REVALIDATE', 'true').lower() == 'true',
+    # 下载线程池大小（常驻工作线程数量）
+    'DOWNLOAD_WORKERS': int(os.environ.get('DOWNLOAD_WORKERS', 3)),
+    # 保留的已完成下载任务记录数量
+    'DOWNLOAD_HISTORY_SIZE': int(os.environ.get('DOWNLOAD_HISTORY_SIZE', 100)),
+    # 流式下载的分块大小（字节），决定每个下载占用的内存
+    'DOWNLOAD_CHUNK_SIZE': int(os.environ.get('DOWNLOAD_CHUNK_SIZE', 64 * 1024)),
+    # 上游请求超时（秒）
+    'UPSTREAM_TIMEOUT': float(os.environ.get('UPSTREAM_TIMEOUT', 10)),
+    # 数据源延迟样本不足时，发出对冲请求前的等待时间（秒）
+    'HEDGE_DEFAULT_DELAY': float(os.environ.get('HEDGE_DEFAULT_DELAY', 2.0)),
+    # 对冲等待时间下限（秒），避免过早重复请求
+    'HEDGE_MIN_DELAY': float(os.environ.get('HEDGE_MIN_DELAY', 0.2)),
+    # 每个数据源保留的最近请求样本数量
+    'UPSTREAM_STATS_WINDOW': int(os.environ.get('UPSTREAM_STATS_WINDOW', 50)),
+    # 检查索引快照文件是否被其他 worker 更新的最小间隔（秒）
+    'SNAPSHOT_CHECK_INTERVAL': float(os.environ.get('SNAPSHOT_CHECK_INTERVAL', 1.0)),
+    # 分页接口默认和最大每页数量
+    'API_DEFAULT_PAGE_SIZE': int(os.environ.get('API_DEFAULT_PAGE_SIZE', 20)),
+    'API_MAX_PAGE_SIZE': int(os.environ.get('API_MAX_PAGE_SIZE', 100)),
+    # 最多缓存的预生成响应数量（不同分页/过滤参数各占一个）
+    'PRECOMPUTED_MAX_ENTRIES': int(os.environ.get('PRECOMPUTED_MAX_ENTRIES', 64)),
+    # 全文搜索每页最大结果数量和摘要上下文长度（字符）
+    'SEARCH_MAX_RESULTS': int(os.environ.get('SEARCH_MAX_RESULTS', 50)),
+    'SEARCH_SNIPPET_CONTEXT': int(os.environ.get('SEARCH_SNIPPET_CONTEXT', 60)),
+    # 文稿文章分页接口默认和最大每页数量
+    'TRANSCRIPT_PAGE_SIZE': int(os.environ.get('TRANSCRIPT_PAGE_SIZE', 10)),
+    'TRANSCRIPT_MAX_PAGE_SIZE': int(os.environ.get('TRANSCRIPT_MAX_PAGE_SIZE', 50)),
+    # 文稿文章接口响应缓存的容量（MB），与 /api/podcasts 等预生成响应分开
+    'TRANSCRIPT_RESPONSE_CACHE_MB': float(os.environ.get('TRANSCRIPT_RESPONSE_CACHE_MB', 16)),
+    # 文件访问时间写入存储清单的最小间隔（秒），期间的访问次数在内存中累计
+    'ACCESS_FLUSH_INTERVAL': float(os.environ.get('ACCESS_FLUSH_INTERVAL', 60)),
+    # 本地缓存的容量预算（MB），按缓存记录的文件大小计算，超出后按策略淘汰
+    'AUDIO_CACHE_BUDGET_MB': int(os.environ.get('AUDIO_CACHE_BUDGET_MB', 10240)),
+    'TRANSCRIPT_CACHE_BUDGET_MB': int(os.environ.get('TRANSCRIPT_CACHE_BUDGET_MB', 512)),
+    # 最新的 N 期播客始终保留在本地，不参与淘汰
+    'CACHE_PINNED_EPISODES': int(os.environ.get('CACHE_PINNED_EPISODES', 5)),
+    # 淘汰策略: lru（最久未访问优先）或 lfu（访问次数最少优先，次数相同时最久未访问优先）
+    'CACHE_EVICTION_POLICY': os.environ.get('CACHE_EVICTION_POLICY', 'lru').lower(),
+    # 后台淘汰检查间隔（秒），下载完成后超出预算会立即触发一次
+    'CACHE_EVICTION_INTERVAL': int(os.environ.get('CACHE_EVICTION_INTERVAL', 300)),
+    # 未缓存文件边下载边返回时，等待下载开始或新数据的最长时间（秒），超时后改为重定向到远程地址
+    'STREAM_FILL_TIMEOUT': float(os.environ.get('STREAM_FILL_TIMEOUT', 15)),
+    'STREAM_POLL_INTERVAL': float(os.environ.get('STREAM_POLL_INTERVAL', 0.05)),
+    # 带版本参数（?v=<校验和前缀>）的已缓存文件 URL 的浏览器缓存时间（秒），不带版本参数时每次验证 ETag
+    'FILE_CACHE_MAX_AGE': int(os.environ.get('FILE_CACHE_MAX_AGE', 31536000)),
+    # 文件发送交给前端代理: 空（由 worker 发送）、x-accel-redirect（nginx）或 x-sendfile（Apache/lighttpd）
+    'FILE_OFFLOAD': os.environ.get('FILE_OFFLOAD', '').lower(),
+    # X-Accel-Redirect 的内部路径前缀，需在 nginx 中映射到存储根目录
+    'FILE_OFFLOAD_PREFIX': os.environ.get('FILE_OFFLOAD_PREFIX', '/internal-files/'),
+    # 后台同步：每个部署只有一个 worker 运行，定期刷新索引并按最新优先预下载缺失的文件
+    'SYNC_ENABLED': os.environ.get('SYNC_ENABLED', 'true').lower() == 'true',
+    'SYNC_INTERVAL': int(os.environ.get('SYNC_INTERVAL', 600)),  # 完整检查一次缺失文件的间隔（秒）
+    'SYNC_POLL_INTERVAL': int(os.environ.get('SYNC_POLL_INTERVAL', 30)),  # 检查索引变化的间隔（秒）
+    'SYNC_CONCURRENCY': int(os.environ.get('SYNC_CONCURRENCY', 2)),  # 预下载同时进行的文件数
+    # 后台下载总带宽上限（KB/s，每个进程），0 表示不限制；边下载边返回给用户的请求不受限制
+    'SYNC_BANDWIDTH_LIMIT_KBPS': int(os.environ.get('SYNC_BANDWIDTH_LIMIT_KBPS', 0)),
+    # 上游出错时的退避时间（秒），连续失败时翻倍
+    'SYNC_BACKOFF_BASE': int(os.environ.get('SYNC_BACKOFF_BASE', 30)),
+    'SYNC_BACKOFF_MAX': int(os.environ.get('SYNC_BACKOFF_MAX', 1800)),
+    # 服务器推送（SSE）：事件表保留的事件数、查询新事件的间隔、下载进度事件间隔（秒）
+    'EVENT_LOG_SIZE': int(os.environ.get('EVENT_LOG_SIZE', 1000)),
+    'EVENT_POLL_INTERVAL': float(os.environ.get('EVENT_POLL_INTERVAL', 1)),
+    'EVENT_PROGRESS_INTERVAL': float(os.environ.get('EVENT_PROGRESS_INTERVAL', 1)),
+    # Flask/gunicorn 入口的 /api/events 为长轮询：最多等待 EVENT_LONG_POLL_TIMEOUT 秒，有新事件时立即返回；
+    # 每个进程同时等待的请求不超过 EVENT_MAX_WAITERS 个（其余请求立即返回），为其他请求留出线程
+    'EVENT_LONG_POLL_TIMEOUT': float(os.environ.get('EVENT_LONG_POLL_TIMEOUT', 25)),
+    'EVENT_MAX_WAITERS': int(os.environ.get('EVENT_MAX_WAITERS', 8)),
+    # 每次推送请求结束后浏览器重新连接的间隔（秒）
+    'EVENT_RETRY_INTERVAL': float(os.environ.get('EVENT_RETRY_INTERVAL', 1)),
+    # 异步入口（asgi.py）中每个 SSE 连接保持的时间（秒），到期后浏览器自动重连并从上次的事件继续
+    'EVENT_STREAM_DURATION': int(os.environ.get('EVENT_STREAM_DURATION', 55)),
+    # 各 worker 将内存中的指标写入共享目录的间隔（秒），/metrics 汇总所有 worker
+    'METRICS_FLUSH_INTERVAL': float(os.environ.get('METRICS_FLUSH_INTERVAL', 10)),
+    # 完整性校验：每个文件重新计算 SHA-256 的间隔（秒），以及后台同步每轮最多读取的数据量（MB）
+    'VERIFY_INTERVAL': int(os.environ.get('VERIFY_INTERVAL', 7 * 24 * 3600)),
+    'VERIFY_BATCH_MB': int(os.environ.get('VERIFY_BATCH_MB', 256)),
+    # 异步入口（asgi.py）中运行其余 Flask 路由的线程数，文件流和服务器推送不占用这些线程
+    'ASGI_WSGI_THREADS': int(os.environ.get('ASGI_WSGI_THREADS', 16))
+}
+
+# 文件存储配置 - 使用持久化存储路径
+FILE_STORAGE = {
+    'base_dir': '/tmp/podcast_files',  # Zeabur持久化目录
+    'audio_dir': '/tmp/podcast_files/audio',
+    'transcript_dir': '/tmp/podcast_files/transcripts',
+    'object_dir': '/tmp/podcast_files/objects',  # 按 SHA-256 存放的内容对象，播客路径为其硬链接
+    'state_dir': '/tmp/podcast_files/state'  # 索引快照等运行状态
+}
+
+# 环境变量配置
+PERSISTENT_STORAGE = os.environ.get('PERSISTENT_STORAGE', '/tmp/podcast_files')
+USE_PERSISTENT_STORAGE = os.environ.get('USE_PERSISTENT_STORAGE', 'true').lower() == 'true'
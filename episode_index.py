@@ -0,0 +1,146 @@
+"""播客索引：内存中的索引缓存、按日期预排序的播客列表，以及 /api/podcasts 的分页和过滤"""
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+from audio_metadata import get_audio_metadata
+from config import CONFIG
+from storage import get_checksum_revision, get_local_file_path, get_manifest_key, load_file_checksums
+
+# 播客索引缓存 - 刷新、快照同步等由 app.py 维护
+cache = {
+    'data': None,
+    'timestamp': 0,
+    # 当前数据所来自的数据源及其 ETag/Last-Modified，用于条件请求
+    'validators': {},
+    # 正在进行的刷新（single-flight），并发请求等待同一个 Event
+    'refresh_lock': threading.Lock(),
+    'refresh_event': None,
+    # 索引版本号，每次写入新快照时递增，所有 worker 据此收敛到同一版本
+    'generation': 0,
+    'snapshot_signature': None,
+    'snapshot_checked_at': 0
+}
+
+# /api/podcasts 的 days 参数上限（约 100 年）
+EPISODE_MAX_DAYS = 36500
+
+# 按日期预排序的播客索引（最新在前），用于分页和过滤，每个索引版本构建一次
+EPISODE_INDEX = {
+    'lock': threading.Lock(),
+    'version': None,  # (索引版本, 音频元数据版本)
+    'podcasts': [],  # 原始顺序，带音频元数据
+    'episodes': [],
+    'date_keys': [],  # 升序排列的日期（YYYY-MM-DD），与 episodes 顺序相反，用于二分查找
+    'search_keys': [],
+    'by_id': {}
+}
+
+def get_episode_sort_key(podcast):
+    """播客排序键：按日期（其次按ID）排序，用于最新优先"""
+    return (str(podcast.get('date') or ''), str(podcast.get('id') or ''))
+
+def get_episode_date_key(podcast):
+    """播客日期键（YYYY-MM-DD），用于日期范围过滤"""
+    return str(podcast.get('date') or '')[:10]
+
+def add_audio_metadata(podcast, audio_metadata):
+    """为播客加上音频时长（秒）、码率（kbps）和文件大小，尚未读取到时保持原样"""
+    local_path = get_local_file_path(podcast.get('audio_path'), 'audio')
+    metadata = audio_metadata.get(get_manifest_key(local_path)) if local_path else None
+    return dict(podcast, **metadata) if metadata else podcast
+
+def add_file_versions(podcast, checksums):
+    """为已缓存并有校验和的本地文件路径加上 ?v=<校验和前缀>，内容变化后 URL 随之变化"""
+    versioned = {}
+    for key, file_type in (('local_audio_path', 'audio'), ('local_transcript_path', 'transcript')):
+        remote_key = 'audio_path' if file_type == 'audio' else 'transcript_path'
+        local_path = get_local_file_path(podcast.get(remote_key), file_type) if podcast.get(key) else None
+        checksum = checksums.get(get_manifest_key(local_path)) if local_path else None
+        if checksum:
+            versioned[key] = f"{podcast[key]}?v={checksum}"
+    return dict(podcast, **versioned) if versioned else podcast
+
+def get_episode_index():
+    """获取当前索引版本的预排序播客列表，索引版本、音频元数据或文件校验和变化时重建"""
+    generation = cache['generation']
+    data = cache['data']
+    audio_revision, audio_metadata = get_audio_metadata()
+    version = (generation, audio_revision, get_checksum_revision())
+    if EPISODE_INDEX['version'] == version:
+        return EPISODE_INDEX
+
+    with EPISODE_INDEX['lock']:
+        if EPISODE_INDEX['version'] != version:
+            checksums = load_file_checksums()
+            podcasts = [
+                add_file_versions(add_audio_metadata(podcast, audio_metadata), checksums)
+                for podcast in (data or {}).get('podcasts', [])
+            ]
+            episodes = sorted(podcasts, key=get_episode_sort_key, reverse=True)
+            EPISODE_INDEX['podcasts'] = podcasts
+            EPISODE_INDEX['episodes'] = episodes
+            EPISODE_INDEX['date_keys'] = [get_episode_date_key(podcast) for podcast in reversed(episodes)]
+            EPISODE_INDEX['search_keys'] = [
+                f"{podcast.get('title') or ''}\n{podcast.get('highlight') or ''}".lower()
+                for podcast in episodes
+            ]
+            EPISODE_INDEX['by_id'] = {podcast.get('id'): podcast for podcast in episodes}
+            EPISODE_INDEX['version'] = version
+    return EPISODE_INDEX
+
+def query_episodes(offset=0, limit=None, since=None, until=None, keywords=None, fields=None):
+    """在预排序索引上按日期范围、关键词过滤并分页，返回 (page, total)"""
+    index = get_episode_index()
+    episodes = index['episodes']
+    count = len(episodes)
+
+    # 日期升序列表上二分查找，再映射回最新在前的顺序
+    lower = bisect_left(index['date_keys'], since) if since else 0
+    upper = bisect_right(index['date_keys'], until) if until else count
+    candidates = range(count - upper, count - lower)
+
+    if keywords:
+        search_keys = index['search_keys']
+        candidates = [i for i in candidates if all(keyword in search_keys[i] for keyword in keywords)]
+
+    total = len(candidates)
+    end = total if limit is None else offset + limit
+    page = [episodes[i] for i in candidates[offset:end]]
+
+    if fields:
+        page = [{field: podcast[field] for field in fields if field in podcast} for podcast in page]
+
+    return page, total
+
+def parse_episode_query(args):
+    """解析分页/过滤参数，没有任何相关参数时返回 None（返回完整列表），参数无效时抛出 ValueError"""
+    query_keys = ('offset', 'limit', 'since', 'until', 'days', 'q', 'fields')
+    if not any(key in args for key in query_keys):
+        return None
+
+    offset = max(args.get('offset', 0, type=int), 0)
+    limit = args.get('limit', CONFIG['API_DEFAULT_PAGE_SIZE'], type=int)
+    limit = min(max(limit, 1), CONFIG['API_MAX_PAGE_SIZE'])
+
+    since = args.get('since') or None
+    until = args.get('until') or None
+    days = args.get('days', type=int)
+    if days is not None and days < 0:
+        raise ValueError('参数 days 不能为负数')
+    if days:
+        # 超过 EPISODE_MAX_DAYS 天等同于不限日期（过大的值会使日期计算溢出）
+        days = min(days, EPISODE_MAX_DAYS)
+        since = max(since or '', (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d'))
+
+    keywords = (args.get('q') or '').lower().split()
+    fields = [field.strip() for field in (args.get('fields') or '').split(',') if field.strip()]
+
+    return {
+        'offset': offset,
+        'limit': limit,
+        'since': since,
+        'until': until,
+        'keywords': keywords,
+        'fields': fields
+    }
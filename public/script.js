@@ -5,7 +5,11 @@ const CONFIG = {
     // 播客文件基础URL
     BASE_URL: 'https://xinyiheng.github.io/newpody',
     // 每页显示的播客数量
-    EPISODES_PER_PAGE: 6
+    EPISODES_PER_PAGE: 6,
+    // 列表需要的字段（服务器端字段投影）
+    EPISODE_FIELDS: 'id,title,date,highlight,audio_path,transcript_path,local_audio_path,local_transcript_path,duration,bitrate,audio_size',
+    // 文稿弹窗每次加载的文章数量
+    ARTICLES_PER_PAGE: 10
 };
 
 // URL拼接函数 - 优先使用本地文件
@@ -68,20 +72,133 @@ async function checkFileStatus() {
         const data = await response.json();
 
         console.log('📁 文件状态:', data);
+        renderFileStatus(data);
+    } catch (error) {
+        console.error('获取文件状态失败:', error);
+    }
+}
 
-        // 更新文件状态显示
-        const statusDiv = document.getElementById('file-status');
-        if (statusDiv) {
-            statusDiv.innerHTML = `
-                <div class="file-status-info">
-                    <span>🎵 本地音频: ${data.audio_files} 个</span>
-                    <span>📄 本地文稿: ${data.transcript_files} 个</span>
-                    <span>💾 总大小: ${formatFileSize(data.total_size)}</span>
-                </div>
-            `;
+// 更新文件状态显示（缓存统计和正在下载的文件）
+function renderFileStatus(stats) {
+    if (stats) {
+        cacheStats = stats;
+    }
+    const statusDiv = document.getElementById('file-status');
+    if (!statusDiv || !cacheStats) return;
+
+    const downloading = Object.values(activeDownloads);
+    const downloadedBytes = downloading.reduce((sum, item) => sum + (item.bytes || 0), 0);
+    const totalBytes = downloading.reduce((sum, item) => sum + (item.total || 0), 0);
+    const progress = downloading.length && totalBytes
+        ? `<span>⬇️ 正在缓存: ${downloading.length} 个文件 (${Math.floor(downloadedBytes * 100 / totalBytes)}%)</span>`
+        : downloading.length ? `<span>⬇️ 正在缓存: ${downloading.length} 个文件</span>` : '';
+
+    statusDiv.innerHTML = `
+        <div class="file-status-info">
+            <span>🎵 本地音频: ${cacheStats.audio_files} 个</span>
+            <span>📄 本地文稿: ${cacheStats.transcript_files} 个</span>
+            <span>💾 总大小: ${formatFileSize(cacheStats.total_size)}</span>
+            ${progress}
+        </div>
+    `;
+}
+
+// 订阅服务器推送：索引更新、下载进度和缓存统计，原地更新页面而不是轮询和刷新
+function connectServerEvents() {
+    if (!window.EventSource) {
+        // 不支持 SSE 的浏览器退回定期检查
+        setInterval(checkFileStatus, 30000);
+        setInterval(checkForNewEpisodes, 30 * 60 * 1000);
+        return;
+    }
+
+    const source = new EventSource('/api/events');
+
+    source.addEventListener('hello', (e) => {
+        const data = JSON.parse(e.data);
+        renderFileStatus(data.cache);
+        // 重连期间索引可能已经更新
+        if (indexGeneration !== null && data.generation !== indexGeneration) {
+            refreshEpisodes(data);
+        }
+    });
+
+    source.addEventListener('index', (e) => {
+        const data = JSON.parse(e.data);
+        if (data.generation !== indexGeneration) {
+            refreshEpisodes(data);
+        }
+    });
+
+    source.addEventListener('download', (e) => {
+        const data = JSON.parse(e.data);
+        if (data.state === 'started' || data.state === 'progress') {
+            activeDownloads[data.url] = data;
+        } else {
+            delete activeDownloads[data.url];
+        }
+        renderFileStatus();
+    });
+
+    source.addEventListener('cache', (e) => {
+        renderFileStatus(JSON.parse(e.data));
+    });
+}
+
+// 索引更新后原地刷新最新一期、列表和统计信息
+async function refreshEpisodes(indexInfo) {
+    try {
+        const data = await fetchEpisodesPage({ offset: 0, limit: CONFIG.EPISODES_PER_PAGE });
+        const previousLatestId = latestEpisode ? latestEpisode.id : null;
+
+        indexTotal = data.index_total;
+        indexGeneration = data.generation;
+        const newLatest = data.podcasts[0] || null;
+
+        // 正在播放时不替换播放器，避免打断收听
+        const playing = Array.from(document.querySelectorAll('audio')).some(audio => !audio.paused);
+        if (playing) {
+            console.log('🆕 播客已更新，播放结束后再刷新列表');
+            pendingIndexRefresh = indexInfo;
+            updateStats();
+            return;
+        }
+
+        if (!newLatest || newLatest.id !== previousLatestId) {
+            console.log('🆕 发现新播客，更新页面');
+            latestEpisode = newLatest;
+            renderLatestEpisode();
+        }
+
+        // 无过滤条件时用第一页替换列表；有过滤条件时重新执行过滤
+        const filters = getFilters();
+        if (filters.q || filters.days) {
+            await applyFilters();
+        } else if (listEpisodes.length <= CONFIG.EPISODES_PER_PAGE) {
+            listOffset = 1;
+            listEpisodes = data.podcasts.slice(1);
+            listTotal = data.total;
+            renderEpisodesList();
         }
+
+        updateStats();
     } catch (error) {
-        console.error('获取文件状态失败:', error);
+        console.log('⚠️ 刷新播客列表失败:', error);
+    }
+}
+
+// 不支持 SSE 时定期检查是否有新播客
+async function checkForNewEpisodes() {
+    try {
+        console.log('🔄 检查播客更新...');
+        // 只请求最新一期的ID和总数
+        const data = await fetchEpisodesPage({ offset: 0, limit: 1, fields: 'id' });
+
+        if (data.generation !== indexGeneration) {
+            await refreshEpisodes(data);
+        }
+    } catch (error) {
+        console.log('⚠️ 自动更新检查失败:', error);
     }
 }
 
@@ -95,9 +212,16 @@ function formatFileSize(bytes) {
 }
 
 // 全局变量
-let allEpisodes = [];
-let displayedEpisodes = [];
-let currentPage = 0;
+let latestEpisode = null;  // 最新一期
+let indexTotal = 0;        // 播客总数
+let listEpisodes = [];     // 列表中已加载的播客
+let listTotal = 0;         // 当前过滤条件下服务器端的结果总数
+let listOffset = 0;        // 列表在服务器结果中的起始位置（无过滤时跳过最新一期）
+let listRequestId = 0;     // 用于丢弃过期的列表请求结果
+let indexGeneration = null; // 服务器索引版本
+let cacheStats = null;     // 本地缓存统计
+let activeDownloads = {};  // 正在缓存的文件（服务器推送的下载进度）
+let pendingIndexRefresh = null; // 播放期间收到的索引更新
 
 // DOM 元素
 const elements = {
@@ -114,25 +238,36 @@ const elements = {
     transcriptModal: document.getElementById('transcript-modal'),
     modalCloseBtn: document.getElementById('modal-close-btn'),
     modalFullscreenBtn: document.getElementById('modal-fullscreen-btn'),
-    transcriptIframe: document.getElementById('transcript-iframe')
+    transcriptIframe: document.getElementById('transcript-iframe'),
+    transcriptArticles: document.getElementById('transcript-articles')
+};
+
+// 当前文稿弹窗的状态
+const transcriptState = {
+    episodeId: null,
+    loaded: 0,
+    total: 0
 };
 
 // 初始化应用
 document.addEventListener('DOMContentLoaded', async () => {
     console.log('🎧 播客展示应用启动');
     
-    // 显示加载状态
-    showLoading();
-    
     try {
-        // 加载播客数据
-        await loadPodcastData();
-        
-        // 渲染最新播客
-        renderLatestEpisode();
-        
-        // 渲染播客列表
-        renderEpisodesList();
+        // 服务器已预渲染首屏时直接使用内联数据，页面内容无需重新渲染
+        if (!loadInitialData()) {
+            // 显示加载状态
+            showLoading();
+
+            // 加载播客数据
+            await loadPodcastData();
+
+            // 渲染最新播客
+            renderLatestEpisode();
+
+            // 渲染播客列表
+            renderEpisodesList();
+        }
         
         // 更新统计信息
         updateStats();
@@ -146,8 +281,17 @@ document.addEventListener('DOMContentLoaded', async () => {
         // 检查文件下载状态
         checkFileStatus();
 
-        // 定期检查文件状态
-        setInterval(checkFileStatus, 30000); // 每30秒检查一次
+        // 订阅服务器推送（索引更新、下载进度、缓存统计）
+        connectServerEvents();
+
+        // 播放暂停或结束后应用播放期间收到的更新
+        document.addEventListener('pause', () => {
+            if (pendingIndexRefresh) {
+                const info = pendingIndexRefresh;
+                pendingIndexRefresh = null;
+                refreshEpisodes(info);
+            }
+        }, true);
 
         console.log('✅ 应用初始化完成');
 
@@ -157,52 +301,85 @@ document.addEventListener('DOMContentLoaded', async () => {
     }
 });
 
-// 加载播客数据
+// 请求一页播客数据（服务器端排序、过滤和分页）
+async function fetchEpisodesPage({ offset = 0, limit = CONFIG.EPISODES_PER_PAGE, q = '', days = '', fields = CONFIG.EPISODE_FIELDS } = {}) {
+    const params = new URLSearchParams({ offset, limit, fields });
+    if (q) params.set('q', q);
+    if (days) params.set('days', days);
+
+    // no-cache: 使用浏览器缓存前先用 ETag 验证，数据未变化时服务器只返回 304
+    const response = await fetch(`${CONFIG.DATA_SOURCE}?${params}`, { cache: 'no-cache' });
+
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    const data = await response.json();
+
+    // 检查是否有错误
+    if (data.error) {
+        throw new Error(data.error);
+    }
+
+    return data;
+}
+
+// 加载播客数据（首屏只需要一页）
 async function loadPodcastData() {
     try {
         console.log('📡 正在加载播客数据...');
-        
-        const response = await fetch(CONFIG.DATA_SOURCE);
-        
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        
-        const data = await response.json();
-        
-        // 检查是否有错误
-        if (data.error) {
-            throw new Error(data.error);
-        }
-        
-        allEpisodes = data.podcasts || [];
-        
-        console.log(`📚 成功加载 ${allEpisodes.length} 个播客`);
-        
-        // 按日期排序 (最新的在前)
-        allEpisodes.sort((a, b) => new Date(b.date) - new Date(a.date));
-        
+
+        const data = await fetchEpisodesPage({ offset: 0, limit: CONFIG.EPISODES_PER_PAGE });
+        applyFirstPage(data);
+
+        console.log(`📚 共 ${indexTotal} 个播客，已加载第一页`);
+
     } catch (error) {
         console.error('❌ 加载播客数据失败:', error);
         throw error;
     }
 }
 
+// 读取服务器内联的第一页数据（与 /api/podcasts 第一页相同），返回是否可用
+function loadInitialData() {
+    const script = document.getElementById('initial-data');
+    if (!script) return false;
+
+    try {
+        applyFirstPage(JSON.parse(script.textContent));
+        console.log(`📚 共 ${indexTotal} 个播客，使用服务器预渲染的第一页`);
+        return true;
+    } catch (error) {
+        console.log('⚠️ 内联数据无效，改为请求 API:', error);
+        return false;
+    }
+}
+
+// 第一条是最新一期，其余作为列表第一页
+function applyFirstPage(data) {
+    indexTotal = data.index_total;
+    indexGeneration = data.generation;
+    latestEpisode = data.podcasts[0] || null;
+    listOffset = 1;
+    listEpisodes = data.podcasts.slice(1);
+    listTotal = data.total;
+}
+
 // 渲染最新播客
 function renderLatestEpisode() {
-    if (allEpisodes.length === 0) {
+    if (!latestEpisode) {
         elements.latestEpisode.innerHTML = '<p>暂无播客内容</p>';
         return;
     }
     
-    const latest = allEpisodes[0];
+    const latest = latestEpisode;
     const audioUrl = buildUrl(CONFIG.BASE_URL, latest.audio_path, latest.local_audio_path);
     const transcriptUrl = buildUrl(CONFIG.BASE_URL, latest.transcript_path, latest.local_transcript_path);
     
     elements.latestEpisode.innerHTML = `
         <div class="episode-info">
             <h3 class="episode-title">${latest.title}</h3>
-            <p class="episode-date">📅 ${formatDate(latest.date)}</p>
+            <p class="episode-date">${formatDateLine(latest)}</p>
             <p class="episode-description">${latest.highlight || '探索出版行业的最新动态，聆听行业专家的深度解析'}</p>
         </div>
         <div class="episode-controls">
@@ -213,7 +390,7 @@ function renderLatestEpisode() {
                 </audio>
             ` : '<p>音频文件暂不可用</p>'}
             <div class="episode-actions">
-                ${transcriptUrl ? `<button class="btn btn-primary transcript-btn" onclick="openTranscriptModal('${transcriptUrl}', '${latest.title}')">📄 查看文稿</button>` : ''}
+                ${transcriptUrl ? `<button class="btn btn-primary transcript-btn" onclick="openTranscriptModal('${transcriptUrl}', '${latest.title}', '${latest.id}')">📄 查看文稿</button>` : ''}
                 ${audioUrl ? `<a href="${audioUrl}" class="btn btn-secondary download-btn" download>⬇️ 下载音频</a>` : ''}
             </div>
         </div>
@@ -222,21 +399,18 @@ function renderLatestEpisode() {
 
 // 渲染播客列表
 function renderEpisodesList() {
-    const filteredEpisodes = filterEpisodes();
-    displayedEpisodes = filteredEpisodes.slice(0, (currentPage + 1) * CONFIG.EPISODES_PER_PAGE);
-    
-    if (displayedEpisodes.length === 0) {
+    if (listEpisodes.length === 0) {
         elements.episodesContainer.innerHTML = '<div class="loading"><p>没有找到匹配的播客</p></div>';
         elements.loadMoreBtn.style.display = 'none';
         return;
     }
     
-    const episodesHTML = displayedEpisodes.slice(1).map(episode => createEpisodeCard(episode)).join('');
+    const episodesHTML = listEpisodes.map(episode => createEpisodeCard(episode)).join('');
     elements.episodesContainer.innerHTML = episodesHTML;
     
     // 控制"加载更多"按钮显示
     elements.loadMoreBtn.style.display = 
-        displayedEpisodes.length < filteredEpisodes.length ? 'block' : 'none';
+        listOffset + listEpisodes.length < listTotal ? 'block' : 'none';
 }
 
 // 创建播客卡片
@@ -247,7 +421,7 @@ function createEpisodeCard(episode) {
     return `
         <div class="episode-item" data-episode-id="${episode.id}">
             <h3 class="episode-title">${episode.title}</h3>
-            <p class="episode-date">📅 ${formatDate(episode.date)}</p>
+            <p class="episode-date">${formatDateLine(episode)}</p>
             <p class="episode-description">${episode.highlight || '探索出版行业的最新动态'}</p>
             <div class="episode-actions">
                 ${audioUrl ? `
@@ -257,7 +431,7 @@ function createEpisodeCard(episode) {
                     </audio>
                 ` : ''}
                 <div style="display: flex; gap: 0.5rem;">
-                    ${transcriptUrl ? `<button class="btn btn-primary transcript-btn" onclick="openTranscriptModal('${transcriptUrl}', '${episode.title}')">📄 文稿</button>` : ''}
+                    ${transcriptUrl ? `<button class="btn btn-primary transcript-btn" onclick="openTranscriptModal('${transcriptUrl}', '${episode.title}', '${episode.id}')">📄 文稿</button>` : ''}
                     ${audioUrl ? `<a href="${audioUrl}" class="btn btn-secondary" download>⬇️ 下载</a>` : ''}
                 </div>
             </div>
@@ -265,51 +439,66 @@ function createEpisodeCard(episode) {
     `;
 }
 
-// 过滤播客
-function filterEpisodes() {
-    let filtered = [...allEpisodes];
-    
-    // 搜索过滤
-    const searchTerm = elements.searchInput.value.toLowerCase().trim();
-    if (searchTerm) {
-        filtered = filtered.filter(episode =>
-            episode.title.toLowerCase().includes(searchTerm) ||
-            (episode.highlight && episode.highlight.toLowerCase().includes(searchTerm))
-        );
+// 当前的过滤条件
+function getFilters() {
+    return {
+        q: elements.searchInput.value.trim(),
+        days: elements.dateFilter.value
+    };
+}
+
+// 按过滤条件重新加载列表第一页
+async function applyFilters() {
+    const requestId = ++listRequestId;
+    const filters = getFilters();
+
+    try {
+        const data = await fetchEpisodesPage({ offset: 0, limit: CONFIG.EPISODES_PER_PAGE, ...filters });
+        if (requestId !== listRequestId) return;
+
+        // 无过滤条件时列表不重复显示最新一期
+        const skipLatest = !filters.q && !filters.days && data.podcasts.length > 0 &&
+            latestEpisode && data.podcasts[0].id === latestEpisode.id;
+        listOffset = skipLatest ? 1 : 0;
+        listEpisodes = data.podcasts.slice(listOffset);
+        listTotal = data.total;
+        renderEpisodesList();
+    } catch (error) {
+        console.error('❌ 过滤播客失败:', error);
+        showError('加载播客列表失败，请稍后重试');
     }
-    
-    // 日期过滤
-    const dateFilter = elements.dateFilter.value;
-    if (dateFilter) {
-        const daysAgo = parseInt(dateFilter);
-        const cutoffDate = new Date();
-        cutoffDate.setDate(cutoffDate.getDate() - daysAgo);
-        
-        filtered = filtered.filter(episode => new Date(episode.date) >= cutoffDate);
+}
+
+// 加载下一页
+async function loadMoreEpisodes() {
+    const requestId = listRequestId;
+
+    try {
+        const data = await fetchEpisodesPage({
+            offset: listOffset + listEpisodes.length,
+            limit: CONFIG.EPISODES_PER_PAGE,
+            ...getFilters()
+        });
+        if (requestId !== listRequestId) return;
+
+        listEpisodes = listEpisodes.concat(data.podcasts);
+        listTotal = data.total;
+        renderEpisodesList();
+    } catch (error) {
+        console.error('❌ 加载更多失败:', error);
     }
-    
-    return filtered;
 }
 
 // 绑定事件监听器
 function bindEventListeners() {
     // 搜索输入
-    elements.searchInput.addEventListener('input', debounce(() => {
-        currentPage = 0;
-        renderEpisodesList();
-    }, 300));
+    elements.searchInput.addEventListener('input', debounce(applyFilters, 300));
     
     // 日期过滤
-    elements.dateFilter.addEventListener('change', () => {
-        currentPage = 0;
-        renderEpisodesList();
-    });
+    elements.dateFilter.addEventListener('change', applyFilters);
     
     // 加载更多
-    elements.loadMoreBtn.addEventListener('click', () => {
-        currentPage++;
-        renderEpisodesList();
-    });
+    elements.loadMoreBtn.addEventListener('click', loadMoreEpisodes);
     
     // 平滑滚动
     document.querySelectorAll('a[href^="#"]').forEach(anchor => {
@@ -325,17 +514,17 @@ function bindEventListeners() {
 
 // 更新统计信息
 function updateStats() {
-    elements.totalEpisodes.textContent = allEpisodes.length;
+    elements.totalEpisodes.textContent = indexTotal;
     
     // 估算总时长 (假设每个播客15分钟)
-    const estimatedMinutes = allEpisodes.length * 15;
+    const estimatedMinutes = indexTotal * 15;
     const hours = Math.floor(estimatedMinutes / 60);
     const minutes = estimatedMinutes % 60;
     elements.totalDuration.textContent = `${hours}h ${minutes}m`;
     
     // 最后更新时间
-    if (allEpisodes.length > 0) {
-        elements.lastUpdate.textContent = formatDate(allEpisodes[0].date);
+    if (latestEpisode) {
+        elements.lastUpdate.textContent = formatDate(latestEpisode.date);
     }
     
     // 自动更新时间
@@ -352,6 +541,30 @@ function formatDate(dateString) {
     });
 }
 
+// 音频时长（服务器从 MP3 帧头读取），例如 12:05 或 1:02:05
+function formatDuration(seconds) {
+    const total = Math.round(seconds);
+    const hours = Math.floor(total / 3600);
+    const minutes = Math.floor(total / 60) % 60;
+    const secs = String(total % 60).padStart(2, '0');
+    return hours ? `${hours}:${String(minutes).padStart(2, '0')}:${secs}` : `${minutes}:${secs}`;
+}
+
+// 日期行：日期和音频时长（尚未读取到时只显示日期）
+function formatDateLine(episode) {
+    const date = `📅 ${formatDate(episode.date)}`;
+    return episode.duration ? `${date} · ⏱️ ${formatDuration(episode.duration)}` : date;
+}
+
+function escapeHtml(text) {
+    return String(text ?? '')
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#39;');
+}
+
 function debounce(func, wait) {
     let timeout;
     return function executedFunction(...args) {
@@ -382,22 +595,6 @@ function showError(message) {
     `;
 }
 
-// 自动刷新功能 (每30分钟检查一次更新)
-setInterval(async () => {
-    try {
-        console.log('🔄 检查播客更新...');
-        const oldCount = allEpisodes.length;
-        await loadPodcastData();
-        
-        if (allEpisodes.length > oldCount) {
-            console.log('🆕 发现新播客，自动刷新页面');
-            location.reload();
-        }
-    } catch (error) {
-        console.log('⚠️ 自动更新检查失败:', error);
-    }
-}, 30 * 60 * 1000); // 30分钟
-
 // 键盘快捷键
 document.addEventListener('keydown', (e) => {
     // Ctrl/Cmd + F 快速搜索
@@ -424,7 +621,7 @@ document.addEventListener('keydown', (e) => {
 });
 
 // 弹窗功能
-function openTranscriptModal(transcriptUrl, title) {
+async function openTranscriptModal(transcriptUrl, title, episodeId) {
     if (!transcriptUrl) {
         console.error('文稿链接无效');
         return;
@@ -446,6 +643,28 @@ function openTranscriptModal(transcriptUrl, title) {
         loadingDiv.style.display = 'flex';
     }
     elements.transcriptIframe.style.display = 'none';
+    elements.transcriptArticles.style.display = 'none';
+
+    // 优先使用结构化文稿接口，按页加载文章
+    if (episodeId) {
+        try {
+            transcriptState.episodeId = episodeId;
+            transcriptState.loaded = 0;
+            transcriptState.total = 0;
+            elements.transcriptArticles.innerHTML = '';
+            await loadTranscriptArticles();
+
+            if (loadingDiv) {
+                loadingDiv.style.display = 'none';
+            }
+            elements.transcriptArticles.style.display = 'block';
+            console.log(`📄 打开文稿弹窗: ${title}`);
+            return;
+        } catch (error) {
+            console.warn('结构化文稿不可用，加载原始文稿:', error);
+            transcriptState.episodeId = null;
+        }
+    }
 
     // 设置iframe源
     elements.transcriptIframe.src = transcriptUrl;
@@ -475,6 +694,65 @@ function openTranscriptModal(transcriptUrl, title) {
     console.log(`📄 打开文稿弹窗: ${title}`);
 }
 
+// 加载下一页文稿文章
+async function loadTranscriptArticles() {
+    const episodeId = transcriptState.episodeId;
+    const params = new URLSearchParams({ offset: transcriptState.loaded, limit: CONFIG.ARTICLES_PER_PAGE });
+    const response = await fetch(`/api/transcripts/${encodeURIComponent(episodeId)}/articles?${params}`);
+
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    const data = await response.json();
+    if (episodeId !== transcriptState.episodeId) return;
+
+    transcriptState.loaded += data.articles.length;
+    transcriptState.total = data.total;
+
+    const moreBtn = elements.transcriptArticles.querySelector('.transcript-more-btn');
+    if (moreBtn) {
+        moreBtn.remove();
+    }
+
+    elements.transcriptArticles.insertAdjacentHTML('beforeend', data.articles.map(article => `
+        <div class="transcript-article">
+            <h4 class="transcript-article-title">文章${article.index + 1}/${data.total}: ${escapeHtml(article.title)}</h4>
+            <p class="transcript-article-meta">
+                ${article.source ? `<span>来源：${escapeHtml(article.source)}</span>` : ''}
+                ${article.published_at ? `<span>发布时间：${escapeHtml(article.published_at)}</span>` : ''}
+                ${article.url ? `<a href="${escapeHtml(article.url)}" target="_blank" rel="noopener">原文链接</a>` : ''}
+            </p>
+            <p class="transcript-article-body">${escapeHtml(article.excerpt)}…</p>
+            <button class="btn btn-outline transcript-article-toggle" onclick="expandTranscriptArticle(${article.index}, this)">展开全文</button>
+        </div>
+    `).join(''));
+
+    if (transcriptState.loaded < transcriptState.total) {
+        elements.transcriptArticles.insertAdjacentHTML('beforeend',
+            `<button class="btn btn-primary transcript-more-btn" onclick="loadTranscriptArticles()">加载更多文章 (${transcriptState.loaded}/${transcriptState.total})</button>`);
+    }
+}
+
+// 展开单篇文章全文
+async function expandTranscriptArticle(index, button) {
+    try {
+        button.disabled = true;
+        const response = await fetch(`/api/transcripts/${encodeURIComponent(transcriptState.episodeId)}/articles/${index}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const article = await response.json();
+        const body = button.parentNode.querySelector('.transcript-article-body');
+        body.innerHTML = escapeHtml(article.summary).replace(/\n/g, '<br>');
+        button.remove();
+    } catch (error) {
+        console.error('加载文章失败:', error);
+        button.disabled = false;
+    }
+}
+
 function closeTranscriptModal() {
     elements.transcriptModal.classList.remove('active');
     document.body.style.overflow = ''; // 恢复背景滚动
@@ -483,6 +761,9 @@ function closeTranscriptModal() {
     setTimeout(() => {
         elements.transcriptIframe.src = '';
         elements.transcriptIframe.style.display = 'none';
+        elements.transcriptArticles.innerHTML = '';
+        elements.transcriptArticles.style.display = 'none';
+        transcriptState.episodeId = null;
 
         // 重置加载状态
         const loadingDiv = elements.transcriptModal.querySelector('.modal-loading');
@@ -0,0 +1,199 @@
+"""文稿全文索引：基于 SQLite FTS5，按中文双字（bigram）分词，搜索结果带高亮摘要"""
+import html
+import os
+import re
+import sqlite3
+import time
+
+from config import CONFIG, FILE_STORAGE
+from episode_index import get_episode_index
+from storage import get_state_db, state_file_lock
+from transcripts import extract_transcript_structure, is_transcript_variant
+
+# 文稿全文索引 - 基于 SQLite FTS5，写入前按中文双字（bigram）切分
+SEARCH_INDEX = {
+    'db_name': 'search_index.sqlite3',
+    'synced_pid': None,
+    'available': True
+}
+
+SEARCH_INDEX_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS articles USING fts5(
+    body_tokens, title_tokens,
+    episode_id UNINDEXED, article_index UNINDEXED, title UNINDEXED,
+    source UNINDEXED, url UNINDEXED, published_at UNINDEXED, text UNINDEXED
+);
+CREATE TABLE IF NOT EXISTS indexed_transcripts (
+    episode_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    articles INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+'''
+
+# 分词：连续的中日韩汉字切分为双字，字母数字按单词
+SEARCH_TOKEN_PATTERN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[a-z0-9]+')
+
+def get_search_db():
+    """获取全文索引数据库连接"""
+    return get_state_db(SEARCH_INDEX['db_name'], SEARCH_INDEX_SCHEMA)
+
+def tokenize_search_text(text):
+    """分词：汉字按双字切分（单个汉字保留为单字），字母数字按单词"""
+    tokens = []
+    for match in SEARCH_TOKEN_PATTERN.finditer(text.lower()):
+        run = match.group()
+        if run[0] >= '\u3400' and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+def build_search_match_query(query):
+    """将搜索词转换为 FTS5 查询：每个关键词的双字序列作为短语，多个关键词取交集"""
+    phrases = []
+    for keyword in query.lower().split():
+        tokens = tokenize_search_text(keyword)
+        if not tokens:
+            continue
+        if len(tokens) == 1 and len(tokens[0]) == 1 and tokens[0] >= '\u3400':
+            # 单个汉字：匹配以该字开头的双字
+            phrases.append(f'"{tokens[0]}"*')
+        else:
+            phrases.append('"' + ' '.join(tokens) + '"')
+    return ' AND '.join(phrases)
+
+def index_transcript_file(local_path):
+    """解析文稿并写入全文索引；文件未变化（mtime 和大小相同）时跳过"""
+    if not SEARCH_INDEX['available']:
+        return False
+
+    episode_id = os.path.basename(os.path.dirname(local_path))
+    stat = os.stat(local_path)
+    db = get_search_db()
+
+    row = db.execute('SELECT mtime_ns, size FROM indexed_transcripts WHERE episode_id = ?', (episode_id,)).fetchone()
+    if row and row['mtime_ns'] == stat.st_mtime_ns and row['size'] == stat.st_size:
+        return False
+
+    articles = extract_transcript_structure(local_path)['articles']
+
+    with db:
+        db.execute('DELETE FROM articles WHERE episode_id = ?', (episode_id,))
+        db.executemany(
+            'INSERT INTO articles (body_tokens, title_tokens, episode_id, article_index, title, source, url, published_at, text) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [
+                (
+                    ' '.join(tokenize_search_text(f"{article['source']}\n{article['summary']}")),
+                    ' '.join(tokenize_search_text(article['title'])),
+                    episode_id, article['index'], article['title'], article['source'],
+                    article['url'], article['published_at'], article['summary']
+                )
+                for article in articles
+            ]
+        )
+        db.execute(
+            'INSERT OR REPLACE INTO indexed_transcripts (episode_id, path, mtime_ns, size, articles, indexed_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (episode_id, local_path, stat.st_mtime_ns, stat.st_size, len(articles), time.time())
+        )
+
+    print(f"🔎 已索引文稿 {episode_id}: {len(articles)} 篇文章")
+    return True
+
+def remove_transcript_from_index(episode_id):
+    """从全文索引中移除某一期的文稿"""
+    if not SEARCH_INDEX['available']:
+        return
+    db = get_search_db()
+    with db:
+        db.execute('DELETE FROM articles WHERE episode_id = ?', (episode_id,))
+        db.execute('DELETE FROM indexed_transcripts WHERE episode_id = ?', (episode_id,))
+
+def sync_search_index():
+    """每个进程首次搜索时，补充索引尚未索引的文稿并移除已删除的文稿"""
+    if SEARCH_INDEX['synced_pid'] == os.getpid():
+        return
+    SEARCH_INDEX['synced_pid'] = os.getpid()
+
+    try:
+        with state_file_lock('search_index'):
+            db = get_search_db()
+            indexed = {row['episode_id']: row['path'] for row in db.execute('SELECT episode_id, path FROM indexed_transcripts')}
+
+            for episode_id, path in indexed.items():
+                if not os.path.exists(path):
+                    remove_transcript_from_index(episode_id)
+
+            for root, dirs, files in os.walk(FILE_STORAGE['transcript_dir']):
+                for file in files:
+                    if file.endswith('.html') and not is_transcript_variant(file):
+                        index_transcript_file(os.path.join(root, file))
+    except sqlite3.OperationalError as e:
+        # 例如 SQLite 未编译 FTS5 扩展
+        SEARCH_INDEX['available'] = False
+        print(f"全文索引不可用: {e}")
+
+def build_search_snippet(text, keywords):
+    """截取包含关键词的上下文片段，转义 HTML 并用 <mark> 标记关键词"""
+    context = CONFIG['SEARCH_SNIPPET_CONTEXT']
+    lowered = text.lower()
+    positions = [lowered.find(keyword) for keyword in keywords if keyword and lowered.find(keyword) >= 0]
+    position = min(positions) if positions else 0
+
+    start = max(position - context, 0)
+    end = min(position + context * 2, len(text))
+    snippet = text[start:end].replace('\n', ' ')
+
+    # 在原文上按关键词切分（长的关键词优先），各段分别转义后再标记，关键词不会匹配到实体或插入的标签
+    keywords = sorted({keyword for keyword in keywords if keyword}, key=len, reverse=True)
+    if keywords:
+        pattern = re.compile('(' + '|'.join(re.escape(keyword) for keyword in keywords) + ')', re.IGNORECASE)
+        parts = pattern.split(snippet)
+    else:
+        parts = [snippet]
+    # 切分结果中奇数位置是匹配到的关键词
+    snippet = ''.join(f"<mark>{html.escape(part)}</mark>" if index % 2 else html.escape(part)
+                      for index, part in enumerate(parts))
+
+    return f"{'…' if start > 0 else ''}{snippet}{'…' if end < len(text) else ''}"
+
+def search_transcripts(query, offset=0, limit=10):
+    """全文搜索文稿，返回按 BM25 排序的文章结果"""
+    sync_search_index()
+    match_query = build_search_match_query(query)
+    if not match_query or not SEARCH_INDEX['available']:
+        return [], 0
+
+    db = get_search_db()
+    total = db.execute('SELECT count(*) FROM articles WHERE articles MATCH ?', (match_query,)).fetchone()[0]
+    rows = db.execute(
+        'SELECT episode_id, article_index, title, source, url, published_at, text, '
+        'bm25(articles, 1.0, 3.0) AS score '
+        'FROM articles WHERE articles MATCH ? ORDER BY score LIMIT ? OFFSET ?',
+        (match_query, limit, offset)
+    ).fetchall()
+
+    episodes_by_id = get_episode_index()['by_id']
+    keywords = query.lower().split()
+    results = []
+    for row in rows:
+        episode = episodes_by_id.get(row['episode_id'], {})
+        results.append({
+            'episode_id': row['episode_id'],
+            'episode_title': episode.get('title'),
+            'episode_date': episode.get('date'),
+            'transcript_path': episode.get('local_transcript_path'),
+            'article_index': row['article_index'],
+            'title': row['title'],
+            'source': row['source'],
+            'url': row['url'],
+            'published_at': row['published_at'],
+            # bm25() 越小越相关，取反后越大越相关
+            'score': round(-row['score'], 4),
+            'snippet': build_search_snippet(row['text'], keywords)
+        })
+    return results, total
@@ -0,0 +1,526 @@
+"""本地存储：缓存目录、运行状态数据库、存储清单和按 SHA-256 去重的内容对象"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+
+from config import CONFIG, FILE_STORAGE, PERSISTENT_STORAGE, USE_PERSISTENT_STORAGE
+from transcripts import is_transcript_variant
+
+try:
+    import fcntl  # 跨进程文件锁（Linux/macOS）
+except ImportError:
+    fcntl = None
+
+# 缓存目录中服务内部使用的文件后缀
+INTERNAL_FILE_SUFFIXES = ('.part', '.part.meta', '.articles.json', '.link', '.tmp')
+
+# 每个线程各自的 SQLite 连接（运行状态数据库，例如全文索引）
+STATE_DB = threading.local()
+
+# 存储清单 - 记录每个缓存文件的大小、校验和、下载和访问时间，按类型汇总的统计由触发器维护
+MANIFEST = {
+    'db_name': 'manifest.sqlite3',
+    'lock': threading.Lock(),
+    'pending_access': {},  # path -> [未写入的访问次数, 上次写入时间]
+    'ready_pid': None
+}
+
+MANIFEST_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    episode_id TEXT,
+    file_type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    checksum TEXT,
+    downloaded_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    access_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS files_type_downloaded ON files (file_type, downloaded_at);
+CREATE INDEX IF NOT EXISTS files_checksum ON files (checksum);
+CREATE TABLE IF NOT EXISTS totals (
+    file_type TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contents (
+    file_type TEXT NOT NULL,
+    content_key TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    refs INTEGER NOT NULL,
+    PRIMARY KEY (file_type, content_key)
+);
+CREATE TABLE IF NOT EXISTS content_totals (
+    file_type TEXT PRIMARY KEY,
+    bytes INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS evicted (
+    path TEXT PRIMARY KEY,
+    evicted_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS verified (
+    path TEXT PRIMARY KEY,
+    verified_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS audio_metadata (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    duration REAL,
+    bitrate INTEGER,
+    sample_rate INTEGER,
+    channels INTEGER,
+    vbr INTEGER NOT NULL DEFAULT 0,
+    scanned_at REAL NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS files_after_insert AFTER INSERT ON files BEGIN
+    INSERT INTO totals (file_type, count, bytes) VALUES (NEW.file_type, 1, NEW.size)
+    ON CONFLICT (file_type) DO UPDATE SET count = count + 1, bytes = bytes + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS files_after_delete AFTER DELETE ON files BEGIN
+    UPDATE totals SET count = count - 1, bytes = bytes - OLD.size WHERE file_type = OLD.file_type;
+END;
+CREATE TRIGGER IF NOT EXISTS files_after_update AFTER UPDATE OF file_type, size ON files BEGIN
+    UPDATE totals SET count = count - 1, bytes = bytes - OLD.size WHERE file_type = OLD.file_type;
+    INSERT INTO totals (file_type, count, bytes) VALUES (NEW.file_type, 1, NEW.size)
+    ON CONFLICT (file_type) DO UPDATE SET count = count + 1, bytes = bytes + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS files_contents_after_insert AFTER INSERT ON files BEGIN
+    INSERT INTO content_totals (file_type, bytes) SELECT NEW.file_type, NEW.size WHERE NOT EXISTS (
+        SELECT 1 FROM contents WHERE file_type = NEW.file_type AND content_key = COALESCE(NEW.checksum, NEW.path)
+    ) ON CONFLICT (file_type) DO UPDATE SET bytes = bytes + excluded.bytes;
+    INSERT INTO contents (file_type, content_key, size, refs) VALUES (NEW.file_type, COALESCE(NEW.checksum, NEW.path), NEW.size, 1)
+    ON CONFLICT (file_type, content_key) DO UPDATE SET refs = refs + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS files_contents_after_delete AFTER DELETE ON files BEGIN
+    UPDATE contents SET refs = refs - 1 WHERE file_type = OLD.file_type AND content_key = COALESCE(OLD.checksum, OLD.path);
+    UPDATE content_totals SET bytes = bytes - (
+        SELECT size FROM contents WHERE file_type = OLD.file_type AND content_key = COALESCE(OLD.checksum, OLD.path)
+    ) WHERE file_type = OLD.file_type AND EXISTS (
+        SELECT 1 FROM contents WHERE file_type = OLD.file_type AND content_key = COALESCE(OLD.checksum, OLD.path) AND refs <= 0
+    );
+    DELETE FROM contents WHERE file_type = OLD.file_type AND content_key = COALESCE(OLD.checksum, OLD.path) AND refs <= 0;
+END;
+CREATE TRIGGER IF NOT EXISTS files_contents_after_update AFTER UPDATE OF file_type, size, checksum ON files BEGIN
+    UPDATE contents SET refs = refs - 1 WHERE file_type = OLD.file_type AND content_key = COALESCE(OLD.checksum, OLD.path);
+    UPDATE content_totals SET bytes = bytes - (
+        SELECT size FROM contents WHERE file_type = OLD.file_type AND content_key = COALESCE(OLD.checksum, OLD.path)
+    ) WHERE file_type = OLD.file_type AND EXISTS (
+        SELECT 1 FROM contents WHERE file_type = OLD.file_type AND content_key = COALESCE(OLD.checksum, OLD.path) AND refs <= 0
+    );
+    DELETE FROM contents WHERE file_type = OLD.file_type AND content_key = COALESCE(OLD.checksum, OLD.path) AND refs <= 0;
+    INSERT INTO content_totals (file_type, bytes) SELECT NEW.file_type, NEW.size WHERE NOT EXISTS (
+        SELECT 1 FROM contents WHERE file_type = NEW.file_type AND content_key = COALESCE(NEW.checksum, NEW.path)
+    ) ON CONFLICT (file_type) DO UPDATE SET bytes = bytes + excluded.bytes;
+    INSERT INTO contents (file_type, content_key, size, refs) VALUES (NEW.file_type, COALESCE(NEW.checksum, NEW.path), NEW.size, 1)
+    ON CONFLICT (file_type, content_key) DO UPDATE SET refs = refs + 1;
+END;
+DROP TRIGGER IF EXISTS files_checksum_after_insert;
+DROP TRIGGER IF EXISTS files_checksum_after_delete;
+DROP TRIGGER IF EXISTS files_checksum_after_update;
+CREATE TRIGGER IF NOT EXISTS files_checksum_after_change AFTER UPDATE OF checksum ON files
+WHEN OLD.checksum IS NOT NULL AND OLD.checksum IS NOT NEW.checksum BEGIN
+    INSERT INTO meta (key, value) VALUES ('checksum_revision', 1)
+    ON CONFLICT (key) DO UPDATE SET value = value + 1;
+END;
+'''
+
+# 已缓存文件的 SHA-256 - 文件 URL 带上 ?v=<校验和前缀> 后内容不再变化，浏览器可长期缓存。
+# 只有已有文件的内容变化（触发器递增 checksum_revision）才使播客索引重建；新下载的文件在索引因其他原因重建时带上版本，
+# 在此之前使用不带版本的 URL（每次验证 ETag）
+FILE_CHECKSUMS = {
+    'lock': threading.Lock(),
+    'revision': None,
+    'checked_at': 0
+}
+FILE_VERSION_LENGTH = 16
+
+# 确保文件存储目录存在
+def ensure_storage_directories():
+    """确保文件存储目录存在"""
+    if USE_PERSISTENT_STORAGE:
+        # 使用持久化存储
+        os.makedirs(FILE_STORAGE['audio_dir'], exist_ok=True)
+        os.makedirs(FILE_STORAGE['transcript_dir'], exist_ok=True)
+        os.makedirs(FILE_STORAGE['object_dir'], exist_ok=True)
+        os.makedirs(FILE_STORAGE['state_dir'], exist_ok=True)
+        print(f"📁 使用持久化存储: {PERSISTENT_STORAGE}")
+    else:
+        # 使用临时存储（用于测试）
+        FILE_STORAGE['base_dir'] = 'static_files'
+        FILE_STORAGE['audio_dir'] = 'static_files/audio'
+        FILE_STORAGE['transcript_dir'] = 'static_files/transcripts'
+        FILE_STORAGE['object_dir'] = 'static_files/objects'
+        FILE_STORAGE['state_dir'] = 'static_files/state'
+        os.makedirs(FILE_STORAGE['audio_dir'], exist_ok=True)
+        os.makedirs(FILE_STORAGE['transcript_dir'], exist_ok=True)
+        os.makedirs(FILE_STORAGE['object_dir'], exist_ok=True)
+        os.makedirs(FILE_STORAGE['state_dir'], exist_ok=True)
+        print("📁 使用临时存储（测试模式）")
+
+    # 确保静态文件目录存在
+    os.makedirs('static', exist_ok=True)
+
+def get_local_file_path(remote_path, file_type):
+    """将远程路径转换为本地路径"""
+    if not remote_path:
+        return None
+
+    # 解析远程路径
+    parsed = urllib.parse.urlparse(remote_path)
+    if parsed.path:
+        # 从路径中提取文件名
+        path_parts = parsed.path.split('/')
+        filename = path_parts[-1] if path_parts[-1] else path_parts[-2]
+
+        # 获取文件所在的目录名作为子目录
+        dir_name = path_parts[-2] if len(path_parts) > 2 else ''
+
+        if file_type == 'audio':
+            return os.path.join(FILE_STORAGE['audio_dir'], dir_name, filename)
+        elif file_type == 'transcript':
+            return os.path.join(FILE_STORAGE['transcript_dir'], dir_name, filename)
+
+    return None
+
+def get_storage_info():
+    """获取存储空间信息"""
+    try:
+        import shutil
+
+        if not os.path.exists(FILE_STORAGE['base_dir']):
+            return {
+                'total_space': 0,
+                'used_space': 0,
+                'free_space': 0,
+                'usage_percent': 0
+            }
+
+        total, used, free = shutil.disk_usage(FILE_STORAGE['base_dir'])
+        usage_percent = (used / total) * 100 if total > 0 else 0
+
+        return {
+            'total_space': total,
+            'used_space': used,
+            'free_space': free,
+            'usage_percent': usage_percent
+        }
+    except Exception as e:
+        print(f"获取存储信息失败: {e}")
+        return None
+
+def get_manifest_key(local_path):
+    """存储清单中的文件键：相对于存储根目录的路径"""
+    return os.path.relpath(local_path, FILE_STORAGE['base_dir'])
+
+def get_manifest_db():
+    """获取存储清单数据库连接；每个部署首次使用时从现有文件建立清单"""
+    db = get_state_db(MANIFEST['db_name'], MANIFEST_SCHEMA)
+    if MANIFEST['ready_pid'] != os.getpid():
+        MANIFEST['ready_pid'] = os.getpid()
+        bootstrap_manifest(db)
+        bootstrap_content_totals(db)
+    return db
+
+def bootstrap_manifest(db):
+    """清单为空时扫描一次已有文件（升级或清单丢失时），之后只做增量更新"""
+    if db.execute("SELECT value FROM meta WHERE key = 'bootstrapped_at'").fetchone():
+        return
+
+    with state_file_lock('manifest'):
+        if db.execute("SELECT value FROM meta WHERE key = 'bootstrapped_at'").fetchone():
+            return
+
+        current_time = time.time()
+        entries = []
+        for file_type, directory, extensions in (('audio', FILE_STORAGE['audio_dir'], ('.mp3',)),
+                                                 ('transcript', FILE_STORAGE['transcript_dir'], ('.html', '.txt'))):
+            for root, dirs, files in os.walk(directory):
+                for file in files:
+                    if file.endswith(extensions) and not is_transcript_variant(file):
+                        file_path = os.path.join(root, file)
+                        stat = os.stat(file_path)
+                        entries.append((get_manifest_key(file_path), os.path.basename(root), file_type,
+                                        stat.st_size, None, stat.st_mtime, current_time))
+
+        with db:
+            db.executemany(
+                'INSERT OR IGNORE INTO files (path, episode_id, file_type, size, checksum, downloaded_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                entries
+            )
+            db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('bootstrapped_at', ?)", (str(current_time),))
+        print(f"🗂️  已建立存储清单: {len(entries)} 个文件")
+
+def bootstrap_content_totals(db):
+    """按内容去重的统计（contents/content_totals）由触发器维护；升级后首次使用时从现有清单汇总一次"""
+    if db.execute("SELECT value FROM meta WHERE key = 'content_totals_at'").fetchone():
+        return
+
+    with state_file_lock('manifest'):
+        if db.execute("SELECT value FROM meta WHERE key = 'content_totals_at'").fetchone():
+            return
+
+        with db:
+            db.execute('DELETE FROM contents')
+            db.execute('DELETE FROM content_totals')
+            db.execute(
+                'INSERT INTO contents (file_type, content_key, size, refs) '
+                'SELECT file_type, COALESCE(checksum, path), MAX(size), COUNT(*) FROM files '
+                'GROUP BY file_type, COALESCE(checksum, path)'
+            )
+            db.execute('INSERT INTO content_totals (file_type, bytes) SELECT file_type, SUM(size) FROM contents GROUP BY file_type')
+            db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('content_totals_at', ?)", (str(time.time()),))
+
+def record_manifest_file(local_path, file_type, checksum=None):
+    """记录（或更新）一个已缓存文件"""
+    current_time = time.time()
+    db = get_manifest_db()
+    with db:
+        db.execute(
+            'INSERT INTO files (path, episode_id, file_type, size, checksum, downloaded_at, last_access) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (path) DO UPDATE SET size = excluded.size, checksum = excluded.checksum, '
+            'downloaded_at = excluded.downloaded_at, file_type = excluded.file_type',
+            (get_manifest_key(local_path), os.path.basename(os.path.dirname(local_path)), file_type,
+             os.path.getsize(local_path), checksum, current_time, current_time)
+        )
+
+def remove_manifest_file(local_path):
+    """从清单中移除文件"""
+    db = get_manifest_db()
+    with db:
+        db.execute('DELETE FROM files WHERE path = ?', (get_manifest_key(local_path),))
+        db.execute('DELETE FROM verified WHERE path = ?', (get_manifest_key(local_path),))
+
+def record_file_access(local_path):
+    """记录文件访问；同一文件在 ACCESS_FLUSH_INTERVAL 内的访问在内存中累计后再写入"""
+    key = get_manifest_key(local_path)
+    current_time = time.time()
+
+    with MANIFEST['lock']:
+        pending = MANIFEST['pending_access'].setdefault(key, [0, 0])
+        pending[0] += 1
+        if current_time - pending[1] < CONFIG['ACCESS_FLUSH_INTERVAL']:
+            return
+        access_count = pending[0]
+        MANIFEST['pending_access'][key] = [0, current_time]
+
+    try:
+        db = get_manifest_db()
+        with db:
+            db.execute('UPDATE files SET last_access = ?, access_count = access_count + ? WHERE path = ?',
+                       (current_time, access_count, key))
+    except sqlite3.Error as e:
+        print(f"记录文件访问失败 {key}: {e}")
+
+def get_manifest_totals():
+    """按类型汇总的文件数量和大小（由触发器维护，无需扫描）"""
+    totals = {'audio': {'count': 0, 'bytes': 0}, 'transcript': {'count': 0, 'bytes': 0}}
+    for row in get_manifest_db().execute('SELECT file_type, count, bytes FROM totals'):
+        totals[row['file_type']] = {'count': row['count'], 'bytes': row['bytes']}
+    return totals
+
+def get_manifest_file(local_path):
+    """查询单个文件的清单记录"""
+    return get_manifest_db().execute(
+        'SELECT size, checksum FROM files WHERE path = ?', (get_manifest_key(local_path),)
+    ).fetchone()
+
+def get_recent_manifest_files(file_type, limit=5):
+    """最近下载的文件"""
+    type_dir = FILE_STORAGE['audio_dir'] if file_type == 'audio' else FILE_STORAGE['transcript_dir']
+    rows = get_manifest_db().execute(
+        'SELECT path, size FROM files WHERE file_type = ? ORDER BY downloaded_at DESC LIMIT ?',
+        (file_type, limit)
+    ).fetchall()
+    return [{
+        'filename': os.path.basename(row['path']),
+        'path': os.path.relpath(os.path.join(FILE_STORAGE['base_dir'], row['path']), type_dir),
+        'size': row['size']
+    } for row in rows]
+
+def get_cache_usage():
+    """按类型统计实际占用的字节数：内容相同（校验和相同）的文件只计算一次（由触发器维护，无需扫描）"""
+    usage = {'audio': 0, 'transcript': 0}
+    for row in get_manifest_db().execute('SELECT file_type, bytes FROM content_totals'):
+        usage[row['file_type']] = row['bytes']
+    return usage
+
+def get_object_path(checksum):
+    """内容对象的存储路径：objects/前两位/完整 SHA-256"""
+    return os.path.join(FILE_STORAGE['object_dir'], checksum[:2], checksum)
+
+def compute_file_checksum(file_path):
+    """分块计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(CONFIG['DOWNLOAD_CHUNK_SIZE']), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def link_content_object(local_path, checksum):
+    """把文件加入内容存储，返回是否与已有内容去重
+
+    对象不存在时为当前文件建立硬链接；已存在且内容一致时，把当前文件替换为指向对象的
+    硬链接（原子重命名，正在读取旧文件的请求不受影响），相同内容在磁盘上只保存一份。
+    """
+    if not checksum:
+        return False
+
+    object_path = get_object_path(checksum)
+    temp_path = f"{local_path}.{os.getpid()}.link"
+    try:
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        if os.path.exists(object_path) and os.path.samefile(object_path, local_path):
+            return False
+
+        # 已有对象需与当前文件一致（大小和内容），否则以当前文件替换损坏的对象
+        shared = (os.path.exists(object_path) and
+                  os.path.getsize(object_path) == os.path.getsize(local_path) and
+                  compute_file_checksum(object_path) == checksum)
+        if shared:
+            os.link(object_path, temp_path)
+            os.replace(temp_path, local_path)
+            print(f"♻️  内容与已有文件相同，已改为硬链接: {get_manifest_key(local_path)}")
+        else:
+            os.link(local_path, temp_path)
+            os.replace(temp_path, object_path)
+        return shared
+    except OSError as e:
+        # 例如文件系统不支持硬链接，此时文件照常保存，只是不去重
+        print(f"加入内容存储失败 {local_path}: {e}")
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        return False
+
+def release_content_object(checksum):
+    """内容对象不再被任何播客文件引用（只剩对象本身一个链接）时删除"""
+    object_path = get_object_path(checksum)
+    try:
+        if os.stat(object_path).st_nlink <= 1:
+            os.remove(object_path)
+    except OSError:
+        pass
+
+def collect_orphan_objects():
+    """删除没有播客文件引用的内容对象（例如进程在删除文件和释放对象之间退出）"""
+    removed = 0
+    for root, dirs, files in os.walk(FILE_STORAGE['object_dir']):
+        for file in files:
+            object_path = os.path.join(root, file)
+            try:
+                if os.stat(object_path).st_nlink <= 1:
+                    os.remove(object_path)
+                    removed += 1
+            except OSError:
+                pass
+    return removed
+
+def record_file_verified(local_path):
+    """记录文件通过完整性校验的时间"""
+    db = get_manifest_db()
+    with db:
+        db.execute('INSERT OR REPLACE INTO verified (path, verified_at) VALUES (?, ?)',
+                   (get_manifest_key(local_path), time.time()))
+
+def get_content_store_status():
+    """去重节省的空间和完整性校验进度"""
+    db = get_manifest_db()
+    totals = get_manifest_totals()
+    usage = get_cache_usage()
+    verified = db.execute(
+        'SELECT COUNT(*) FROM verified v JOIN files f ON f.path = v.path WHERE v.verified_at >= ?',
+        (time.time() - CONFIG['VERIFY_INTERVAL'],)
+    ).fetchone()[0]
+    return {
+        'unique_bytes': sum(usage.values()),
+        'deduplicated_bytes': sum(totals[file_type]['bytes'] - usage[file_type] for file_type in usage),
+        'verified_files': verified,
+        'unverified_files': sum(total['count'] for total in totals.values()) - verified,
+        'verify_interval': CONFIG['VERIFY_INTERVAL']
+    }
+
+def get_checksum_revision():
+    """已缓存文件内容变化的次数；与音频元数据一样，最多每 SNAPSHOT_CHECK_INTERVAL 秒查询一次"""
+    current_time = time.time()
+    if current_time - FILE_CHECKSUMS['checked_at'] < CONFIG['SNAPSHOT_CHECK_INTERVAL']:
+        return FILE_CHECKSUMS['revision']
+
+    with FILE_CHECKSUMS['lock']:
+        if current_time - FILE_CHECKSUMS['checked_at'] >= CONFIG['SNAPSHOT_CHECK_INTERVAL']:
+            try:
+                row = get_manifest_db().execute("SELECT value FROM meta WHERE key = 'checksum_revision'").fetchone()
+                FILE_CHECKSUMS['revision'] = row['value'] if row else 0
+            except sqlite3.Error as e:
+                print(f"读取文件校验和失败: {e}")
+            FILE_CHECKSUMS['checked_at'] = current_time
+    return FILE_CHECKSUMS['revision']
+
+def load_file_checksums():
+    """读取清单中所有文件的校验和前缀 {清单路径: 校验和前缀}（只在重建播客索引时调用）"""
+    try:
+        return {
+            row['path']: row['checksum'][:FILE_VERSION_LENGTH]
+            for row in get_manifest_db().execute('SELECT path, checksum FROM files WHERE checksum IS NOT NULL')
+        }
+    except sqlite3.Error as e:
+        print(f"读取文件校验和失败: {e}")
+        return {}
+
+def get_evicted_paths():
+    """已被淘汰的文件（本地路径），刷新索引时不再主动下载"""
+    rows = get_manifest_db().execute('SELECT path FROM evicted').fetchall()
+    return {os.path.join(FILE_STORAGE['base_dir'], row['path']) for row in rows}
+
+def clear_evicted_file(local_path):
+    """文件重新被访问或被固定时，清除淘汰标记"""
+    db = get_manifest_db()
+    with db:
+        db.execute('DELETE FROM evicted WHERE path = ?', (get_manifest_key(local_path),))
+
+def get_state_db(name, schema):
+    """获取当前线程的 SQLite 连接（按数据库文件缓存，fork 后重新打开）"""
+    if getattr(STATE_DB, 'pid', None) != os.getpid():
+        STATE_DB.pid = os.getpid()
+        STATE_DB.connections = {}
+
+    connection = STATE_DB.connections.get(name)
+    if connection is None:
+        os.makedirs(FILE_STORAGE['state_dir'], exist_ok=True)
+        connection = sqlite3.connect(os.path.join(FILE_STORAGE['state_dir'], name), timeout=30)
+        connection.row_factory = sqlite3.Row
+        # WAL 模式下多个 worker 可以同时读，写入互不阻塞读
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.executescript(schema)
+        STATE_DB.connections[name] = connection
+    return connection
+
+def is_internal_file(filename):
+    """是否为服务内部使用的文件（下载片段及其元数据、结构化文稿、写入中的临时文件），不通过文件路由提供"""
+    return os.path.basename(filename).endswith(INTERNAL_FILE_SUFFIXES)
+
+@contextmanager
+def state_file_lock(name):
+    """跨 worker 的文件锁，例如保证同一时间只有一个进程请求上游"""
+    if fcntl is None:
+        yield
+        return
+
+    os.makedirs(FILE_STORAGE['state_dir'], exist_ok=True)
+    with open(os.path.join(FILE_STORAGE['state_dir'], f"{name}.lock"), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,16 @@
+"""测试环境：在临时目录中导入 app（临时存储、不访问上游、不启动后台同步）"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ['USE_PERSISTENT_STORAGE'] = 'false'
+os.environ['SYNC_ENABLED'] = 'false'
+os.environ['DATA_SOURCE'] = 'http://127.0.0.1:9/podcast_index.json'
+os.environ['BACKUP_DATA_SOURCE'] = 'http://127.0.0.1:9/podcast_index.json'
+os.environ['BASE_URL'] = 'http://127.0.0.1:9'
+
+# app 在导入时于当前目录下创建 static_files/
+os.chdir(tempfile.mkdtemp(prefix='podcast-tests-'))
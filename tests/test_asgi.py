@@ -0,0 +1,40 @@
+"""异步入口：文件响应的回退路径"""
+import asyncio
+import os
+
+import asgi
+import app
+
+
+def run_asgi(path, method='GET'):
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'raw_path': path.encode(), 'root_path': '',
+        'query_string': b'', 'headers': [(b'host', b'localhost')], 'server': ('localhost', 80),
+        'scheme': 'http', 'http_version': '1.1'
+    }
+    messages = []
+
+    async def receive():
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi.send_local_file(scope, receive, send, os.path.join(app.FILE_STORAGE['audio_dir'], 'missing.mp3'),
+                                     'missing.mp3', 'audio', '/files/audio/<path:filename>', 0))
+    return messages
+
+
+def test_fallback_response_body_matches_content_length():
+    messages = run_asgi('/files/audio/missing.mp3')
+    start = messages[0]
+    assert start['status'] == 404
+    headers = dict(start['headers'])
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    assert int(headers[b'content-length']) == len(body) > 0
+    assert messages[-1].get('more_body') in (None, False)
+
+
+def test_fallback_head_response_has_no_body():
+    messages = run_asgi('/files/audio/missing.mp3', method='HEAD')
+    assert b''.join(message.get('body', b'') for message in messages[1:]) == b''
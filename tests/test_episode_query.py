@@ -0,0 +1,61 @@
+"""/api/podcasts 的分页和过滤参数"""
+import pytest
+from werkzeug.datastructures import MultiDict
+
+import app
+import episode_index
+from config import CONFIG
+
+
+def parse(**args):
+    return episode_index.parse_episode_query(MultiDict(args))
+
+
+def test_no_query_parameters_returns_full_list():
+    assert parse() is None
+    assert parse(unrelated='1') is None
+
+
+def test_limit_and_offset_are_clamped():
+    query = parse(offset='-5', limit='100000')
+    assert query['offset'] == 0
+    assert query['limit'] == CONFIG['API_MAX_PAGE_SIZE']
+    assert parse(limit='0')['limit'] == 1
+    assert parse(limit='abc')['limit'] == CONFIG['API_DEFAULT_PAGE_SIZE']
+
+
+@pytest.mark.parametrize('days', ['1000000', str(10 ** 12)])
+def test_large_days_value_is_clamped(days):
+    query = parse(days=days)
+    assert query['since'] is not None and query['since'] < '1930-01-01'
+
+
+def test_negative_days_is_rejected():
+    with pytest.raises(ValueError):
+        parse(days='-1')
+
+
+def test_keywords_and_fields_are_split():
+    query = parse(q='Foo  bar', fields='id, title,')
+    assert query['keywords'] == ['foo', 'bar']
+    assert query['fields'] == ['id', 'title']
+
+
+@pytest.fixture
+def client(monkeypatch):
+    data = {'podcasts': [{'id': '20250101_000000', 'title': 'Episode', 'date': '2025-01-01'}]}
+    monkeypatch.setitem(episode_index.cache, 'data', data)
+    monkeypatch.setattr(app, 'get_podcast_index', lambda: data)
+    return app.app.test_client()
+
+
+def test_invalid_days_returns_400(client):
+    response = client.get('/api/podcasts?days=-3')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_large_days_returns_results(client):
+    response = client.get('/api/podcasts?days=1000000')
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 1
@@ -0,0 +1,107 @@
+"""已缓存文件的发送：内部文件、ETag 和 Range"""
+import os
+
+import pytest
+
+import app
+
+
+def write_cached_file(file_type, relative_path, content):
+    directory = app.FILE_STORAGE['audio_dir'] if file_type == 'audio' else app.FILE_STORAGE['transcript_dir']
+    path = os.path.join(directory, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+@pytest.mark.parametrize('name', [
+    'summary.articles.json', 'summary.html.part', 'summary.html.part.meta', 'summary.html.123.link', 'summary.html.1.2.tmp'
+])
+def test_internal_files_are_not_served(client, name):
+    write_cached_file('transcript', f"20250101_000000/{name}", b'{"internal": true}')
+    response = client.get(f"/files/transcripts/20250101_000000/{name}")
+    assert response.status_code == 404
+
+
+def test_download_failure_reason_is_per_thread():
+    app.DOWNLOAD_FAILURE.reason = None
+    app.record_download_failure('/tmp/a.mp3', 'audio', 'HTTP 404', result=None)
+    assert app.DOWNLOAD_FAILURE.reason == 'HTTP 404'
+
+    seen = []
+    thread = app.threading.Thread(target=lambda: seen.append(getattr(app.DOWNLOAD_FAILURE, 'reason', None)))
+    thread.start()
+    thread.join()
+    assert seen == [None]
+
+
+AUDIO = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def audio_file():
+    write_cached_file('audio', '20250101_000000/range.mp3', AUDIO)
+    return '/files/audio/20250101_000000/range.mp3'
+
+
+def test_full_response_has_etag_and_accept_ranges(client, audio_file):
+    response = client.get(audio_file)
+    assert response.status_code == 200
+    assert response.data == AUDIO
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert response.headers['ETag']
+
+
+def test_if_none_match_returns_304(client, audio_file):
+    etag = client.get(audio_file).headers['ETag']
+    response = client.get(audio_file, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+
+@pytest.mark.parametrize('header, start, end', [
+    ('bytes=0-99', 0, 100),
+    ('bytes=1000-', 1000, len(AUDIO)),
+    ('bytes=-24', len(AUDIO) - 24, len(AUDIO)),
+    ('bytes=1000-5000', 1000, len(AUDIO)),
+])
+def test_range_request(client, audio_file, header, start, end):
+    response = client.get(audio_file, headers={'Range': header})
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f"bytes {start}-{end - 1}/{len(AUDIO)}"
+    assert response.headers['Content-Length'] == str(end - start)
+    assert response.data == AUDIO[start:end]
+
+
+def test_unsatisfiable_range_returns_416(client, audio_file):
+    response = client.get(audio_file, headers={'Range': f"bytes={len(AUDIO)}-"})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f"bytes */{len(AUDIO)}"
+    assert response.data == b''
+
+
+def test_if_range_matching_etag_keeps_range(client, audio_file):
+    etag = client.get(audio_file).headers['ETag']
+    response = client.get(audio_file, headers={'Range': 'bytes=10-19', 'If-Range': etag})
+    assert response.status_code == 206
+    assert response.data == AUDIO[10:20]
+
+
+def test_if_range_stale_etag_returns_full_file(client, audio_file):
+    response = client.get(audio_file, headers={'Range': 'bytes=10-19', 'If-Range': '"stale"'})
+    assert response.status_code == 200
+    assert 'Content-Range' not in response.headers
+    assert response.data == AUDIO
+
+
+def test_multiple_ranges_return_full_file(client, audio_file):
+    response = client.get(audio_file, headers={'Range': 'bytes=0-9,20-29'})
+    assert response.status_code == 200
+    assert response.data == AUDIO
@@ -0,0 +1,85 @@
+"""MP3 帧头解析和时长读取（合成的帧数据）"""
+import pytest
+
+import audio_metadata
+
+# MPEG-1 Layer III，128 kbps，44100 Hz，无填充，立体声：每帧 417 字节
+MPEG1_128K_HEADER = b'\xff\xfb\x90\x00'
+# MPEG-2 Layer III，64 kbps，22050 Hz，单声道：每帧 208 字节
+MPEG2_64K_MONO_HEADER = b'\xff\xf3\x80\xc0'
+
+
+def make_frames(header, count, length):
+    return (header + b'\x00' * (length - 4)) * count
+
+
+def test_parse_mpeg1_layer3_header():
+    frame = audio_metadata.parse_mp3_frame_header(MPEG1_128K_HEADER)
+    assert frame == {
+        'mpeg1': True, 'layer': 3, 'bitrate': 128, 'sample_rate': 44100,
+        'samples': 1152, 'length': 417, 'channels': 2, 'side_info': 32
+    }
+
+
+def test_parse_padding_adds_one_byte():
+    frame = audio_metadata.parse_mp3_frame_header(b'\xff\xfb\x92\x00')
+    assert frame['length'] == 418
+
+
+def test_parse_mpeg2_mono_header():
+    frame = audio_metadata.parse_mp3_frame_header(MPEG2_64K_MONO_HEADER)
+    assert frame['mpeg1'] is False
+    assert (frame['bitrate'], frame['sample_rate'], frame['samples']) == (64, 22050, 576)
+    assert frame['length'] == 208
+    assert frame['channels'] == 1
+    assert frame['side_info'] == 9
+
+
+@pytest.mark.parametrize('header', [
+    b'\xff\xfb\x90',          # 不足 4 字节
+    b'\xfe\xfb\x90\x00',      # 无帧同步
+    b'\xff\xeb\x90\x00',      # 保留的 MPEG 版本
+    b'\xff\xf9\x90\x00',      # 保留的层
+    b'\xff\xfb\x00\x00',      # 自由码率
+    b'\xff\xfb\xf0\x00',      # 无效码率索引
+    b'\xff\xfb\x9c\x00',      # 保留的采样率
+])
+def test_parse_invalid_header(header):
+    assert audio_metadata.parse_mp3_frame_header(header) is None
+
+
+def test_scan_cbr_estimates_duration_from_bitrate(tmp_path):
+    path = tmp_path / 'cbr.mp3'
+    path.write_bytes(make_frames(MPEG1_128K_HEADER, 100, 417))
+    metadata = audio_metadata.scan_mp3_metadata(str(path))
+    assert metadata['bitrate'] == 128
+    assert metadata['vbr'] is False
+    assert metadata['duration'] == round(100 * 417 * 8 / 128000, 3)
+
+
+def test_scan_skips_id3v2_and_id3v1_tags(tmp_path):
+    id3v2 = b'ID3\x04\x00\x00\x00\x00\x02\x00' + b'\xff' * 256  # 标签长度 256（syncsafe），内容含伪帧同步
+    id3v1 = b'TAG' + b'\x00' * 125
+    path = tmp_path / 'tagged.mp3'
+    path.write_bytes(id3v2 + make_frames(MPEG1_128K_HEADER, 100, 417) + id3v1)
+    metadata = audio_metadata.scan_mp3_metadata(str(path))
+    assert metadata['duration'] == round(100 * 417 * 8 / 128000, 3)
+
+
+def test_scan_xing_header_uses_frame_count(tmp_path):
+    first = bytearray(MPEG1_128K_HEADER + b'\x00' * 413)
+    xing = 4 + 32  # MPEG-1 立体声的 side info 之后
+    first[xing:xing + 16] = b'Xing' + (3).to_bytes(4, 'big') + (1000).to_bytes(4, 'big') + (200000).to_bytes(4, 'big')
+    path = tmp_path / 'vbr.mp3'
+    path.write_bytes(bytes(first) + make_frames(MPEG1_128K_HEADER, 10, 417))
+    metadata = audio_metadata.scan_mp3_metadata(str(path))
+    duration = 1000 * 1152 / 44100
+    assert metadata['vbr'] is True
+    assert metadata['duration'] == round(duration, 3)
+    assert metadata['bitrate'] == round(200000 * 8 / duration / 1000)
+
+
+def test_scan_rejects_false_sync_without_following_frame(tmp_path):
+    path = tmp_path / 'noise.mp3'
+    path.write_bytes(b'\x00' * 10 + MPEG1_128K_HEADER + b'\x00' * 1000)
+    assert audio_metadata.scan_mp3_metadata(str(path)) is None
@@ -0,0 +1,41 @@
+"""全文搜索：分词和摘要片段"""
+import html
+
+import pytest
+
+import search_index
+from config import CONFIG
+
+
+@pytest.mark.parametrize('keyword', ['amp', 'lt', 'gt', 'quot', 'mark', '#x27'])
+def test_snippet_keywords_matching_entity_names(keyword):
+    text = f'A & B <b> "C" \'D\' {keyword} <mark>'
+    snippet = search_index.build_search_snippet(text, [keyword])
+
+    # 去掉插入的标记后应与完整转义的原文一致
+    assert snippet.replace('<mark>', '').replace('</mark>', '') == html.escape(text)
+    assert f'<mark>{html.escape(keyword)}</mark>' in snippet
+    assert '&<mark>' not in snippet
+
+
+def test_snippet_marks_overlapping_keywords_once():
+    snippet = search_index.build_search_snippet('Podcast pod', ['pod', 'podcast'])
+    assert snippet == '<mark>Podcast</mark> <mark>pod</mark>'
+
+
+def test_snippet_without_keywords_is_escaped():
+    assert search_index.build_search_snippet('<b>x</b>', []) == '&lt;b&gt;x&lt;/b&gt;'
+
+
+def test_snippet_is_trimmed_around_first_match():
+    CONFIG['SEARCH_SNIPPET_CONTEXT'], context = 5, CONFIG['SEARCH_SNIPPET_CONTEXT']
+    try:
+        snippet = search_index.build_search_snippet('0123456789abcdefghij needle 0123456789abcdefghij', ['needle'])
+    finally:
+        CONFIG['SEARCH_SNIPPET_CONTEXT'] = context
+    assert snippet.startswith('…') and snippet.endswith('…')
+    assert '<mark>needle</mark>' in snippet
+
+
+def test_tokenize_splits_cjk_into_bigrams():
+    assert search_index.tokenize_search_text('播客节目 ABC 2025 文') == ['播客', '客节', '节目', 'abc', '2025', '文']
@@ -0,0 +1,326 @@
+"""文稿处理：解析文稿 HTML 为结构化文章、生成压缩版本及其预压缩副本"""
+import gzip
+import html
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from html.parser import HTMLParser
+
+try:
+    import brotli  # 可选依赖：预生成 brotli 压缩文稿
+except ImportError:
+    brotli = None
+
+# 结构化文稿 JSON 格式版本，格式不兼容时递增
+TRANSCRIPT_STRUCTURE_FORMAT = 1
+
+# 压缩文稿 HTML：内联样式属性、换行两侧空白、连续空格
+TRANSCRIPT_STYLE_PATTERN = re.compile(r"""\sstyle\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+TRANSCRIPT_NEWLINE_PATTERN = re.compile(r'\s*\n\s*')
+TRANSCRIPT_SPACE_PATTERN = re.compile(r'[ \t\r\f]{2,}')
+
+# 最近使用的结构化文稿（按 JSON 文件的 mtime/大小校验），避免每次请求都读取文件
+TRANSCRIPT_CACHE = {
+    'lock': threading.Lock(),
+    'entries': OrderedDict(),
+    'max_entries': 16
+}
+
+# 文稿中每篇文章的标题行，例如 "文章1/83: 标题"
+ARTICLE_TITLE_PATTERN = re.compile(r'^文章\s*(\d+)\s*/\s*(\d+)\s*[:：]\s*(.*)$')
+ARTICLE_FIELD_LABELS = (('来源：', 'source'), ('原文链接：', 'url'), ('发布时间：', 'published_at'))
+
+class TranscriptTextParser(HTMLParser):
+    """将文稿 HTML 转换为按行分隔的纯文本，块级标签和 <br> 视为换行"""
+
+    BLOCK_TAGS = {'div', 'p', 'br', 'h1', 'h2', 'h3', 'h4', 'li', 'tr', 'section', 'article'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style', 'title'):
+            self.skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style', 'title'):
+            self.skip_depth = max(self.skip_depth - 1, 0)
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(re.sub(r'\s+', ' ', data))
+
+    def get_lines(self):
+        """返回去除首尾空白的文本行，连续空行合并为一个（保留段落分隔）"""
+        lines = []
+        for line in ''.join(self.parts).split('\n'):
+            line = line.strip()
+            if line or (lines and lines[-1]):
+                lines.append(line)
+        return lines
+
+def parse_transcript_articles(html_text):
+    """从文稿 HTML 中解析出文章列表（标题、来源、链接、发布时间、总结）"""
+    parser = TranscriptTextParser()
+    parser.feed(html_text)
+    parser.close()
+
+    articles = []
+    current = None
+    in_summary = False
+
+    for line in parser.get_lines():
+        match = ARTICLE_TITLE_PATTERN.match(line)
+        if match:
+            current = {
+                'index': len(articles),
+                'title': match.group(3).strip(),
+                'source': '',
+                'url': '',
+                'published_at': '',
+                'summary': []
+            }
+            articles.append(current)
+            in_summary = False
+            continue
+
+        if current is None:
+            continue
+
+        # 页脚版权信息，文章列表结束
+        if line.startswith('©'):
+            current = None
+            continue
+
+        if in_summary:
+            current['summary'].append(line)
+        elif line.startswith('总结：'):
+            in_summary = True
+            if line[len('总结：'):].strip():
+                current['summary'].append(line[len('总结：'):].strip())
+        else:
+            for label, key in ARTICLE_FIELD_LABELS:
+                if line.startswith(label):
+                    current[key] = line[len(label):].strip()
+                    break
+
+    for article in articles:
+        article['summary'] = '\n'.join(article['summary']).strip()
+
+    return articles
+
+class TranscriptMinifier(HTMLParser):
+    """压缩文稿 HTML：合并空白、去掉注释，把重复的内联样式替换为共享的 class"""
+
+    PRESERVE_TAGS = {'pre', 'textarea', 'script', 'style'}
+
+    def __init__(self, style_classes):
+        super().__init__(convert_charrefs=False)
+        self.style_classes = style_classes
+        self.parts = []
+        self.preserve_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.PRESERVE_TAGS:
+            self.preserve_depth += 1
+        self.parts.append(self.rewrite_starttag(attrs, closed=False))
+
+    def handle_startendtag(self, tag, attrs):
+        self.parts.append(self.rewrite_starttag(attrs, closed=True))
+
+    def rewrite_starttag(self, attrs, closed):
+        class_name = self.style_classes.get(dict(attrs).get('style'))
+        if class_name is None:
+            return self.get_starttag_text()
+
+        tag_text = self.get_starttag_text()
+        rebuilt = [tag_text[:1 + len(self.lasttag)]]
+        has_class = False
+        for name, value in attrs:
+            if name == 'style':
+                continue
+            if name == 'class':
+                value = f"{value} {class_name}" if value else class_name
+                has_class = True
+            rebuilt.append(f' {name}' if value is None else f' {name}="{html.escape(value)}"')
+        if not has_class:
+            rebuilt.append(f' class="{class_name}"')
+        rebuilt.append(' />' if closed else '>')
+        return ''.join(rebuilt)
+
+    def handle_endtag(self, tag):
+        if tag in self.PRESERVE_TAGS and self.preserve_depth:
+            self.preserve_depth -= 1
+        self.parts.append(f'</{tag}>')
+
+    def handle_data(self, data):
+        if not self.preserve_depth:
+            # 浏览器渲染时连续空白本来就会合并
+            data = TRANSCRIPT_NEWLINE_PATTERN.sub('\n', data)
+            data = TRANSCRIPT_SPACE_PATTERN.sub(' ', data)
+        self.parts.append(data)
+
+    def handle_entityref(self, name):
+        self.parts.append(f'&{name};')
+
+    def handle_charref(self, name):
+        self.parts.append(f'&#{name};')
+
+    def handle_comment(self, data):
+        # 保留 IE 条件注释
+        if data.startswith('[if'):
+            self.parts.append(f'<!--{data}-->')
+
+    def handle_decl(self, decl):
+        self.parts.append(f'<!{decl}>')
+
+    def handle_pi(self, data):
+        self.parts.append(f'<?{data}>')
+
+    def unknown_decl(self, data):
+        self.parts.append(f'<![{data}]>')
+
+def minify_transcript_html(text):
+    """压缩文稿 HTML；重复出现的内联样式移到 <head> 中的一个样式表"""
+    style_classes = {}
+    # 文稿自带样式表时不改写内联样式，避免改变样式优先级
+    if '<style' not in text.lower():
+        styles = {}
+        for match in TRANSCRIPT_STYLE_PATTERN.finditer(text):
+            style = html.unescape(match.group(1) if match.group(1) is not None else match.group(2))
+            styles[style] = styles.get(style, 0) + 1
+        repeated = sorted((style for style, count in styles.items() if count > 1 and '<' not in style and '}' not in style),
+                          key=lambda style: -styles[style])
+        style_classes = {style: f"ts{index}" for index, style in enumerate(repeated)}
+
+    minifier = TranscriptMinifier(style_classes)
+    minifier.feed(text)
+    minifier.close()
+    minified = ''.join(minifier.parts)
+
+    if style_classes:
+        sheet = '<style>' + ''.join(f".{name}{{{style.strip()}}}" for style, name in style_classes.items()) + '</style>'
+        head_end = minified.lower().find('</head>')
+        if head_end >= 0:
+            minified = minified[:head_end] + sheet + minified[head_end:]
+        else:
+            minified = sheet + minified
+    return minified
+
+def get_transcript_variant_paths(local_path):
+    """文稿的压缩版本及其预压缩副本（与 HTML 文稿放在同一目录）"""
+    root, extension = os.path.splitext(local_path)
+    minified_path = f"{root}.min{extension}"
+    return {'identity': minified_path, 'gzip': f"{minified_path}.gz", 'br': f"{minified_path}.br"}
+
+def is_transcript_variant(filename):
+    """是否为生成的文稿压缩版本（不作为独立文稿统计或索引）"""
+    return '.min.' in os.path.basename(filename)
+
+def build_transcript_variants(local_path):
+    """生成压缩后的文稿及其 gzip/brotli 副本，发送时按 Accept-Encoding 直接选择"""
+    with open(local_path, 'r', encoding='utf-8', errors='replace') as f:
+        minified = minify_transcript_html(f.read()).encode('utf-8')
+
+    variants = {'identity': minified, 'gzip': gzip.compress(minified, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(minified, quality=11, mode=brotli.MODE_TEXT)
+
+    paths = get_transcript_variant_paths(local_path)
+    # 先写压缩副本，最后写入的未压缩版本的修改时间用于判断是否需要重新生成
+    for encoding in ('gzip', 'br', 'identity'):
+        if encoding not in variants:
+            continue
+        temp_path = f"{paths[encoding]}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(variants[encoding])
+        os.replace(temp_path, paths[encoding])
+
+    original_size = os.path.getsize(local_path)
+    print(f"🗜️  已生成文稿压缩版本: {paths['identity']} "
+          f"({original_size} → {len(minified)} 字节, " +
+          ', '.join(f"{encoding} {len(body)}" for encoding, body in variants.items() if encoding != 'identity') + ')')
+    return paths
+
+def get_transcript_variants(local_path):
+    """返回可用的文稿变体 {编码: 路径}；缺失或比原文件旧时重新生成"""
+    paths = get_transcript_variant_paths(local_path)
+    try:
+        if os.stat(paths['identity']).st_mtime_ns < os.stat(local_path).st_mtime_ns:
+            raise FileNotFoundError(paths['identity'])
+    except FileNotFoundError:
+        try:
+            build_transcript_variants(local_path)
+        except Exception as e:
+            print(f"生成文稿压缩版本失败 {local_path}: {e}")
+            return {}
+    return {encoding: path for encoding, path in paths.items() if os.path.exists(path)}
+
+def get_transcript_structure_path(local_path):
+    """结构化文稿 JSON 的路径（与 HTML 文稿放在同一目录）"""
+    return f"{os.path.splitext(local_path)[0]}.articles.json"
+
+def extract_transcript_structure(local_path):
+    """将文稿 HTML 解析为结构化 JSON 并缓存在 HTML 旁边，HTML 未变化时直接复用"""
+    stat = os.stat(local_path)
+    structure_path = get_transcript_structure_path(local_path)
+
+    document = load_transcript_structure(structure_path)
+    if (document and document.get('format') == TRANSCRIPT_STRUCTURE_FORMAT and
+            document.get('source_mtime_ns') == stat.st_mtime_ns and document.get('source_size') == stat.st_size):
+        return document
+
+    with open(local_path, 'r', encoding='utf-8', errors='replace') as f:
+        articles = parse_transcript_articles(f.read())
+
+    document = {
+        'format': TRANSCRIPT_STRUCTURE_FORMAT,
+        'episode_id': os.path.basename(os.path.dirname(local_path)),
+        'source_mtime_ns': stat.st_mtime_ns,
+        'source_size': stat.st_size,
+        'article_count': len(articles),
+        'articles': articles
+    }
+
+    temp_path = f"{structure_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp_path, structure_path)
+    print(f"📑 已生成结构化文稿: {structure_path} ({len(articles)} 篇文章)")
+    return document
+
+def load_transcript_structure(structure_path):
+    """读取结构化文稿（带内存缓存），文件不存在或损坏时返回 None"""
+    try:
+        stat = os.stat(structure_path)
+    except FileNotFoundError:
+        return None
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    with TRANSCRIPT_CACHE['lock']:
+        cached = TRANSCRIPT_CACHE['entries'].get(structure_path)
+        if cached and cached[0] == signature:
+            TRANSCRIPT_CACHE['entries'].move_to_end(structure_path)
+            return cached[1]
+
+    try:
+        with open(structure_path, 'r', encoding='utf-8') as f:
+            document = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"读取结构化文稿失败 {structure_path}: {e}")
+        return None
+
+    with TRANSCRIPT_CACHE['lock']:
+        TRANSCRIPT_CACHE['entries'][structure_path] = (signature, document)
+        TRANSCRIPT_CACHE['entries'].move_to_end(structure_path)
+        while len(TRANSCRIPT_CACHE['entries']) > TRANSCRIPT_CACHE['max_entries']:
+            TRANSCRIPT_CACHE['entries'].popitem(last=False)
+    return document